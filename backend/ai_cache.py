@@ -0,0 +1,111 @@
+"""
+Cache Redis des réponses du chat IA
+Une même question, posée avec le même contexte Pronote et le même modèle, n'est envoyée qu'une fois à OpenRouter
+"""
+import hashlib
+import json
+import time
+from typing import Optional, Dict, Any, List
+from loguru import logger
+
+from config import settings
+from redis_pool import get_redis
+from ai_context import normalize_text
+
+
+class AIResponseCache:
+    """
+    Cache des réponses OpenRouter
+
+    Clé: question normalisée (minuscules, sans accents ni ponctuation finale)
+    + empreinte du contexte injecté (premier message système, qui contient les
+    données Pronote et la date du jour) + modèle. Le contexte étant propre à
+    chaque élève, deux élèves ne partagent une réponse que si tout leur contexte
+    est identique.
+
+    L'historique de la conversation (résumé et fenêtre récente) n'entre pas
+    dans la clé: une question reposée plus loin dans la conversation, avec les
+    mêmes données Pronote, retrouve la réponse en cache.
+    """
+
+    def __init__(self):
+        self.redis_client = get_redis()
+        self.ttl = settings.AI_CACHE_TTL_SECONDS
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Question normalisée: "Quels devoirs pour demain ?" -> "quels devoirs pour demain" """
+        return normalize_text(question).rstrip(' ?!.')
+
+    def key(self, question: str, context: str, model: str) -> str:
+        """
+        Clé de cache d'une question
+
+        Args:
+            question: Message de l'élève
+            context: Contexte injecté (message système complet)
+            model: Modèle OpenRouter
+        """
+        context_hash = hashlib.sha256(context.encode()).hexdigest()[:16]
+        raw = f"{self.normalize_question(question)}|{context_hash}|{model}"
+        return f"ai:response:{hashlib.sha256(raw.encode()).hexdigest()[:32]}"
+
+    def key_for_messages(self, messages: List[Dict[str, str]], model: str) -> str:
+        """Clé de cache à partir des messages envoyés (premier message système + question)"""
+        return self.key(messages[-1]['content'], messages[0]['content'], model)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Réponse en cache
+
+        Returns:
+            Dict avec content, usage, model et cached_at, ou None
+        """
+        if not settings.AI_CACHE_ENABLED:
+            return None
+
+        try:
+            raw = await self.redis_client.get(key)
+        except Exception as e:
+            # Le cache ne doit jamais faire échouer le chat
+            self.errors += 1
+            logger.warning(f"Erreur lecture cache IA: {str(e)}")
+            return None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(raw)
+
+    async def put(self, key: str, content: str, usage: Dict[str, Any], model: Optional[str] = None):
+        """Stocke une réponse complète (les réponses vides ne sont pas mises en cache)"""
+        if not settings.AI_CACHE_ENABLED or not content:
+            return
+
+        entry = {"content": content, "usage": usage, "model": model, "cached_at": time.time()}
+        try:
+            await self.redis_client.setex(key, self.ttl, json.dumps(entry))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Erreur écriture cache IA: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache (exposées par /api/health)"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.AI_CACHE_ENABLED,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None
+        }
+
+
+# Instance globale
+ai_response_cache = AIResponseCache()
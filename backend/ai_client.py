@@ -0,0 +1,303 @@
+"""
+Client OpenRouter partagé
+Un seul httpx.AsyncClient pour toute la durée de vie de l'application (keep-alive, HTTP/2)
+"""
+import asyncio
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, AsyncIterator
+import httpx
+from loguru import logger
+
+from config import settings
+from ai_limiter import openrouter_limiter
+from metrics import timed, record_tokens, OPENROUTER_REQUEST_DURATION, OPENROUTER_FIRST_TOKEN
+
+
+# Statuts pour lesquels un nouvel essai a des chances d'aboutir
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class OpenRouterError(Exception):
+    """Erreur renvoyée par OpenRouter"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(f"Erreur OpenRouter ({status_code}): {detail}")
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """En-tête Retry-After en secondes (nombre de secondes ou date HTTP)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class OpenRouterClient:
+    """
+    Client OpenRouter (API compatible OpenAI)
+
+    Les connexions TLS sont réutilisées entre les messages au lieu
+    d'ouvrir un nouveau client par requête.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.limiter = openrouter_limiter
+        self.max_retries = settings.OPENROUTER_MAX_RETRIES
+        self._retries = 0
+        self._retries_by_status: Dict[int, int] = {}
+
+    def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=settings.OPENROUTER_BASE_URL,
+            http2=settings.OPENROUTER_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.OPENROUTER_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENROUTER_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPENROUTER_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(settings.OPENROUTER_TIMEOUT_SECONDS, connect=5.0),
+            headers={
+                "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://assistant-pronote.com"
+            }
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    async def start(self):
+        """Ouvre le client partagé (au démarrage de l'application)"""
+        _ = self.client
+        logger.info(
+            f"Client OpenRouter prêt (HTTP/2: {settings.OPENROUTER_HTTP2}, "
+            f"{settings.OPENROUTER_MAX_CONNECTIONS} connexions max)"
+        )
+
+    async def close(self):
+        """Ferme le client partagé (à l'arrêt de l'application)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _payload(
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        stream: bool
+    ) -> Dict[str, Any]:
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Délai avant le prochain essai: Retry-After s'il est fourni, sinon backoff exponentiel avec jitter"""
+        cap = settings.OPENROUTER_RETRY_MAX_DELAY_SECONDS
+        if retry_after is not None:
+            return min(retry_after, cap)
+        # Full jitter: uniforme entre 0 et base * 2^essai (plafonné)
+        return random.uniform(0, min(cap, settings.OPENROUTER_RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+
+    async def _should_retry(self, error: OpenRouterError, attempt: int) -> bool:
+        """Attend avant un nouvel essai si l'erreur est temporaire et les essais non épuisés"""
+        if error.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+            return False
+
+        if error.retry_after is not None and error.retry_after > settings.OPENROUTER_RETRY_MAX_DELAY_SECONDS:
+            # Attente demandée trop longue: mieux vaut renvoyer l'erreur (et Retry-After) au client
+            return False
+
+        delay = self._retry_delay(attempt, error.retry_after)
+        self._retries += 1
+        self._retries_by_status[error.status_code] = self._retries_by_status.get(error.status_code, 0) + 1
+        logger.warning(
+            f"OpenRouter {error.status_code}, nouvel essai dans {delay:.1f}s "
+            f"({attempt + 1}/{self.max_retries})"
+        )
+        await asyncio.sleep(delay)
+        return True
+
+    @staticmethod
+    def _error_from_response(response: httpx.Response, body: str) -> OpenRouterError:
+        return OpenRouterError(
+            response.status_code,
+            body,
+            retry_after=parse_retry_after(response.headers.get("Retry-After"))
+        )
+
+    async def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        user_key: str = "anonymous"
+    ) -> Dict[str, Any]:
+        """
+        Complétion non streamée
+
+        Args:
+            model: Identifiant du modèle OpenRouter
+            messages: Messages au format OpenAI
+            temperature: Température d'échantillonnage
+            max_tokens: Nombre maximum de tokens générés
+            user_key: Utilisateur à l'origine de l'appel (file équitable)
+
+        Returns:
+            Dict avec content et usage
+
+        Raises:
+            OpenRouterError: Réponse non 200 après les nouveaux essais
+            LimiterQueueFullError: Trop d'appels OpenRouter en attente
+        """
+        async with self.limiter.slot(user_key):
+            with timed(OPENROUTER_REQUEST_DURATION, model=model, mode="complete"):
+                attempt = 0
+                while True:
+                    response = await self.client.post(
+                        "/chat/completions",
+                        json=self._payload(model, messages, temperature, max_tokens, stream=False)
+                    )
+                    if response.status_code == 200:
+                        break
+
+                    error = self._error_from_response(response, response.text)
+                    if not await self._should_retry(error, attempt):
+                        raise error
+                    attempt += 1
+
+        data = response.json()
+        record_tokens(model, data.get('usage'))
+        return {
+            "content": data['choices'][0]['message']['content'],
+            "usage": data.get('usage', {})
+        }
+
+    async def stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        user_key: str = "anonymous"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Complétion streamée (stream: true)
+
+        Les nouveaux essais n'ont lieu qu'avant le premier fragment reçu.
+
+        Yields:
+            {"content": "..."} pour chaque fragment de texte,
+            puis {"usage": {...}} si OpenRouter le fournit
+
+        Raises:
+            OpenRouterError: Réponse non 200 après les nouveaux essais
+            LimiterQueueFullError: Trop d'appels OpenRouter en attente
+        """
+        async with self.limiter.slot(user_key):
+            started_at = time.perf_counter()
+            with timed(OPENROUTER_REQUEST_DURATION, model=model, mode="stream"):
+                attempt = 0
+                while True:
+                    request = self.client.build_request(
+                        "POST",
+                        "/chat/completions",
+                        json=self._payload(model, messages, temperature, max_tokens, stream=True)
+                    )
+                    response = await self.client.send(request, stream=True)
+                    if response.status_code == 200:
+                        break
+
+                    body = (await response.aread()).decode(errors='replace')
+                    await response.aclose()
+                    error = self._error_from_response(response, body)
+                    if not await self._should_retry(error, attempt):
+                        raise error
+                    attempt += 1
+
+                try:
+                    first_token = True
+                    async for chunk in self._iter_chunks(response):
+                        if first_token and 'content' in chunk:
+                            first_token = False
+                            if settings.ENABLE_METRICS:
+                                OPENROUTER_FIRST_TOKEN.labels(model=model).observe(
+                                    time.perf_counter() - started_at
+                                )
+                        if 'usage' in chunk:
+                            record_tokens(model, chunk['usage'])
+                        yield chunk
+                finally:
+                    await response.aclose()
+
+    @staticmethod
+    async def _iter_chunks(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+        """Décode les événements SSE d'OpenRouter"""
+        async for line in response.aiter_lines():
+            # Les lignes ": ..." sont des commentaires de maintien de connexion
+            if not line.startswith("data:"):
+                continue
+
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                logger.warning(f"Fragment OpenRouter illisible: {data[:100]}")
+                continue
+
+            if chunk.get('error'):
+                code = chunk['error'].get('code', 500)
+                raise OpenRouterError(
+                    code if isinstance(code, int) else 500,
+                    chunk['error'].get('message', 'Erreur de streaming')
+                )
+
+            choices = chunk.get('choices') or []
+            if choices:
+                content = (choices[0].get('delta') or {}).get('content')
+                if content:
+                    yield {"content": content}
+
+            if chunk.get('usage'):
+                yield {"usage": chunk['usage']}
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques des appels OpenRouter (file d'attente et nouveaux essais)"""
+        return {
+            **self.limiter.stats(),
+            "retries": self._retries,
+            "retries_by_status": {str(code): count for code, count in self._retries_by_status.items()}
+        }
+
+
+# Instance globale
+openrouter_client = OpenRouterClient()
@@ -0,0 +1,217 @@
+"""
+Contexte Pronote pour le chat IA
+Assemble les données en cache en texte compact, limité à un budget de tokens par modèle
+"""
+import json
+import re
+import unicodedata
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from config import settings
+
+
+# Mots-clés (sans accents) orientant la priorité des sections
+SECTION_KEYWORDS = {
+    "homework": ("devoir", "dm", "exercice", "travail", "rendre", "demain", "semaine", "faire"),
+    "timetable": ("emploi", "cours", "horaire", "quand", "prochain", "salle", "prof", "heure", "aujourd"),
+    "grades": ("note", "moyenne", "resultat", "controle", "evaluation", "bulletin", "progres")
+}
+
+DAYS_FR = ("lun", "mar", "mer", "jeu", "ven", "sam", "dim")
+
+
+def normalize_text(text: str) -> str:
+    """Minuscules, sans accents, espaces normalisés"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière du nombre de tokens (~3,5 caractères par token en français)"""
+    return int(len(text) / 3.5) + 1
+
+
+def parse_model_budgets(raw: str) -> Dict[str, int]:
+    """Parse "modele=budget,modele2=budget2" (préfixes de modèles acceptés)"""
+    budgets = {}
+    for item in raw.split(','):
+        if '=' not in item:
+            continue
+        model, budget = item.rsplit('=', 1)
+        try:
+            budgets[model.strip()] = int(budget)
+        except ValueError:
+            continue
+    return budgets
+
+
+MODEL_BUDGETS = parse_model_budgets(settings.AI_CONTEXT_MODEL_BUDGETS)
+
+
+def token_budget(model: str) -> int:
+    """Budget de tokens du contexte pour un modèle (préfixe le plus long)"""
+    matches = [prefix for prefix in MODEL_BUDGETS if model.startswith(prefix)]
+    if matches:
+        return MODEL_BUDGETS[max(matches, key=len)]
+    return settings.AI_CONTEXT_TOKEN_BUDGET
+
+
+def _shorten(text: Optional[str], limit: int) -> str:
+    text = re.sub(r'\s+', ' ', text or '').strip()
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def _day(iso: Optional[str]) -> Tuple[str, Optional[datetime]]:
+    if not iso:
+        return "?", None
+    try:
+        value = datetime.fromisoformat(iso)
+    except ValueError:
+        return iso[:10], None
+    return f"{DAYS_FR[value.weekday()]} {value:%d/%m}", value
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(str(value).replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+
+
+def compact_homework(homework: List[Dict[str, Any]]) -> List[str]:
+    """Une ligne par devoir, triés par date: "lun 06/05 Maths: Ex. p.12 [fait]" """
+    lines = []
+    for hw in sorted(homework, key=lambda h: h.get('date') or ''):
+        day, _ = _day(hw.get('date'))
+        done = " [fait]" if hw.get('done') else ""
+        lines.append(f"{day} {hw.get('subject')}: {_shorten(hw.get('description'), 160)}{done}")
+    return lines
+
+
+def compact_timetable(timetable: List[Dict[str, Any]]) -> List[str]:
+    """Une ligne par jour: "lun 06/05: 08:00-09:00 Maths (B12); ..." """
+    days: Dict[str, List[str]] = {}
+    for lesson in sorted(timetable, key=lambda l: l.get('start') or ''):
+        day, start = _day(lesson.get('start'))
+        _, end = _day(lesson.get('end'))
+        hours = f"{start:%H:%M}-{end:%H:%M}" if start and end else "?"
+        details = ", ".join(
+            str(v) for v in (lesson.get('teacher'), lesson.get('classroom')) if v
+        )
+        entry = f"{hours} {lesson.get('subject')}"
+        if details:
+            entry += f" ({details})"
+        if lesson.get('canceled'):
+            entry += " ANNULÉ"
+        days.setdefault(day, []).append(entry)
+    return [f"{day}: " + "; ".join(entries) for day, entries in days.items()]
+
+
+def _grade_entry(grade: Dict[str, Any]) -> str:
+    entry = f"{grade.get('grade')}/{grade.get('out_of')}"
+    coefficient = _to_float(grade.get('coefficient'))
+    if coefficient and coefficient != 1:
+        entry += f" c{grade.get('coefficient')}"
+    _, date = _day(grade.get('date'))
+    if date:
+        entry += f" {date:%d/%m}"
+    return entry
+
+
+def compact_grades(grades: List[Dict[str, Any]]) -> List[str]:
+    """Moyenne par matière puis dernières notes: "Maths moy 13.2/20: 14/20 c2 12/03, ..." """
+    subjects: Dict[str, List[Dict[str, Any]]] = {}
+    for grade in sorted(grades, key=lambda g: g.get('date') or '', reverse=True):
+        subjects.setdefault(grade.get('subject') or "Matière", []).append(grade)
+
+    lines = []
+    for subject, items in subjects.items():
+        total, weights = 0.0, 0.0
+        for grade in items:
+            value, out_of = _to_float(grade.get('grade')), _to_float(grade.get('out_of'))
+            coefficient = _to_float(grade.get('coefficient')) or 1.0
+            if value is not None and out_of:
+                total += value / out_of * 20 * coefficient
+                weights += coefficient
+
+        average = f" moy {total / weights:.1f}/20" if weights else ""
+        recent = ", ".join(_grade_entry(grade) for grade in items[:5])
+        lines.append(f"{subject}{average}: {recent}")
+    return lines
+
+
+def section_priority(question: str) -> List[str]:
+    """Ordre des sections selon la question (les plus pertinentes d'abord)"""
+    normalized = normalize_text(question)
+    scores = {
+        section: sum(1 for keyword in keywords if keyword in normalized)
+        for section, keywords in SECTION_KEYWORDS.items()
+    }
+    # Ordre par défaut en cas d'égalité: devoirs, emploi du temps, notes
+    return sorted(scores, key=lambda section: -scores[section])
+
+
+def build_context(
+    question: str,
+    model: str,
+    homework: Optional[List[Dict[str, Any]]] = None,
+    timetable: Optional[List[Dict[str, Any]]] = None,
+    grades: Optional[List[Dict[str, Any]]] = None,
+    extra: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Construit le contexte texte envoyé au modèle
+
+    Les sections sont ajoutées par ordre de pertinence pour la question,
+    ligne par ligne, jusqu'à épuisement du budget de tokens du modèle.
+
+    Args:
+        question: Message de l'élève
+        model: Modèle OpenRouter (détermine le budget)
+        homework, timetable, grades: Données Pronote (None = indisponible)
+        extra: Contexte additionnel envoyé par le client
+
+    Returns:
+        Contexte compact (vide si aucune donnée)
+    """
+    sections = {
+        "homework": ("DEVOIRS", compact_homework(homework) if homework is not None else None),
+        "timetable": ("EMPLOI DU TEMPS", compact_timetable(timetable) if timetable is not None else None),
+        "grades": ("NOTES", compact_grades(grades) if grades is not None else None)
+    }
+
+    remaining = token_budget(model)
+    blocks = []
+
+    for name in section_priority(question):
+        title, lines = sections[name]
+        if lines is None:
+            continue
+        if not lines:
+            lines = ["(aucun)"]
+
+        header_cost = estimate_tokens(title) + 1
+        if remaining <= header_cost:
+            break
+
+        kept = []
+        remaining -= header_cost
+        for line in lines:
+            cost = estimate_tokens(line) + 1
+            if cost > remaining:
+                kept.append(f"… {len(lines) - len(kept)} de plus")
+                break
+            kept.append(line)
+            remaining -= cost
+
+        blocks.append(title + "\n" + "\n".join(kept))
+
+    if extra and remaining > 0:
+        extra_text = json.dumps(extra, ensure_ascii=False, separators=(',', ':'))
+        max_chars = int(remaining * 3.5)
+        if max_chars > 20:
+            blocks.append("AUTRE\n" + _shorten(extra_text, max_chars))
+
+    return "\n\n".join(blocks)
@@ -0,0 +1,175 @@
+"""
+Limiteur de concurrence des appels OpenRouter
+Nombre global d'appels simultanés borné, file d'attente équitable entre utilisateurs
+"""
+import asyncio
+import time
+from collections import deque, OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Deque, AsyncIterator
+from loguru import logger
+
+from config import settings
+
+
+class LimiterQueueFullError(Exception):
+    """Trop d'appels en attente, ou attente trop longue"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FairLimiter:
+    """
+    Sémaphore global avec file d'attente équitable par utilisateur
+
+    Quand tous les créneaux sont pris, chaque utilisateur a sa propre file
+    et les créneaux libérés sont attribués à tour de rôle entre utilisateurs:
+    un élève qui envoie dix messages d'affilée ne fait pas attendre les autres.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        name: str = "openrouter"
+    ):
+        self.max_concurrency = max_concurrency or settings.OPENROUTER_MAX_CONCURRENCY
+        self.max_queued = max_queued if max_queued is not None else settings.OPENROUTER_MAX_QUEUED
+        self.queue_timeout = queue_timeout or settings.OPENROUTER_QUEUE_TIMEOUT_SECONDS
+        self.name = name
+
+        self._active = 0
+        # Utilisateurs en attente, dans l'ordre de passage (tourniquet)
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+
+        # Métriques
+        self._wait_samples: deque = deque(maxlen=1000)
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._queued_max = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    @asynccontextmanager
+    async def slot(self, user_key: str) -> AsyncIterator[None]:
+        """
+        Réserve un créneau d'appel pour la durée du bloc
+
+        Args:
+            user_key: Identifiant de l'utilisateur (équité de la file)
+
+        Raises:
+            LimiterQueueFullError: File pleine ou attente > queue_timeout
+        """
+        await self.acquire(user_key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, user_key: str):
+        """Attend un créneau libre (voir slot)"""
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+            self._record_wait(0.0)
+            return
+
+        if self._queued >= self.max_queued:
+            self._rejected += 1
+            raise LimiterQueueFullError(
+                f"File {self.name} pleine ({self._queued} appels en attente)",
+                retry_after=int(self.queue_timeout)
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_key, deque()).append(future)
+        self._queued += 1
+        self._queued_max = max(self._queued_max, self._queued)
+        queued_at = time.monotonic()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Créneau attribué au moment de l'abandon: le rendre
+                self.release()
+            else:
+                future.cancel()
+                self._discard(user_key, future)
+
+            if isinstance(e, asyncio.TimeoutError):
+                self._timeouts += 1
+                logger.warning(f"Attente {self.name} > {self.queue_timeout}s ({user_key})")
+                raise LimiterQueueFullError(
+                    f"Attente {self.name} trop longue",
+                    retry_after=int(self.queue_timeout)
+                ) from e
+            raise
+
+        self._record_wait(time.monotonic() - queued_at)
+
+    def release(self):
+        """Libère un créneau et le transmet au prochain utilisateur en attente"""
+        while self._waiters:
+            user_key, queue = self._waiters.popitem(last=False)
+            future = queue.popleft()
+            self._queued -= 1
+            if queue:
+                # L'utilisateur repasse en fin de tourniquet
+                self._waiters[user_key] = queue
+            if not future.done():
+                # Le créneau passe directement au suivant (_active inchangé)
+                future.set_result(None)
+                return
+
+        self._active -= 1
+
+    def _discard(self, user_key: str, future: asyncio.Future):
+        queue = self._waiters.get(user_key)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        self._queued -= 1
+        if not queue:
+            del self._waiters[user_key]
+
+    def _record_wait(self, wait: float):
+        self._wait_samples.append(wait)
+        self._wait_count += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques de la file (profondeur et temps d'attente)"""
+        samples = sorted(self._wait_samples)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queued": self._queued,
+            "queued_max": self._queued_max,
+            "queued_users": len(self._waiters),
+            "rejected": self._rejected,
+            "timeouts": self._timeouts,
+            "queue_wait": {
+                "count": self._wait_count,
+                "avg_ms": round(self._wait_total / self._wait_count * 1000, 2) if self._wait_count else 0.0,
+                "p50_ms": round(percentile(0.50) * 1000, 2),
+                "p95_ms": round(percentile(0.95) * 1000, 2),
+                "max_ms": round(self._wait_max * 1000, 2)
+            }
+        }
+
+
+# Instance globale
+openrouter_limiter = FairLimiter()
@@ -0,0 +1,295 @@
+"""
+Routage des modèles du chat IA
+Choisit le modèle le plus rapide et en bonne santé dans AI_MODEL_CHAIN, avec repli et requêtes couvertes (hedging)
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+
+import httpx
+from loguru import logger
+
+from config import settings
+from ai_client import openrouter_client, OpenRouterError
+
+
+class ModelStats:
+    """Fenêtre glissante des derniers appels d'un modèle"""
+
+    def __init__(self, window: int):
+        # Durée de la réponse complète (chat) et délai du premier token (streaming)
+        self.latencies: deque = deque(maxlen=window)
+        self.first_token: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+
+    @staticmethod
+    def percentile(samples: deque, p: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "calls": len(self.outcomes),
+            "error_rate": round(self.error_rate(), 3),
+            "latency_p50_ms": ms(self.percentile(self.latencies, 0.50)),
+            "latency_p95_ms": ms(self.percentile(self.latencies, 0.95)),
+            "first_token_p50_ms": ms(self.percentile(self.first_token, 0.50)),
+            "first_token_p95_ms": ms(self.percentile(self.first_token, 0.95))
+        }
+
+
+class ModelRouter:
+    """
+    Sélection du modèle OpenRouter
+
+    Les modèles de la chaîne sont classés à chaque requête:
+    d'abord ceux dont le taux d'erreur récent reste sous
+    AI_ROUTER_MAX_ERROR_RATE, puis par latence médiane. Un modèle sans
+    assez de mesures est classé comme s'il était rapide (il est ainsi
+    essayé et mesuré), à égalité l'ordre de la chaîne est conservé.
+    En cas d'échec, le modèle suivant est essayé.
+
+    En streaming, si le premier modèle n'a produit aucun token après
+    AI_HEDGE_AFTER_SECONDS, le suivant est lancé en parallèle et le
+    premier à répondre l'emporte.
+    """
+
+    def __init__(self):
+        self.chain: List[str] = list(settings.AI_MODEL_CHAIN)
+        self.window = settings.AI_ROUTER_WINDOW
+        self.min_samples = settings.AI_ROUTER_MIN_SAMPLES
+        self.max_error_rate = settings.AI_ROUTER_MAX_ERROR_RATE
+        self.hedge_after = settings.AI_HEDGE_AFTER_SECONDS
+        # Statistiques des seuls modèles de la chaîne: `requested` vient du client
+        # (mémoire bornée, pas de texte arbitraire dans /api/health)
+        self._stats: Dict[str, ModelStats] = {model: ModelStats(self.window) for model in self.chain}
+        self._fallbacks = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    def record(self, model: str, ok: bool, latency: Optional[float] = None, first_token: Optional[float] = None):
+        """Enregistre le résultat d'un appel (ignoré pour un modèle hors de la chaîne)"""
+        stats = self._stats.get(model)
+        if not stats:
+            return
+        stats.outcomes.append(1 if ok else 0)
+        if latency is not None:
+            stats.latencies.append(latency)
+        if first_token is not None:
+            stats.first_token.append(first_token)
+
+    def candidates(self, requested: Optional[str] = None, streaming: bool = False) -> List[str]:
+        """
+        Modèles à essayer, dans l'ordre
+
+        Args:
+            requested: Modèle demandé explicitement (essayé en premier)
+            streaming: Classer sur le délai du premier token plutôt que la durée totale
+        """
+        def score(item: Tuple[int, str]) -> Tuple[bool, float, int]:
+            position, model = item
+            stats = self._stats[model]
+            unhealthy = (
+                len(stats.outcomes) >= self.min_samples
+                and stats.error_rate() > self.max_error_rate
+            )
+            samples = stats.first_token if streaming else stats.latencies
+            if len(samples) < self.min_samples:
+                return (unhealthy, 0.0, position)
+            return (unhealthy, ModelStats.percentile(samples, 0.50), position)
+
+        ranked = [model for _, model in sorted(enumerate(self.chain), key=score)]
+        if requested:
+            ranked = [requested] + [model for model in ranked if model != requested]
+        return ranked
+
+    def primary(self, requested: Optional[str] = None) -> str:
+        """Modèle qui sera essayé en premier"""
+        return self.candidates(requested)[0]
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        requested: Optional[str] = None,
+        user_key: str = "anonymous",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Complétion non streamée avec repli sur les modèles suivants
+
+        Returns:
+            Dict avec content, usage et model (modèle ayant répondu)
+
+        Raises:
+            OpenRouterError: Tous les modèles ont échoué (dernière erreur)
+            LimiterQueueFullError: File OpenRouter saturée (pas de repli)
+        """
+        last_error: Optional[Exception] = None
+
+        for index, model in enumerate(self.candidates(requested)):
+            if index:
+                self._fallbacks += 1
+                logger.warning(f"Repli sur le modèle {model}")
+
+            started_at = time.monotonic()
+            try:
+                completion = await openrouter_client.complete(
+                    model=model,
+                    messages=messages,
+                    user_key=user_key,
+                    **kwargs
+                )
+            except (OpenRouterError, httpx.HTTPError) as e:
+                self.record(model, ok=False)
+                logger.warning(f"Échec du modèle {model}: {str(e)}")
+                last_error = e
+                continue
+
+            self.record(model, ok=True, latency=time.monotonic() - started_at)
+            return {**completion, "model": model}
+
+        raise self._final_error(last_error)
+
+    async def open_stream(
+        self,
+        messages: List[Dict[str, str]],
+        requested: Optional[str] = None,
+        user_key: str = "anonymous",
+        **kwargs
+    ) -> Tuple[str, AsyncIterator[Dict[str, Any]]]:
+        """
+        Ouvre un flux sur le premier modèle qui produit un fragment
+
+        Le premier fragment est attendu ici: les erreurs survenant avant
+        sont levées (et déclenchent le repli), pas envoyées dans le flux.
+
+        Returns:
+            (modèle retenu, itérateur des fragments à partir du premier)
+
+        Raises:
+            OpenRouterError: Tous les modèles ont échoué (dernière erreur)
+            LimiterQueueFullError: File OpenRouter saturée (pas de repli)
+        """
+        candidates = deque(self.candidates(requested, streaming=True))
+        # Tâche __anext__ en cours -> (modèle, flux, début, couverture)
+        pending: Dict[asyncio.Task, Tuple[str, AsyncIterator[Dict[str, Any]], float, bool]] = {}
+        last_error: Optional[Exception] = None
+        hedged = False
+
+        def launch(hedge: bool = False):
+            model = candidates.popleft()
+            upstream = openrouter_client.stream(
+                model=model,
+                messages=messages,
+                user_key=user_key,
+                **kwargs
+            )
+            task = asyncio.create_task(self._first_chunk(upstream))
+            pending[task] = (model, upstream, time.monotonic(), hedge)
+
+        launch()
+        try:
+            while pending:
+                can_hedge = not hedged and candidates and self.hedge_after > 0
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_after if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # Aucun token dans le délai: lancer le modèle suivant en parallèle
+                    hedged = True
+                    self._hedges += 1
+                    logger.info(f"Pas de token après {self.hedge_after}s, requête couverte sur {candidates[0]}")
+                    launch(hedge=True)
+                    continue
+
+                for task in done:
+                    model, upstream, started_at, hedge = pending.pop(task)
+                    try:
+                        first_chunk = task.result()
+                    except (OpenRouterError, httpx.HTTPError) as e:
+                        self.record(model, ok=False)
+                        logger.warning(f"Échec du modèle {model} (stream): {str(e)}")
+                        last_error = e
+                        if not pending and candidates:
+                            self._fallbacks += 1
+                            launch()
+                        continue
+
+                    elapsed = time.monotonic() - started_at
+                    self.record(model, ok=True, first_token=elapsed)
+                    if hedge:
+                        self._hedge_wins += 1
+                    return model, self._chain(first_chunk, upstream)
+
+            raise self._final_error(last_error)
+        finally:
+            await self._cancel(pending)
+
+    async def _cancel(self, pending: Dict[asyncio.Task, Tuple[str, AsyncIterator[Dict[str, Any]], float, bool]]):
+        """Abandonne les flux perdants (libère leur connexion et leur créneau)"""
+        for task, (model, _, started_at, _) in pending.items():
+            task.cancel()
+            # Le perdant était au moins aussi lent que le gagnant
+            if model in self._stats:
+                self._stats[model].first_token.append(time.monotonic() - started_at)
+        for task, (_, upstream, _, _) in pending.items():
+            try:
+                await task
+            except BaseException:
+                pass
+            await upstream.aclose()
+        pending.clear()
+
+    @staticmethod
+    async def _first_chunk(upstream: AsyncIterator[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        try:
+            return await upstream.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    @staticmethod
+    async def _chain(
+        first_chunk: Optional[Dict[str, Any]],
+        upstream: AsyncIterator[Dict[str, Any]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            if first_chunk is not None:
+                yield first_chunk
+            async for chunk in upstream:
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    @staticmethod
+    def _final_error(error: Optional[Exception]) -> Exception:
+        if isinstance(error, OpenRouterError):
+            return error
+        return OpenRouterError(502, str(error) if error else "Aucun modèle disponible")
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques par modèle (exposées par /api/health)"""
+        return {
+            "chain": self.candidates(),
+            "fallbacks": self._fallbacks,
+            "hedges": self._hedges,
+            "hedge_wins": self._hedge_wins,
+            "models": {model: stats.to_dict() for model, stats in self._stats.items()}
+        }
+
+
+# Instance globale
+model_router = ModelRouter()
@@ -4,37 +4,61 @@ JWT + Redis pour stockage sécurisé des sessions Pronote
 """
 import jwt
 import secrets
-import redis
 import json
+import time
+import asyncio
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set, Tuple, List
 from cryptography.fernet import Fernet
 from passlib.context import CryptContext
 from loguru import logger
 from config import settings
+from redis_pool import get_redis
 
 
 # Contexte de chiffrement pour les mots de passe
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Canal pub/sub d'invalidation des sessions entre workers
+SESSION_INVALIDATION_CHANNEL = "session:invalidate"
+# Attente maximale d'un message d'invalidation (remplace le socket_timeout du pool partagé)
+INVALIDATION_POLL_SECONDS = 5.0
+
+# Sessions par date de dernière activité (sorted set, score = timestamp)
+ACTIVE_SESSIONS_KEY = "sessions:active"
+
 
 class SessionManager:
-    """Gestion des sessions utilisateur avec Redis"""
+    """
+    Gestion des sessions utilisateur avec Redis (client asynchrone)
+    
+    Clés:
+    - session:{token}: enregistrement JSON (données Pronote chiffrées)
+    - session:{token}:activity: dernière activité, écrite séparément pour
+      ne pas réécrire l'enregistrement à chaque lecture
+    - sessions:active: index des sessions par dernière activité (préchargement)
+    """
     
     def __init__(self):
-        self.redis_client = redis.Redis.from_url(
-            settings.REDIS_URL,
-            password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
-            decode_responses=True
-        )
+        self.redis_client = get_redis()
         # Initialiser Fernet pour chiffrer les données sensibles
         self.cipher = Fernet(settings.ENCRYPTION_KEY.encode())
     
-    def create_session(
+    @staticmethod
+    def _session_key(session_token: str) -> str:
+        return f"session:{session_token}"
+    
+    @staticmethod
+    def _activity_key(session_token: str) -> str:
+        return f"session:{session_token}:activity"
+    
+    async def create_session(
         self,
         user_id: str,
         pronote_data: Dict[str, Any],
-        expires_in: Optional[int] = None
+        expires_in: Optional[int] = None,
+        credentials: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         Crée une nouvelle session
@@ -43,6 +67,7 @@ class SessionManager:
             user_id: Identifiant unique de l'utilisateur
             pronote_data: Données Pronote à stocker (chiffrées)
             expires_in: Durée de vie en secondes (défaut: settings)
+            credentials: Identifiants Pronote/ENT pour la reconnexion (chiffrés)
         
         Returns:
             Token de session
@@ -55,20 +80,24 @@ class SessionManager:
             encrypted_data = self._encrypt_data(pronote_data)
             
             # Préparer les données de session
+            now = datetime.utcnow().isoformat()
             session_data = {
                 "user_id": user_id,
                 "pronote_data": encrypted_data,
-                "created_at": datetime.utcnow().isoformat(),
-                "last_activity": datetime.utcnow().isoformat()
+                "created_at": now
             }
             
+            # Coffre d'identifiants: chiffré à part, déchiffré uniquement pour se reconnecter
+            if credentials:
+                session_data["credentials"] = self._encrypt_data(credentials)
+            
             # Stocker dans Redis
             expiration = expires_in or settings.SESSION_EXPIRATION_SECONDS
-            self.redis_client.setex(
-                f"session:{session_token}",
-                expiration,
-                json.dumps(session_data)
-            )
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.setex(self._session_key(session_token), expiration, json.dumps(session_data))
+                pipe.setex(self._activity_key(session_token), expiration, now)
+                pipe.zadd(ACTIVE_SESSIONS_KEY, {session_token: time.time()})
+                await pipe.execute()
             
             logger.info(f"Session créée pour {user_id}, expire dans {expiration}s")
             return session_token
@@ -77,10 +106,14 @@ class SessionManager:
             logger.error(f"Erreur création session: {str(e)}")
             raise
     
-    def get_session(self, session_token: str) -> Optional[Dict[str, Any]]:
+    async def get_session(self, session_token: str) -> Optional[Dict[str, Any]]:
         """
         Récupère une session active
         
+        Un seul aller-retour Redis (GET + EXPIRE pipelinés) et un seul
+        déchiffrement: l'expiration glissante est prolongée sans réécrire
+        l'enregistrement.
+        
         Args:
             session_token: Token de session
         
@@ -88,8 +121,16 @@ class SessionManager:
             Données de session (avec données Pronote déchiffrées) ou None
         """
         try:
-            session_key = f"session:{session_token}"
-            session_data_str = self.redis_client.get(session_key)
+            now = datetime.utcnow().isoformat()
+            expiration = settings.SESSION_EXPIRATION_SECONDS
+            
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(self._session_key(session_token))
+                pipe.expire(self._session_key(session_token), expiration)
+                # xx: ne crée pas la clé si la session n'existe pas
+                pipe.set(self._activity_key(session_token), now, ex=expiration, xx=True)
+                pipe.zadd(ACTIVE_SESSIONS_KEY, {session_token: time.time()})
+                session_data_str, _, _, _ = await pipe.execute()
             
             if not session_data_str:
                 logger.warning(f"Session introuvable: {session_token[:10]}...")
@@ -101,17 +142,7 @@ class SessionManager:
             session_data['pronote_data'] = self._decrypt_data(
                 session_data['pronote_data']
             )
-            
-            # Mettre à jour l'activité
-            session_data['last_activity'] = datetime.utcnow().isoformat()
-            self.redis_client.setex(
-                session_key,
-                settings.SESSION_EXPIRATION_SECONDS,
-                json.dumps({
-                    **session_data,
-                    'pronote_data': self._encrypt_data(session_data['pronote_data'])
-                })
-            )
+            session_data['last_activity'] = now
             
             return session_data
             
@@ -119,7 +150,49 @@ class SessionManager:
             logger.error(f"Erreur récupération session: {str(e)}")
             return None
     
-    def update_session(self, session_token: str, new_data: Dict[str, Any]):
+    async def peek_session(self, session_token: str) -> Optional[Dict[str, Any]]:
+        """
+        Lit une session sans la prolonger ni compter d'activité
+        (tâches de fond comme le préchargement)
+        
+        Args:
+            session_token: Token de session
+        
+        Returns:
+            Données de session (avec données Pronote déchiffrées) ou None
+        """
+        try:
+            session_data_str = await self.redis_client.get(self._session_key(session_token))
+            if not session_data_str:
+                return None
+            
+            session_data = json.loads(session_data_str)
+            session_data['pronote_data'] = self._decrypt_data(session_data['pronote_data'])
+            return session_data
+            
+        except Exception as e:
+            logger.error(f"Erreur lecture session: {str(e)}")
+            return None
+    
+    async def active_sessions(self, since_seconds: int) -> List[str]:
+        """
+        Sessions actives récemment (les entrées plus anciennes que
+        l'expiration des sessions sont purgées de l'index au passage)
+        
+        Args:
+            since_seconds: Fenêtre d'activité en secondes
+        
+        Returns:
+            Tokens de session, du plus récent au plus ancien
+        """
+        now = time.time()
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(ACTIVE_SESSIONS_KEY, "-inf", now - settings.SESSION_EXPIRATION_SECONDS)
+            pipe.zrevrangebyscore(ACTIVE_SESSIONS_KEY, "+inf", now - since_seconds)
+            _, tokens = await pipe.execute()
+        return tokens
+    
+    async def update_session(self, session_token: str, new_data: Dict[str, Any]):
         """
         Met à jour les données d'une session
         
@@ -128,31 +201,70 @@ class SessionManager:
             new_data: Nouvelles données à fusionner
         """
         try:
-            session_data = self.get_session(session_token)
-            if not session_data:
+            session_data_str = await self.redis_client.get(self._session_key(session_token))
+            if not session_data_str:
                 raise ValueError("Session introuvable")
             
+            session_data = json.loads(session_data_str)
+            
             # Fusionner les nouvelles données
-            session_data['pronote_data'].update(new_data)
+            pronote_data = self._decrypt_data(session_data['pronote_data'])
+            pronote_data.update(new_data)
             
             # Re-chiffrer et stocker
-            encrypted_data = self._encrypt_data(session_data['pronote_data'])
-            session_data['pronote_data'] = encrypted_data
-            session_data['last_activity'] = datetime.utcnow().isoformat()
-            
-            self.redis_client.setex(
-                f"session:{session_token}",
-                settings.SESSION_EXPIRATION_SECONDS,
-                json.dumps(session_data)
-            )
-            
+            session_data['pronote_data'] = self._encrypt_data(pronote_data)
+            
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.setex(
+                    self._session_key(session_token),
+                    settings.SESSION_EXPIRATION_SECONDS,
+                    json.dumps(session_data)
+                )
+                pipe.setex(
+                    self._activity_key(session_token),
+                    settings.SESSION_EXPIRATION_SECONDS,
+                    datetime.utcnow().isoformat()
+                )
+                await pipe.execute()
+            
+            await self._publish_invalidation(session_token)
             logger.info(f"Session mise à jour: {session_token[:10]}...")
             
         except Exception as e:
             logger.error(f"Erreur mise à jour session: {str(e)}")
             raise
     
-    def delete_session(self, session_token: str):
+    async def update_credentials(self, session_token: str, updates: Dict[str, Any]):
+        """
+        Met à jour le coffre d'identifiants d'une session (ex: cookie jar ENT)
+        
+        La durée de vie restante de la session est conservée.
+        
+        Args:
+            session_token: Token de session
+            updates: Champs à fusionner dans les identifiants déchiffrés
+        """
+        session_key = self._session_key(session_token)
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(session_key)
+                pipe.ttl(session_key)
+                session_data_str, ttl = await pipe.execute()
+            if not session_data_str or ttl <= 0:
+                return
+            
+            session_data = json.loads(session_data_str)
+            credentials = self.get_credentials(session_data) or {}
+            credentials.update(updates)
+            session_data['credentials'] = self._encrypt_data(credentials)
+            
+            await self.redis_client.setex(session_key, ttl, json.dumps(session_data))
+            await self._publish_invalidation(session_token)
+        except Exception as e:
+            # Le coffre reste utilisable tel quel: la prochaine reconnexion refera la connexion complète
+            logger.warning(f"Erreur mise à jour identifiants session: {str(e)}")
+    
+    async def delete_session(self, session_token: str):
         """
         Supprime une session
         
@@ -160,7 +272,14 @@ class SessionManager:
             session_token: Token de session
         """
         try:
-            result = self.redis_client.delete(f"session:{session_token}")
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(
+                    self._session_key(session_token),
+                    self._activity_key(session_token)
+                )
+                pipe.zrem(ACTIVE_SESSIONS_KEY, session_token)
+                result, _ = await pipe.execute()
+            await self._publish_invalidation(session_token)
             if result:
                 logger.info(f"Session supprimée: {session_token[:10]}...")
             else:
@@ -168,6 +287,33 @@ class SessionManager:
         except Exception as e:
             logger.error(f"Erreur suppression session: {str(e)}")
     
+    async def _publish_invalidation(self, session_token: str):
+        """Prévient les autres workers que leur copie de la session est obsolète"""
+        try:
+            await self.redis_client.publish(SESSION_INVALIDATION_CHANNEL, session_token)
+        except Exception as e:
+            logger.warning(f"Erreur publication invalidation session: {str(e)}")
+    
+    def get_credentials(self, session_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Déchiffre les identifiants stockés dans une session
+        
+        Args:
+            session_data: Données de session (retournées par get_session)
+        
+        Returns:
+            Identifiants déchiffrés ou None si la session n'en contient pas
+        """
+        encrypted_credentials = session_data.get('credentials')
+        if not encrypted_credentials:
+            return None
+        
+        try:
+            return self._decrypt_data(encrypted_credentials)
+        except Exception as e:
+            logger.error(f"Erreur déchiffrement identifiants: {str(e)}")
+            return None
+    
     def _encrypt_data(self, data: Dict[str, Any]) -> str:
         """Chiffre les données sensibles"""
         json_data = json.dumps(data)
@@ -180,6 +326,78 @@ class SessionManager:
         return json.loads(decrypted.decode())
 
 
+class VerifiedSessionCache:
+    """
+    Cache mémoire des sessions récemment validées, indexé par jti du JWT
+    
+    Évite la lecture Redis et le déchiffrement Fernet pour les rafales de
+    requêtes d'un même utilisateur. Borné en taille (LRU) et en durée;
+    invalidé explicitement à la suppression ou mise à jour d'une session.
+    """
+    
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[int] = None):
+        self.max_size = max_size or settings.SESSION_CACHE_MAX_SIZE
+        self.ttl = ttl or settings.SESSION_CACHE_TTL_SECONDS
+        # jti -> (expiration, session_token, données de session validées)
+        self._entries: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        # session_token -> jtis en cache (pour l'invalidation)
+        self._by_session: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, jti: str) -> Optional[Dict[str, Any]]:
+        """Retourne la session validée en cache, ou None"""
+        entry = self._entries.get(jti)
+        if not entry or entry[0] < time.monotonic():
+            if entry:
+                self._discard(jti)
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(jti)
+        self.hits += 1
+        return entry[2]
+    
+    def put(self, jti: str, session_token: str, session_data: Dict[str, Any]):
+        """Ajoute une session validée"""
+        self._discard(jti)
+        self._entries[jti] = (time.monotonic() + self.ttl, session_token, session_data)
+        self._by_session.setdefault(session_token, set()).add(jti)
+        
+        while len(self._entries) > self.max_size:
+            oldest_jti = next(iter(self._entries))
+            self._discard(oldest_jti)
+    
+    def invalidate_session(self, session_token: str):
+        """Retire toutes les entrées d'une session"""
+        for jti in list(self._by_session.get(session_token, ())):
+            self._discard(jti)
+    
+    def clear(self):
+        self._entries.clear()
+        self._by_session.clear()
+    
+    def _discard(self, jti: str):
+        entry = self._entries.pop(jti, None)
+        if not entry:
+            return
+        jtis = self._by_session.get(entry[1])
+        if jtis:
+            jtis.discard(jti)
+            if not jtis:
+                del self._by_session[entry[1]]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0
+        }
+
+
 class JWTManager:
     """Gestion des tokens JWT"""
     
@@ -292,6 +510,8 @@ class AuthenticationService:
     def __init__(self):
         self.session_manager = SessionManager()
         self.jwt_manager = JWTManager()
+        self.session_cache = VerifiedSessionCache()
+        self._invalidation_task: Optional[asyncio.Task] = None
     
     def hash_password(self, password: str) -> str:
         """Hashe un mot de passe"""
@@ -301,10 +521,11 @@ class AuthenticationService:
         """Vérifie un mot de passe"""
         return pwd_context.verify(plain_password, hashed_password)
     
-    def create_authenticated_session(
+    async def create_authenticated_session(
         self,
         user_id: str,
-        pronote_session_data: Dict[str, Any]
+        pronote_session_data: Dict[str, Any],
+        credentials: Optional[Dict[str, Any]] = None
     ) -> Dict[str, str]:
         """
         Crée une session complète avec JWT
@@ -312,15 +533,17 @@ class AuthenticationService:
         Args:
             user_id: Identifiant utilisateur
             pronote_session_data: Données de session Pronote
+            credentials: Identifiants pour la reconnexion silencieuse
         
         Returns:
             Dict avec access_token et session_token
         """
         try:
             # Créer la session Redis
-            session_token = self.session_manager.create_session(
+            session_token = await self.session_manager.create_session(
                 user_id=user_id,
-                pronote_data=pronote_session_data
+                pronote_data=pronote_session_data,
+                credentials=credentials
             )
             
             # Créer le JWT
@@ -340,7 +563,7 @@ class AuthenticationService:
             logger.error(f"Erreur création session authentifiée: {str(e)}")
             raise
     
-    def validate_session(self, access_token: str) -> Optional[Dict[str, Any]]:
+    async def validate_session(self, access_token: str) -> Optional[Dict[str, Any]]:
         """
         Valide un access token et retourne les données de session
         
@@ -351,13 +574,20 @@ class AuthenticationService:
             Données de session ou None
         """
         try:
-            # Vérifier le JWT
+            # Vérifier le JWT (signature et expiration, toujours)
             payload = self.jwt_manager.verify_token(access_token)
             if not payload:
                 return None
             
+            # Session validée récemment: ni Redis ni déchiffrement
+            jti = payload.get('jti')
+            if settings.SESSION_CACHE_ENABLED and jti:
+                cached = self.session_cache.get(jti)
+                if cached:
+                    return cached
+            
             # Récupérer la session Redis
-            session_data = self.session_manager.get_session(
+            session_data = await self.session_manager.get_session(
                 payload['session_token']
             )
             
@@ -365,17 +595,22 @@ class AuthenticationService:
                 logger.warning("Session Redis introuvable pour JWT valide")
                 return None
             
-            return {
+            validated = {
                 **session_data,
                 "user_id": payload['user_id'],
                 "jwt_payload": payload
             }
             
+            if settings.SESSION_CACHE_ENABLED and jti:
+                self.session_cache.put(jti, payload['session_token'], validated)
+            
+            return validated
+            
         except Exception as e:
             logger.error(f"Erreur validation session: {str(e)}")
             return None
     
-    def logout(self, access_token: str):
+    async def logout(self, access_token: str):
         """
         Déconnecte un utilisateur
         
@@ -385,10 +620,64 @@ class AuthenticationService:
         try:
             payload = self.jwt_manager.verify_token(access_token)
             if payload:
-                self.session_manager.delete_session(payload['session_token'])
+                await self.revoke_session(payload['session_token'])
                 logger.info(f"Déconnexion réussie pour {payload['user_id']}")
         except Exception as e:
             logger.error(f"Erreur déconnexion: {str(e)}")
+    
+    async def revoke_session(self, session_token: str):
+        """
+        Supprime une session et l'invalide immédiatement dans ce worker
+        (les autres workers sont prévenus par pub/sub)
+        
+        Args:
+            session_token: Token de session
+        """
+        self.session_cache.invalidate_session(session_token)
+        await self.session_manager.delete_session(session_token)
+    
+    def start_invalidation_listener(self):
+        """Démarre l'écoute des invalidations de session publiées par les autres workers"""
+        if settings.SESSION_CACHE_ENABLED and not self._invalidation_task:
+            self._invalidation_task = asyncio.create_task(self._listen_invalidations())
+    
+    async def stop_invalidation_listener(self):
+        """Arrête l'écoute des invalidations"""
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
+    
+    async def _listen_invalidations(self):
+        retry_delay = 1
+        while True:
+            try:
+                async with self.session_manager.redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(SESSION_INVALIDATION_CHANNEL)
+                    logger.info("Écoute des invalidations de session active")
+                    retry_delay = 1
+                    
+                    while True:
+                        # listen() lèverait un timeout à chaque socket_timeout sans trafic;
+                        # un délai explicite renvoie simplement None
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True,
+                            timeout=INVALIDATION_POLL_SECONDS
+                        )
+                        if message and message.get('type') == 'message':
+                            self.session_cache.invalidate_session(message['data'])
+                            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Sans abonnement, les entrées expirent d'elles-mêmes (TTL court)
+                self.session_cache.clear()
+                logger.warning(f"Écoute des invalidations interrompue: {str(e)}")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
 
 
 # Instance globale
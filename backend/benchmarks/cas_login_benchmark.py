@@ -0,0 +1,144 @@
+"""
+Benchmark des connexions CAS par ENT
+Compare la connexion complète (formulaire de l'ENT) à la connexion qui
+réutilise le cookie jar ENT de la connexion précédente
+
+Les comptes sont lus dans un fichier JSON (un compte réel par ENT à mesurer):
+    [
+        {
+            "ent_name": "ile_de_france",
+            "pronote_url": "https://0123456x.index-education.net/pronote/eleve.html",
+            "username": "prenom.nom",
+            "password_env": "MONLYCEE_PASSWORD"
+        }
+    ]
+
+Usage:
+    MONLYCEE_PASSWORD=... python benchmarks/cas_login_benchmark.py comptes.json
+    python benchmarks/cas_login_benchmark.py comptes.json --runs 5 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Une clé Fernet valide est nécessaire avant l'import de la configuration
+if not os.environ.get('ENCRYPTION_KEY'):
+    from cryptography.fernet import Fernet
+    os.environ['ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+
+from pronote_client import PronoteClient  # noqa: E402
+
+
+def summarize(samples: List[float]) -> Optional[Dict[str, float]]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 1),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1)
+    }
+
+
+async def login(account: Dict[str, Any], ent_cookies: Optional[List[Dict[str, Any]]]) -> PronoteClient:
+    client = PronoteClient()
+    await client.authenticate_cas(
+        pronote_url=account['pronote_url'],
+        username=account['username'],
+        password=account['password'],
+        ent_name=account['ent_name'],
+        ent_cookies=ent_cookies
+    )
+    return client
+
+
+async def bench_account(account: Dict[str, Any], runs: int) -> Dict[str, Any]:
+    full: List[float] = []
+    reuse: List[float] = []
+    reused = 0
+    errors = 0
+    ent_cookies = None
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            client = await login(account, None)
+        except Exception as e:
+            errors += 1
+            print(f"  {account['ent_name']}: échec connexion complète: {e}", file=sys.stderr)
+            continue
+        full.append(time.perf_counter() - start)
+        ent_cookies = client.ent_cookies
+
+    # Chaque reconnexion repart du cookie jar de la précédente, comme le pool de clients
+    for _ in range(runs if ent_cookies else 0):
+        start = time.perf_counter()
+        try:
+            client = await login(account, ent_cookies)
+        except Exception as e:
+            errors += 1
+            print(f"  {account['ent_name']}: échec reconnexion: {e}", file=sys.stderr)
+            continue
+        reuse.append(time.perf_counter() - start)
+        reused += client.ent_cookies_reused
+        ent_cookies = client.ent_cookies
+
+    full_stats, reuse_stats = summarize(full), summarize(reuse)
+    return {
+        "ent_name": account['ent_name'],
+        "full": full_stats,
+        "reuse": reuse_stats,
+        "reuse_hits": f"{reused}/{len(reuse)}",
+        "errors": errors,
+        "speedup_p50": (
+            round(full_stats['p50_ms'] / reuse_stats['p50_ms'], 2)
+            if full_stats and reuse_stats and reuse_stats['p50_ms'] else None
+        )
+    }
+
+
+def load_accounts(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        accounts = json.load(f)
+    for account in accounts:
+        if 'password_env' in account:
+            account['password'] = os.environ[account.pop('password_env')]
+    return accounts
+
+
+async def run(accounts: List[Dict[str, Any]], runs: int) -> List[Dict[str, Any]]:
+    # Séquentiel: on mesure la latence d'une connexion, pas le débit
+    return [await bench_account(account, runs) for account in accounts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des connexions CAS par ENT")
+    parser.add_argument('accounts', help="Fichier JSON des comptes (un par ENT)")
+    parser.add_argument('--runs', type=int, default=3, help="Connexions par mode et par ENT")
+    parser.add_argument('--json', action='store_true', help="Sortie JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(load_accounts(args.accounts), args.runs))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for result in report:
+        print(f"{result['ent_name']} (cookies réutilisés: {result['reuse_hits']}, erreurs: {result['errors']})")
+        for label in ("full", "reuse"):
+            stats = result[label]
+            if stats:
+                print(f"  {label:<5} mean={stats['mean_ms']}ms p50={stats['p50_ms']}ms max={stats['max_ms']}ms")
+        print(f"  gain p50: x{result['speedup_p50']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Faux serveur Pronote et faux ENT CAS pour les benchmarks
+Latence et taille des réponses configurables, sans contacter d'établissement réel
+
+- FakePronoteServer: serveur HTTP local (un thread par requête) qui simule
+  le formulaire CAS, la connexion Pronote et les récupérations
+- FakePronoteClient: remplaçant de pronotepy.Client (PronoteClient.client_class)
+  qui interroge ce serveur et expose les mêmes attributs que pronotepy
+- bench_cas: fonction ENT au format pronotepy (identifiants -> cookie jar)
+"""
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Optional, Dict, Any, List, Callable
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+
+class FakePronoteConfig:
+    """Paramètres du faux serveur (latence par requête et volume des réponses)"""
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 10.0,
+        homework_items: int = 20,
+        lessons_items: int = 30,
+        grades_per_period: int = 15,
+        periods: int = 3,
+        text_bytes: int = 200,
+        cas_redirects: int = 3
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.homework_items = homework_items
+        self.lessons_items = lessons_items
+        self.grades_per_period = grades_per_period
+        self.periods = periods
+        self.text_bytes = text_bytes
+        self.cas_redirects = cas_redirects
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+def _text(size: int, seed: int) -> str:
+    words = ("exercice", "chapitre", "lire", "rédiger", "réviser", "page", "leçon", "contrôle")
+    rng = random.Random(seed)
+    out = []
+    while sum(len(w) + 1 for w in out) < size:
+        out.append(rng.choice(words))
+    return " ".join(out)[:size]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakePronoteServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _sleep(self):
+        config = self.server.config
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+    def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode() if not isinstance(body, bytes) else body
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _cookie(self, name: str) -> Optional[str]:
+        for part in (self.headers.get("Cookie") or "").split(";"):
+            key, _, value = part.strip().partition("=")
+            if key == name:
+                return value
+        return None
+
+    def do_GET(self):
+        self._sleep()
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        config = self.server.config
+
+        if url.path.startswith("/cas/step/"):
+            # Redirections et pages intermédiaires de l'ENT
+            self._send(200, b"<html>" + b"x" * config.text_bytes + b"</html>")
+        elif url.path == "/pronote/login":
+            ticket = self._cookie("TGC")
+            if ticket and ticket in self.server.tickets:
+                username = self.server.tickets[ticket]
+            elif query.get("password") == self.server.password:
+                username = query.get("username", "eleve")
+            else:
+                self._send(401, {"error": "identifiants incorrects"})
+                return
+            self._send(200, {
+                "name": f"Élève {username}",
+                "class_name": "2nde A",
+                "establishment": "Lycée de démonstration"
+            })
+        elif url.path == "/pronote/homework":
+            self._send(200, self.server.homework(query["from"]))
+        elif url.path == "/pronote/lessons":
+            self._send(200, self.server.lessons(query["from"]))
+        elif url.path == "/pronote/grades":
+            self._send(200, self.server.grades(int(query["period"])))
+        elif url.path == "/pronote/session_check":
+            self._send(200, {"refreshed": False})
+        else:
+            self._send(404, {"error": "inconnu"})
+
+    def do_POST(self):
+        self._sleep()
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        if self.path != "/cas/login" or form.get("password", [""])[0] != self.server.password:
+            self._send(401, {"error": "identifiants ENT incorrects"})
+            return
+
+        ticket = f"TGT-{random.getrandbits(64):x}"
+        self.server.tickets[ticket] = form.get("username", ["eleve"])[0]
+        self._send(200, {"ok": True}, {"Set-Cookie": f"TGC={ticket}; Path=/"})
+
+
+class FakePronoteServer(ThreadingHTTPServer):
+    """Faux serveur Pronote + CAS, démarré dans un thread"""
+
+    daemon_threads = True
+
+    def __init__(self, config: FakePronoteConfig, password: str = "bench", port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.config = config
+        self.password = password
+        self.tickets: Dict[str, str] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakePronoteServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def homework(self, date_from: str) -> List[Dict[str, Any]]:
+        start = datetime.fromisoformat(date_from)
+        return [
+            {
+                "id": f"hw{i}",
+                "subject": f"Matière {i % 8}",
+                "description": _text(self.config.text_bytes, i),
+                "done": i % 3 == 0,
+                "date": (start + timedelta(days=i % 14)).isoformat()
+            }
+            for i in range(self.config.homework_items)
+        ]
+
+    def lessons(self, date_from: str) -> List[Dict[str, Any]]:
+        start = datetime.fromisoformat(date_from).replace(hour=8)
+        return [
+            {
+                "id": f"lesson{i}",
+                "subject": f"Matière {i % 8}",
+                "teacher_name": f"M. Professeur {i % 5}",
+                "classroom": f"Salle {100 + i % 20}",
+                "start": (start + timedelta(days=i // 6, hours=i % 6)).isoformat(),
+                "end": (start + timedelta(days=i // 6, hours=i % 6 + 1)).isoformat()
+            }
+            for i in range(self.config.lessons_items)
+        ]
+
+    def grades(self, period: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": f"grade{period}-{i}",
+                "subject": f"Matière {i % 8}",
+                "grade": str(8 + (i * 7) % 12),
+                "out_of": "20",
+                "date": (datetime(2024, 9, 1) + timedelta(days=period * 90 + i * 5)).isoformat(),
+                "coefficient": "1",
+                "comment": _text(self.config.text_bytes // 4, i)
+            }
+            for i in range(self.config.grades_per_period)
+        ]
+
+
+# Faux serveur utilisé, fixé par le benchmark avant toute connexion
+_server: Optional[FakePronoteServer] = None
+
+
+def use_server(server: FakePronoteServer):
+    """Dirige FakePronoteClient et bench_cas vers ce serveur (même processus)"""
+    global _server
+    _server = server
+
+
+def _subject(name: str) -> SimpleNamespace:
+    return SimpleNamespace(name=name)
+
+
+class _FakePeriod:
+    def __init__(self, client: "FakePronoteClient", index: int):
+        self._client = client
+        self._index = index
+        self.name = f"Trimestre {index + 1}"
+
+    @property
+    def grades(self) -> List[SimpleNamespace]:
+        # Comme pronotepy, les notes sont récupérées à l'accès
+        items = self._client._get("/pronote/grades", period=self._index)
+        return [
+            SimpleNamespace(
+                id=g["id"],
+                subject=_subject(g["subject"]),
+                grade=g["grade"],
+                out_of=g["out_of"],
+                date=datetime.fromisoformat(g["date"]).date(),
+                coefficient=g["coefficient"],
+                comment=g["comment"]
+            )
+            for g in items
+        ]
+
+
+class FakePronoteClient:
+    """
+    Remplaçant de pronotepy.Client pour les benchmarks
+
+    Même signature que pronotepy.Client(pronote_url, username, password, ent=None):
+    avec un ENT, ses cookies (TGC) sont présentés au faux Pronote au lieu
+    des identifiants, comme la redirection CAS de pronotepy.
+    """
+
+    def __init__(self, pronote_url: str, username: str = "", password: str = "", ent: Optional[Callable] = None):
+        self.pronote_url = pronote_url
+        self.username = username
+        self.password = password
+        self.ent = ent
+        self.session = requests.Session()
+
+        if ent:
+            self.session.cookies.update(ent(username, password))
+            response = self.session.get(f"{_server.base_url}/pronote/login")
+        else:
+            response = self.session.get(
+                f"{_server.base_url}/pronote/login",
+                params={"username": username, "password": password}
+            )
+
+        self.logged_in = response.status_code == 200
+        info = response.json() if self.logged_in else {}
+        self.info = SimpleNamespace(**info)
+        self.periods = [_FakePeriod(self, i) for i in range(_server.config.periods)]
+        self.current_period = self.periods[-1]
+
+    def _get(self, path: str, **params) -> Any:
+        response = self.session.get(f"{_server.base_url}{path}", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def session_check(self) -> bool:
+        return self._get("/pronote/session_check")["refreshed"]
+
+    def homework(self, date_from: datetime, date_to: Optional[datetime] = None) -> List[SimpleNamespace]:
+        items = self._get("/pronote/homework", **{"from": date_from.isoformat()})
+        return [
+            SimpleNamespace(
+                id=h["id"],
+                subject=_subject(h["subject"]),
+                description=h["description"],
+                done=h["done"],
+                date=datetime.fromisoformat(h["date"]).date(),
+                files=[]
+            )
+            for h in items
+        ]
+
+    def lessons(self, date_from: datetime, date_to: Optional[datetime] = None) -> List[SimpleNamespace]:
+        items = self._get("/pronote/lessons", **{"from": date_from.isoformat()})
+        return [
+            SimpleNamespace(
+                id=lesson["id"],
+                subject=_subject(lesson["subject"]),
+                teacher_name=lesson["teacher_name"],
+                classroom=lesson["classroom"],
+                start=datetime.fromisoformat(lesson["start"]),
+                end=datetime.fromisoformat(lesson["end"]),
+                status=None,
+                canceled=False
+            )
+            for lesson in items
+        ]
+
+
+def bench_cas(username: str, password: str, **kwargs) -> requests.cookies.RequestsCookieJar:
+    """Faux ENT: pages intermédiaires puis formulaire, renvoie le cookie jar (TGC)"""
+    session = requests.Session()
+    for step in range(_server.config.cas_redirects):
+        session.get(f"{_server.base_url}/cas/step/{step}")
+    response = session.post(
+        f"{_server.base_url}/cas/login",
+        data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return session.cookies
@@ -0,0 +1,286 @@
+"""
+Benchmark des connexions et récupérations Pronote à travers l'application
+Un faux serveur Pronote/CAS local (benchmarks/fake_pronote.py) remplace les
+établissements; les requêtes passent par l'app FastAPI réelle (httpx ASGITransport):
+routes, sessions Redis, pool de clients, exécuteur, cache, disjoncteurs.
+
+Mesure, pour chaque niveau de concurrence: connexion directe, connexion CAS,
+devoirs, emploi du temps et notes (débit, p50, p99, erreurs), et écrit un
+rapport JSON pour suivre les régressions.
+
+Redis: fakeredis en mémoire par défaut (pip install fakeredis), ou un vrai
+serveur avec --redis real (REDIS_URL, base dédiée conseillée).
+
+Usage (depuis backend/):
+    python benchmarks/pronote_benchmark.py
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/pronote_benchmark.py --redis real
+    python benchmarks/pronote_benchmark.py --concurrency 1,10,50 --requests 200 \\
+        --latency-ms 80 --homework-items 50 --output rapport.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Awaitable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from loadtest import environment  # noqa: E402
+
+PASSWORD = "bench"
+
+# Opération: (client HTTP, index de l'utilisateur) -> réponse
+Operation = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"mean_ms": None, "p50_ms": None, "p99_ms": None}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2),
+        "p50_ms": round(percentile(0.50) * 1000, 2),
+        "p99_ms": round(percentile(0.99) * 1000, 2)
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+
+
+class Benchmark:
+    """Utilisateurs virtuels répartis sur plusieurs établissements (hôtes Pronote)"""
+
+    def __init__(self, users: int, schools: int, cold_cache: bool):
+        self.users = users
+        self.schools = schools
+        self.cold_cache = cold_cache
+        self.tokens: Dict[int, str] = {}
+        # Sessions à fermer en fin de benchmark
+        self.created: List[str] = []
+
+    def pronote_url(self, user: int) -> str:
+        return f"https://bench{user % self.schools:03d}.index-education.net/pronote/eleve.html"
+
+    def username(self, user: int) -> str:
+        return f"bench{user}"
+
+    def headers(self, user: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[user]}"}
+
+    async def login_direct(self, http: httpx.AsyncClient, user: int) -> httpx.Response:
+        response = await http.post("/api/auth/login/direct", json={
+            "pronote_url": self.pronote_url(user),
+            "username": self.username(user),
+            "password": PASSWORD
+        })
+        if response.status_code == 200:
+            self.tokens[user] = response.json()['access_token']
+            self.created.append(self.tokens[user])
+        return response
+
+    async def login_cas(self, http: httpx.AsyncClient, user: int) -> httpx.Response:
+        response = await http.post("/api/auth/login/cas", json={
+            "pronote_url": self.pronote_url(user),
+            "username": self.username(user),
+            "password": PASSWORD,
+            "ent_name": "bench_cas"
+        })
+        if response.status_code == 200:
+            self.created.append(response.json()['access_token'])
+        return response
+
+    def fetch(self, path: str, body: Any = None) -> Operation:
+        async def call(http: httpx.AsyncClient, user: int) -> httpx.Response:
+            return await http.post(path, json=body, headers=self.headers(user))
+        return call
+
+    async def reset_cache(self, user: int):
+        """Vide le cache des données de l'utilisateur (mesure du chemin jusqu'à Pronote)"""
+        from cache import response_cache, ResponseCache
+
+        await response_cache.invalidate_user(ResponseCache.user_key({
+            "pronote_url": self.pronote_url(user),
+            "username": self.username(user)
+        }))
+
+    async def measure(
+        self,
+        http: httpx.AsyncClient,
+        name: str,
+        operation: Operation,
+        concurrency: int,
+        requests: int,
+        needs_session: bool
+    ) -> Dict[str, Any]:
+        samples: List[float] = []
+        errors: Dict[str, int] = {}
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                user = i % self.users
+                if needs_session and user not in self.tokens:
+                    errors["no_session"] = errors.get("no_session", 0) + 1
+                    continue
+                # L'invalidation du cache (mode froid) n'est pas chronométrée
+                if needs_session and self.cold_cache:
+                    await self.reset_cache(user)
+                start = time.perf_counter()
+                try:
+                    response = await operation(http, user)
+                except Exception as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    continue
+                if response.status_code == 200:
+                    samples.append(time.perf_counter() - start)
+                else:
+                    code = str(response.status_code)
+                    errors[code] = errors.get(code, 0) + 1
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started_at
+
+        return {
+            "operation": name,
+            "concurrency": concurrency,
+            "requests": requests,
+            "ok": len(samples),
+            "errors": sum(errors.values()),
+            "error_codes": errors,
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+            **summarize(samples)
+        }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # Importés après environment.configure(): settings et pool Redis sont créés à l'import
+    from config import settings
+    from server import app, limiter
+    from pronote_client import PronoteClient
+    from ent_registry import ent_registry
+    from benchmarks.fake_pronote import (
+        FakePronoteConfig, FakePronoteServer, FakePronoteClient, bench_cas, use_server
+    )
+
+    config = FakePronoteConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        homework_items=args.homework_items,
+        lessons_items=args.lessons_items,
+        grades_per_period=args.grades_per_period,
+        text_bytes=args.text_bytes,
+        cas_redirects=args.cas_redirects
+    )
+    server = FakePronoteServer(config, password=PASSWORD).start()
+    use_server(server)
+
+    # Branchement du faux Pronote et du faux ENT dans l'application réelle
+    PronoteClient.client_class = FakePronoteClient
+    ent_registry.register(bench_cas)
+    # Les limites par IP (toutes les requêtes viennent du même client) fausseraient la mesure
+    limiter.enabled = False
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    bench = Benchmark(args.users, args.schools, cold_cache=not args.warm_cache)
+    # (nom, opération, nécessite une session de login_direct)
+    operations = [
+        ("login_direct", bench.login_direct, False),
+        ("login_cas", bench.login_cas, False),
+        ("homework", bench.fetch("/api/pronote/homework", {}), True),
+        ("timetable", bench.fetch("/api/pronote/timetable", {}), True),
+        ("grades", bench.fetch("/api/pronote/grades"), True)
+    ]
+
+    results = []
+    # Démarrage/arrêt de l'application déclenchés à la main (ASGITransport ne gère pas le lifespan)
+    await app.router.startup()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+            for level in levels:
+                for name, operation, needs_session in operations:
+                    result = await bench.measure(http, name, operation, level, args.requests, needs_session)
+                    results.append(result)
+                    print(
+                        f"{name:<13} c={level:<4} {result['throughput_rps']} req/s "
+                        f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms erreurs={result['errors']}",
+                        file=sys.stderr
+                    )
+
+            # Nettoyage des sessions créées
+            for token in bench.created:
+                await http.post("/api/auth/logout", headers={"Authorization": f"Bearer {token}"})
+    finally:
+        server.stop()
+        await app.router.shutdown()
+
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "git_commit": git_commit(),
+        "fake_server": config.to_dict(),
+        "users": args.users,
+        "schools": args.schools,
+        "cache": "warm" if args.warm_cache else "cold",
+        "redis": args.redis,
+        "settings": {
+            "PRONOTE_EXECUTOR_WORKERS": settings.PRONOTE_EXECUTOR_WORKERS,
+            "PRONOTE_EXECUTOR_QUEUE_SIZE": settings.PRONOTE_EXECUTOR_QUEUE_SIZE,
+            "PRONOTE_HOST_RATE_PER_SECOND": settings.PRONOTE_HOST_RATE_PER_SECOND,
+            "PRONOTE_HOST_BURST": settings.PRONOTE_HOST_BURST,
+            "REDIS_URL": settings.REDIS_URL
+        },
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Pronote à travers l'application (faux serveur local)")
+    parser.add_argument('--concurrency', default="1,10,50", help="Niveaux de concurrence (séparés par des virgules)")
+    parser.add_argument('--requests', type=int, default=100, help="Requêtes par opération et par niveau")
+    parser.add_argument('--users', type=int, default=50, help="Utilisateurs virtuels")
+    parser.add_argument('--schools', type=int, default=10, help="Établissements (hôtes Pronote) distincts")
+    parser.add_argument('--redis', choices=("fake", "real"), default="fake",
+                        help="fake: fakeredis en mémoire; real: REDIS_URL (base dédiée conseillée)")
+    parser.add_argument('--warm-cache', action='store_true', help="Ne pas vider le cache avant chaque récupération")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Latence du faux serveur par requête")
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--homework-items', type=int, default=20)
+    parser.add_argument('--lessons-items', type=int, default=30)
+    parser.add_argument('--grades-per-period', type=int, default=15)
+    parser.add_argument('--text-bytes', type=int, default=200, help="Taille des textes (descriptions, pages CAS)")
+    parser.add_argument('--cas-redirects', type=int, default=3, help="Pages intermédiaires du faux ENT")
+    parser.add_argument('--output', help="Fichier du rapport JSON (sinon sortie standard)")
+    args = parser.parse_args()
+
+    # Avant tout import de l'application (settings, pool Redis)
+    environment.configure(args.redis)
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Rapport écrit dans {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark de SessionManager.get_session
+Compare l'ancien chemin de lecture (GET + déchiffrement + rechiffrement + SETEX)
+au chemin actuel (GET + EXPIRE pipelinés, un seul déchiffrement)
+
+Usage (Redis local, base dédiée):
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/session_benchmark.py
+    python benchmarks/session_benchmark.py --iterations 5000 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Une clé Fernet valide est nécessaire avant l'import de la configuration
+if not os.environ.get('ENCRYPTION_KEY'):
+    from cryptography.fernet import Fernet
+    os.environ['ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+
+from config import settings  # noqa: E402
+from auth import SessionManager  # noqa: E402
+
+
+async def legacy_get_session(manager: SessionManager, session_token: str) -> Dict[str, Any]:
+    """Reproduction de l'ancien get_session (réécriture complète à chaque lecture)"""
+    session_key = f"session:{session_token}"
+    session_data = json.loads(await manager.redis_client.get(session_key))
+    session_data['pronote_data'] = manager._decrypt_data(session_data['pronote_data'])
+    session_data['last_activity'] = datetime.utcnow().isoformat()
+    await manager.redis_client.setex(
+        session_key,
+        settings.SESSION_EXPIRATION_SECONDS,
+        json.dumps({
+            **session_data,
+            'pronote_data': manager._encrypt_data(session_data['pronote_data'])
+        })
+    )
+    return session_data
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+        "p50_ms": round(percentile(0.50) * 1000, 3),
+        "p95_ms": round(percentile(0.95) * 1000, 3),
+        "p99_ms": round(percentile(0.99) * 1000, 3)
+    }
+
+
+async def measure(fn, manager: SessionManager, session_token: str, iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn(manager, session_token)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def run(iterations: int, warmup: int) -> Dict[str, Any]:
+    manager = SessionManager()
+    session_token = await manager.create_session(
+        user_id="benchmark",
+        pronote_data={
+            "pronote_url": "https://demo.index-education.net/pronote/eleve.html",
+            "username": "demonstration",
+            "auth_type": "direct",
+            "session_info": {"student_name": "Élève Démo", "class_name": "2nde A"}
+        },
+        credentials={"password": "benchmark"}
+    )
+
+    async def current_get_session(m: SessionManager, token: str):
+        return await m.get_session(token)
+
+    try:
+        for fn in (legacy_get_session, current_get_session):
+            await measure(fn, manager, session_token, warmup)
+
+        legacy = summarize(await measure(legacy_get_session, manager, session_token, iterations))
+        current = summarize(await measure(current_get_session, manager, session_token, iterations))
+    finally:
+        await manager.delete_session(session_token)
+
+    return {
+        "iterations": iterations,
+        "redis_url": settings.REDIS_URL,
+        "before": legacy,
+        "after": current,
+        "speedup_p50": round(legacy['p50_ms'] / current['p50_ms'], 2) if current['p50_ms'] else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la lecture de session")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--json', action='store_true', help="Sortie JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.iterations, args.warmup))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"get_session, {report['iterations']} itérations ({report['redis_url']})")
+    for label in ("before", "after"):
+        stats = report[label]
+        print(
+            f"  {label:<6} mean={stats['mean_ms']}ms p50={stats['p50_ms']}ms "
+            f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms"
+        )
+    print(f"  gain p50: x{report['speedup_p50']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Cache Redis des réponses Pronote (devoirs, emploi du temps, notes)
+Lecture à travers le cache avec service des données périmées pendant le rafraîchissement
+"""
+import asyncio
+import hashlib
+import json
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable, Set
+from loguru import logger
+
+from config import settings
+from redis_pool import get_redis
+from singleflight import pronote_flight, pronote_redis_flight
+from metrics import record_cache
+
+
+class ResponseCache:
+    """
+    Cache des données Pronote par utilisateur et paramètres
+
+    - Frais (âge < TTL de la ressource): servi directement
+    - Périmé (âge < TTL + CACHE_STALE_SECONDS): servi, puis rafraîchi en arrière-plan
+    - Absent ou expiré: récupéré auprès de Pronote puis stocké
+
+    Les récupérations concurrentes d'une même clé sont regroupées
+    (single-flight en mémoire, et verrou Redis entre workers).
+    """
+
+    def __init__(self):
+        self.redis_client = get_redis()
+        self.ttls = {
+            "homework": settings.CACHE_TTL_HOMEWORK_SECONDS,
+            "timetable": settings.CACHE_TTL_TIMETABLE_SECONDS,
+            "grades": settings.CACHE_TTL_GRADES_SECONDS
+        }
+        self.stale_seconds = settings.CACHE_STALE_SECONDS
+        # Rafraîchissements en arrière-plan (référencés pour ne pas être collectés)
+        self._refreshing: Set[str] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def user_key(pronote_data: Dict[str, Any]) -> str:
+        """
+        Identifiant de cache stable d'un utilisateur (indépendant de la session)
+
+        Args:
+            pronote_data: Données Pronote de la session
+
+        Returns:
+            Empreinte de l'URL Pronote et de l'identifiant
+        """
+        raw = f"{pronote_data['pronote_url']}|{pronote_data['username']}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    @staticmethod
+    def compute_etag(data: Any) -> str:
+        """ETag fort calculé sur le contenu JSON canonique"""
+        canonical = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        return f'"{hashlib.sha256(canonical.encode()).hexdigest()[:32]}"'
+
+    def _key(self, user_key: str, resource: str, params: Dict[str, Any]) -> str:
+        params_str = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        params_hash = hashlib.sha256(params_str.encode()).hexdigest()[:16]
+        return f"cache:{resource}:{user_key}:{params_hash}"
+
+    async def get_or_fetch(
+        self,
+        user_key: str,
+        resource: str,
+        params: Dict[str, Any],
+        fetcher: Callable[[], Awaitable[Any]]
+    ) -> Dict[str, Any]:
+        """
+        Retourne les données en cache ou les récupère via fetcher
+
+        Args:
+            user_key: Identifiant de cache de l'utilisateur (voir user_key)
+            resource: "homework", "timetable" ou "grades"
+            params: Paramètres de la requête (plage de dates, période)
+            fetcher: Coroutine qui interroge Pronote
+
+        Returns:
+            Dict avec data, etag, max_age (secondes de fraîcheur restantes) et stale
+        """
+        key = self._key(user_key, resource, params)
+        ttl = self.ttls[resource]
+
+        entry = await self._read(key)
+        if entry:
+            # Une entrée préchargée peut avoir une durée de fraîcheur plus longue
+            ttl = entry.get('fresh_for', ttl)
+            age = time.time() - entry['fetched_at']
+            if age < ttl:
+                record_cache(resource, "hit")
+                return self._result(entry, ttl - age, stale=False)
+
+            # Périmé: servir immédiatement et rafraîchir en arrière-plan
+            record_cache(resource, "stale")
+            self._schedule_refresh(key, resource, fetcher)
+            return self._result(entry, 0, stale=True)
+
+        record_cache(resource, "miss")
+        entry = await self._load(key, resource, fetcher)
+        age = time.time() - entry['fetched_at']
+        return self._result(entry, max(0, ttl - age), stale=False)
+
+    async def warm(
+        self,
+        user_key: str,
+        resource: str,
+        params: Dict[str, Any],
+        fetcher: Callable[[], Awaitable[Any]],
+        fresh_for: int
+    ) -> bool:
+        """
+        Précharge une entrée, considérée fraîche pendant fresh_for secondes
+
+        Args:
+            user_key: Identifiant de cache de l'utilisateur
+            resource: "homework", "timetable" ou "grades"
+            params: Paramètres tels que les construira la requête de l'utilisateur
+            fetcher: Coroutine qui interroge Pronote
+            fresh_for: Durée de fraîcheur de l'entrée préchargée
+
+        Returns:
+            True si Pronote a été interrogé, False si l'entrée était déjà fraîche
+        """
+        key = self._key(user_key, resource, params)
+        entry = await self._read(key)
+        # Déjà préchargée (ou rafraîchie) récemment: pas de nouvel appel Pronote
+        if entry and time.time() - entry['fetched_at'] < entry.get('fresh_for', self.ttls[resource]) / 2:
+            return False
+
+        await pronote_flight.do(
+            key,
+            lambda: self._fetch_and_store(key, resource, fetcher, fresh_for=fresh_for)
+        )
+        return True
+
+    async def invalidate_user(self, user_key: str):
+        """
+        Supprime toutes les entrées en cache d'un utilisateur
+
+        Args:
+            user_key: Identifiant de cache de l'utilisateur
+        """
+        try:
+            keys = [
+                key async for key in self.redis_client.scan_iter(match=f"cache:*:{user_key}:*")
+            ]
+            if keys:
+                await self.redis_client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Erreur invalidation cache: {str(e)}")
+
+    async def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.redis_client.get(key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            # Le cache ne doit jamais faire échouer une requête
+            logger.warning(f"Erreur lecture cache {key}: {str(e)}")
+            return None
+
+    async def _load(
+        self,
+        key: str,
+        resource: str,
+        fetcher: Callable[[], Awaitable[Any]]
+    ) -> Dict[str, Any]:
+        """Récupère auprès de Pronote avec un seul appel en vol par clé"""
+        ttl = self.ttls[resource]
+
+        async def recheck():
+            # Un autre worker a pu remplir le cache pendant l'attente du verrou
+            entry = await self._read(key)
+            if entry and time.time() - entry['fetched_at'] < entry.get('fresh_for', ttl):
+                return entry
+            return None
+
+        async def load():
+            if settings.SINGLEFLIGHT_DISTRIBUTED:
+                return await pronote_redis_flight.do(
+                    key,
+                    lambda: self._fetch_and_store(key, resource, fetcher),
+                    recheck=recheck
+                )
+            return await self._fetch_and_store(key, resource, fetcher)
+
+        return await pronote_flight.do(key, load)
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        resource: str,
+        fetcher: Callable[[], Awaitable[Any]],
+        fresh_for: Optional[int] = None
+    ) -> Dict[str, Any]:
+        data = await fetcher()
+        entry = {
+            "data": data,
+            "etag": self.compute_etag(data),
+            "fetched_at": time.time()
+        }
+        if fresh_for:
+            entry['fresh_for'] = fresh_for
+
+        try:
+            await self.redis_client.setex(
+                key,
+                (fresh_for or self.ttls[resource]) + self.stale_seconds,
+                json.dumps(entry)
+            )
+        except Exception as e:
+            logger.warning(f"Erreur écriture cache {key}: {str(e)}")
+
+        return entry
+
+    def _schedule_refresh(
+        self,
+        key: str,
+        resource: str,
+        fetcher: Callable[[], Awaitable[Any]]
+    ):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._load(key, resource, fetcher)
+                logger.info(f"Cache {resource} rafraîchi en arrière-plan")
+            except Exception as e:
+                logger.warning(f"Échec rafraîchissement cache {resource}: {str(e)}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    @staticmethod
+    def _result(entry: Dict[str, Any], max_age: float, stale: bool) -> Dict[str, Any]:
+        return {
+            "data": entry['data'],
+            "etag": entry['etag'],
+            "max_age": int(max_age),
+            "stale": stale
+        }
+
+
+# Instance globale
+response_cache = ResponseCache()
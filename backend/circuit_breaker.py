@@ -0,0 +1,142 @@
+"""
+Disjoncteur par hôte Pronote (circuit breaker)
+Un établissement qui ne répond plus est court-circuité au lieu d'occuper les threads pronotepy
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Any
+
+from config import settings
+
+
+class CircuitOpenError(Exception):
+    """Le disjoncteur de l'hôte est ouvert: appel refusé sans contacter Pronote"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Pronote {host} indisponible, réessayez dans {int(retry_after) + 1}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur d'un hôte
+
+    - fermé: les appels passent; après failure_threshold échecs
+      consécutifs, il s'ouvre
+    - ouvert: les appels échouent immédiatement pendant open_seconds
+    - semi-ouvert: au-delà, half_open_probes appels d'essai passent;
+      un succès le referme, un échec le rouvre
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host: str, failure_threshold: int, open_seconds: float, half_open_probes: int):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def before_call(self):
+        """
+        À appeler avant chaque appel Pronote
+
+        Raises:
+            CircuitOpenError: Disjoncteur ouvert (ou essais semi-ouverts déjà en cours)
+        """
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.host, remaining)
+            self.state = self.HALF_OPEN
+            self._probes = 0
+
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                self.rejected += 1
+                raise CircuitOpenError(self.host, self.open_seconds)
+            self._probes += 1
+
+    def on_success(self):
+        if self.state == self.HALF_OPEN:
+            self.state = self.CLOSED
+        self._failures = 0
+
+    def on_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+
+    def on_neutral(self):
+        """Appel terminé sans verdict sur l'hôte (ex: identifiants refusés)"""
+        if self.state == self.HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def _open(self):
+        if self.state != self.OPEN:
+            self.opened += 1
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._failures = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
+
+
+class CircuitBreakerRegistry:
+    """Disjoncteurs par hôte, créés à la demande (nombre borné, LRU)"""
+
+    def __init__(self, max_hosts: int = 10000):
+        self.failure_threshold = settings.PRONOTE_BREAKER_FAILURE_THRESHOLD
+        self.open_seconds = settings.PRONOTE_BREAKER_OPEN_SECONDS
+        self.half_open_probes = settings.PRONOTE_BREAKER_HALF_OPEN_PROBES
+        self.max_hosts = max_hosts
+        self._breakers: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+
+    def get(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                host, self.failure_threshold, self.open_seconds, self.half_open_probes
+            )
+            self._breakers[host] = breaker
+            while len(self._breakers) > self.max_hosts:
+                # Les disjoncteurs fermés les plus anciens sont oubliés en premier
+                oldest = next(
+                    (h for h, b in self._breakers.items() if b.state == CircuitBreaker.CLOSED),
+                    next(iter(self._breakers))
+                )
+                del self._breakers[oldest]
+        else:
+            self._breakers.move_to_end(host)
+        return breaker
+
+    def stats(self) -> Dict[str, Any]:
+        """Hôtes suivis et disjoncteurs non fermés (exposés par /api/health)"""
+        return {
+            "hosts": len(self._breakers),
+            "open": {
+                host: breaker.to_dict()
+                for host, breaker in self._breakers.items()
+                if breaker.state != CircuitBreaker.CLOSED
+            }
+        }
+
+
+# Instance globale
+pronote_breakers = CircuitBreakerRegistry()
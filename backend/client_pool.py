@@ -0,0 +1,229 @@
+"""
+Pool de clients Pronote authentifiés
+Garde en mémoire les sessions pronotepy actives, indexées par token de session
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+from loguru import logger
+
+from config import settings
+from pronote_client import PronoteClient, PronoteException
+from auth import auth_service
+
+
+class PronoteClientPool:
+    """
+    Pool LRU de clients Pronote déjà connectés
+
+    Clé: token de session Redis (SessionManager)
+    Éviction: client inutilisé depuis plus de idle_ttl secondes,
+    ou le moins récemment utilisé quand max_size est atteint
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        idle_ttl: Optional[int] = None
+    ):
+        self.max_size = max_size or settings.PRONOTE_POOL_MAX_SIZE
+        self.idle_ttl = idle_ttl or settings.PRONOTE_POOL_IDLE_TTL_SECONDS
+        # Ordre = du moins récemment utilisé au plus récent
+        self._clients: "OrderedDict[str, Tuple[PronoteClient, float]]" = OrderedDict()
+        # Reconnexions / vérifications en cours, partagées entre requêtes concurrentes
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def acquire(
+        self,
+        session_token: str,
+        session_data: Dict[str, Any]
+    ) -> PronoteClient:
+        """
+        Retourne un client connecté pour la session, en se reconnectant si besoin
+
+        Un client inactif depuis plus de PRONOTE_SESSION_CHECK_SECONDS est
+        vérifié (et renouvelé par pronotepy si la session a expiré). Sans
+        client en mémoire, une reconnexion est faite avec les identifiants
+        chiffrés de la session. Les requêtes concurrentes d'une même session
+        partagent la même reconnexion.
+
+        Args:
+            session_token: Token de session
+            session_data: Données de session (retournées par validate_session)
+
+        Returns:
+            Client Pronote connecté
+
+        Raises:
+            PronoteException: Reconnexion impossible
+        """
+        entry = self._clients.get(session_token)
+        if entry and time.monotonic() - entry[1] < settings.PRONOTE_SESSION_CHECK_SECONDS:
+            client = self.get(session_token)
+            if client:
+                return client
+
+        task = self._inflight.get(session_token)
+        if task is None:
+            task = asyncio.ensure_future(self._prepare(session_token, session_data))
+            self._inflight[session_token] = task
+            task.add_done_callback(lambda _: self._inflight.pop(session_token, None))
+
+        # shield: l'annulation d'une requête n'interrompt pas la reconnexion partagée
+        return await asyncio.shield(task)
+
+    async def _prepare(
+        self,
+        session_token: str,
+        session_data: Dict[str, Any]
+    ) -> PronoteClient:
+        """Vérifie le client existant ou en crée un nouveau (un seul appel par session)"""
+        client = self.get(session_token)
+        if client:
+            try:
+                await client.refresh_if_expired()
+                return client
+            except PronoteException as e:
+                logger.warning(f"Client Pronote inutilisable, reconnexion: {str(e)}")
+                self.remove(session_token)
+
+        logger.info(f"Reconnexion silencieuse Pronote: {session_token[:10]}...")
+        client = await self.connect_detached(session_token, session_data)
+        self.put(session_token, client)
+        return client
+
+    async def connect_detached(
+        self,
+        session_token: str,
+        session_data: Dict[str, Any]
+    ) -> PronoteClient:
+        """
+        Connecte un client avec les identifiants chiffrés de la session, sans l'ajouter au pool
+
+        Utilisé tel quel par le préchargement, pour ne pas évincer les
+        clients des utilisateurs actifs; l'appelant ferme le client.
+
+        Raises:
+            PronoteException: Reconnexion impossible
+        """
+        credentials = auth_service.session_manager.get_credentials(session_data)
+        if not credentials:
+            raise PronoteException("Session Pronote expirée, veuillez vous reconnecter")
+
+        client = PronoteClient()
+        await client.login_from_session(session_data['pronote_data'], credentials)
+
+        # Nouveau cookie jar ENT (connexion CAS complète): le conserver pour la prochaine fois
+        if client.ent_cookies and client.ent_cookies != credentials.get('ent_cookies'):
+            await auth_service.session_manager.update_credentials(
+                session_token, {"ent_cookies": client.ent_cookies}
+            )
+        return client
+
+    def get(self, session_token: str) -> Optional[PronoteClient]:
+        """
+        Récupère le client associé à une session
+
+        Args:
+            session_token: Token de session
+
+        Returns:
+            Client Pronote connecté ou None
+        """
+        self.purge_expired()
+
+        entry = self._clients.get(session_token)
+        if not entry:
+            return None
+
+        client, _ = entry
+        if not client.client or not client.client.logged_in:
+            self.remove(session_token)
+            return None
+
+        # Marquer comme récemment utilisé
+        self._clients[session_token] = (client, time.monotonic())
+        self._clients.move_to_end(session_token)
+        return client
+
+    def peek(self, session_token: str) -> Optional[PronoteClient]:
+        """Client connecté de la session, sans le marquer comme récemment utilisé"""
+        entry = self._clients.get(session_token)
+        if entry and entry[0].client and entry[0].client.logged_in:
+            return entry[0]
+        return None
+
+    def put(self, session_token: str, client: PronoteClient):
+        """
+        Ajoute (ou remplace) le client d'une session
+
+        Args:
+            session_token: Token de session
+            client: Client Pronote authentifié
+        """
+        self.purge_expired()
+
+        previous = self._clients.pop(session_token, None)
+        if previous and previous[0] is not client:
+            previous[0].disconnect()
+
+        self._clients[session_token] = (client, time.monotonic())
+
+        while len(self._clients) > self.max_size:
+            evicted_token, (evicted_client, _) = self._clients.popitem(last=False)
+            evicted_client.disconnect()
+            logger.info(f"Client Pronote évincé (LRU): {evicted_token[:10]}...")
+
+    def remove(self, session_token: str):
+        """
+        Retire et ferme le client d'une session
+
+        Args:
+            session_token: Token de session
+        """
+        entry = self._clients.pop(session_token, None)
+        if entry:
+            entry[0].disconnect()
+
+    def purge_expired(self) -> int:
+        """
+        Ferme les clients inactifs depuis plus de idle_ttl secondes
+
+        Returns:
+            Nombre de clients évincés
+        """
+        deadline = time.monotonic() - self.idle_ttl
+        purged = 0
+
+        # Les entrées sont triées par dernière utilisation: on s'arrête
+        # à la première encore active
+        while self._clients:
+            token, (client, last_used) = next(iter(self._clients.items()))
+            if last_used > deadline:
+                break
+            self._clients.popitem(last=False)
+            client.disconnect()
+            purged += 1
+
+        if purged:
+            logger.info(f"{purged} client(s) Pronote inactif(s) évincé(s)")
+        return purged
+
+    def clear(self):
+        """Ferme tous les clients du pool"""
+        while self._clients:
+            _, (client, _) = self._clients.popitem(last=False)
+            client.disconnect()
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du pool"""
+        return {
+            "size": len(self._clients),
+            "max_size": self.max_size,
+            "idle_ttl": self.idle_ttl
+        }
+
+
+# Instance globale
+client_pool = PronoteClientPool()
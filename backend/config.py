@@ -4,7 +4,7 @@ Gestion des variables d'environnement et settings
 """
 from pydantic_settings import BaseSettings
 from pydantic import Field, validator
-from typing import List
+from typing import List, Dict, Any
 import secrets
 
 
@@ -17,6 +17,23 @@ class Settings(BaseSettings):
     ENV: str = Field(default='production', env='ENV')
     DEBUG: bool = Field(default=False, env='DEBUG')
     
+    # Processus uvicorn (python server.py) et implémentations boucle/HTTP
+    WORKERS: int = Field(default=1, ge=1)
+    UVICORN_LOOP: str = Field(default='auto')  # auto, asyncio, uvloop
+    UVICORN_HTTP: str = Field(default='auto')  # auto, h11, httptools
+    
+    @validator('UVICORN_LOOP')
+    def check_loop(cls, v):
+        if v not in ('auto', 'asyncio', 'uvloop'):
+            raise ValueError('UVICORN_LOOP doit valoir auto, asyncio ou uvloop')
+        return v
+    
+    @validator('UVICORN_HTTP')
+    def check_http(cls, v):
+        if v not in ('auto', 'h11', 'httptools'):
+            raise ValueError('UVICORN_HTTP doit valoir auto, h11 ou httptools')
+        return v
+    
     # Sécurité
     SECRET_KEY: str = Field(default_factory=lambda: secrets.token_urlsafe(32))
     JWT_SECRET_KEY: str = Field(default_factory=lambda: secrets.token_urlsafe(32))
@@ -39,11 +56,48 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = Field(default='redis://localhost:6379/0', env='REDIS_URL')
     REDIS_PASSWORD: str = Field(default='', env='REDIS_PASSWORD')
+    REDIS_MAX_CONNECTIONS: int = Field(default=50)
+    REDIS_POOL_TIMEOUT_SECONDS: float = Field(default=5.0)
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = Field(default=2.0)
+    REDIS_CONNECT_TIMEOUT_SECONDS: float = Field(default=2.0)
     SESSION_EXPIRATION_SECONDS: int = Field(default=86400)
+    SESSION_CACHE_ENABLED: bool = Field(default=True)
+    SESSION_CACHE_TTL_SECONDS: int = Field(default=30)
+    SESSION_CACHE_MAX_SIZE: int = Field(default=10000)
+    
+    # Cache des données Pronote
+    CACHE_TTL_HOMEWORK_SECONDS: int = Field(default=1800)
+    CACHE_TTL_TIMETABLE_SECONDS: int = Field(default=3600)
+    CACHE_TTL_GRADES_SECONDS: int = Field(default=3600)
+    CACHE_STALE_SECONDS: int = Field(default=21600)
+    
+    # Synchronisation incrémentale (instantanés d'empreintes par utilisateur)
+    SYNC_SNAPSHOT_TTL_SECONDS: int = Field(default=2592000)
+    SYNC_MAX_TOMBSTONES: int = Field(default=500)
+    
+    # Regroupement des appels Pronote identiques (verrou Redis entre workers)
+    SINGLEFLIGHT_DISTRIBUTED: bool = Field(default=True)
+    SINGLEFLIGHT_LOCK_EXPIRE_SECONDS: int = Field(default=60)
+    SINGLEFLIGHT_WAIT_SECONDS: int = Field(default=30)
+    
+    # Préchargement en heures creuses (heure locale de PREFETCH_TIMEZONE)
+    PREFETCH_ENABLED: bool = Field(default=True)
+    PREFETCH_TIMEZONE: str = Field(default='Europe/Paris')
+    PREFETCH_WINDOWS: str = Field(default='05:00-07:00,14:00-16:00')
+    PREFETCH_INTERVAL_SECONDS: int = Field(default=900)
+    PREFETCH_FRESH_SECONDS: int = Field(default=10800)
+    PREFETCH_ACTIVE_WITHIN_SECONDS: int = Field(default=86400)
+    PREFETCH_MAX_SESSIONS: int = Field(default=5000)
+    PREFETCH_CONCURRENCY: int = Field(default=4)
+    PREFETCH_RATE_PER_SECOND: float = Field(default=2.0)
+    PREFETCH_HOST_RATE_PER_SECOND: float = Field(default=0.2)
+    PREFETCH_LEADER_EXPIRE_SECONDS: int = Field(default=120)
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = Field(default=60)
     RATE_LIMIT_PER_HOUR: int = Field(default=1000)
+    # Stockage des compteurs slowapi (vide = REDIS_URL, "memory://" = par processus)
+    RATE_LIMIT_STORAGE_URI: str = Field(default='')
     
     # OpenRouter
     OPENROUTER_API_KEY: str = Field(default='', env='OPENROUTER_API_KEY')
@@ -51,6 +105,47 @@ class Settings(BaseSettings):
         default='https://openrouter.ai/api/v1',
         env='OPENROUTER_BASE_URL'
     )
+    OPENROUTER_TIMEOUT_SECONDS: float = Field(default=30.0)
+    OPENROUTER_HTTP2: bool = Field(default=True)
+    OPENROUTER_MAX_CONNECTIONS: int = Field(default=100)
+    OPENROUTER_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=20)
+    OPENROUTER_KEEPALIVE_EXPIRY_SECONDS: float = Field(default=60.0)
+    
+    # Concurrence des appels OpenRouter (file équitable par utilisateur) et nouveaux essais
+    OPENROUTER_MAX_CONCURRENCY: int = Field(default=20)
+    OPENROUTER_MAX_QUEUED: int = Field(default=200)
+    OPENROUTER_QUEUE_TIMEOUT_SECONDS: float = Field(default=20.0)
+    OPENROUTER_MAX_RETRIES: int = Field(default=3)
+    OPENROUTER_RETRY_BASE_DELAY_SECONDS: float = Field(default=0.5)
+    OPENROUTER_RETRY_MAX_DELAY_SECONDS: float = Field(default=10.0)
+    
+    # Routage des modèles IA (chaîne de repli, latence glissante, requêtes couvertes)
+    AI_MODEL_CHAIN: str = Field(
+        default='deepseek/deepseek-r1:free,meta-llama/llama-3.3-70b-instruct:free,google/gemini-2.0-flash-exp:free'
+    )
+    AI_ROUTER_WINDOW: int = Field(default=100)
+    AI_ROUTER_MIN_SAMPLES: int = Field(default=5)
+    AI_ROUTER_MAX_ERROR_RATE: float = Field(default=0.5)
+    AI_HEDGE_AFTER_SECONDS: float = Field(default=4.0)  # 0 = pas de requête couverte
+    
+    @validator('AI_MODEL_CHAIN')
+    def parse_model_chain(cls, v):
+        if isinstance(v, str):
+            return [model.strip() for model in v.split(',') if model.strip()]
+        return v
+    
+    # Contexte Pronote injecté dans le chat IA (budget en tokens)
+    AI_CONTEXT_TOKEN_BUDGET: int = Field(default=1500)
+    AI_CONTEXT_MODEL_BUDGETS: str = Field(default='')  # "modele=budget,..." (préfixes)
+    
+    # Cache des réponses IA (question normalisée + contexte + modèle)
+    AI_CACHE_ENABLED: bool = Field(default=True)
+    AI_CACHE_TTL_SECONDS: int = Field(default=900)
+    
+    # Historique des conversations (fenêtre envoyée au modèle)
+    CONVERSATION_MAX_MESSAGES: int = Field(default=40)
+    CONVERSATION_TOKEN_BUDGET: int = Field(default=2000)
+    CONVERSATION_SUMMARY_MAX_CHARS: int = Field(default=1500)
     
     # Selenium
     SELENIUM_HEADLESS: bool = Field(default=True)
@@ -64,6 +159,29 @@ class Settings(BaseSettings):
     # Pronote
     PRONOTE_DEFAULT_ACCOUNT_TYPE: int = Field(default=3)  # 3 = élève
     PRONOTE_REQUEST_TIMEOUT: int = Field(default=30)
+    PRONOTE_POOL_MAX_SIZE: int = Field(default=500)
+    PRONOTE_POOL_IDLE_TTL_SECONDS: int = Field(default=1800)
+    PRONOTE_SESSION_CHECK_SECONDS: int = Field(default=300)
+    PRONOTE_EXECUTOR_WORKERS: int = Field(default=16)
+    PRONOTE_EXECUTOR_QUEUE_SIZE: int = Field(default=64)
+    
+    # Protection par établissement (seau à jetons et disjoncteur par hôte Pronote)
+    PRONOTE_HOST_RATE_PER_SECOND: float = Field(default=5.0)
+    PRONOTE_HOST_BURST: float = Field(default=10.0)
+    PRONOTE_HOST_MAX_WAIT_SECONDS: float = Field(default=5.0)
+    PRONOTE_BREAKER_FAILURE_THRESHOLD: int = Field(default=5)
+    PRONOTE_BREAKER_OPEN_SECONDS: float = Field(default=30.0)
+    PRONOTE_BREAKER_HALF_OPEN_PROBES: int = Field(default=1)
+    # Un timeout ne compte comme panne que si l'appel a duré au moins ce temps chez Pronote
+    PRONOTE_BREAKER_SLOW_CALL_SECONDS: float = Field(default=10.0)
+    
+    # Nouveaux essais Pronote (erreurs transitoires uniquement, budget global)
+    PRONOTE_RETRY_MAX_ATTEMPTS: int = Field(default=3)
+    PRONOTE_RETRY_BASE_DELAY_SECONDS: float = Field(default=0.5)
+    PRONOTE_RETRY_MAX_DELAY_SECONDS: float = Field(default=4.0)
+    PRONOTE_RETRY_BUDGET_RATIO: float = Field(default=0.2)
+    PRONOTE_RETRY_BUDGET_MIN_RETRIES: int = Field(default=10)
+    PRONOTE_RETRY_BUDGET_WINDOW_SECONDS: float = Field(default=10.0)
     
     # Monitoring
     SENTRY_DSN: str = Field(default='', env='SENTRY_DSN')
@@ -79,6 +197,30 @@ class Settings(BaseSettings):
 settings = Settings()
 
 
+def rate_limit_storage_uri() -> str:
+    """Stockage des compteurs de rate limiting (Redis par défaut, partagé entre workers)"""
+    return settings.RATE_LIMIT_STORAGE_URI or settings.REDIS_URL
+
+
+def rate_limit_storage_options() -> Dict[str, Any]:
+    """
+    Options du client Redis de slowapi (synchrone, appelé depuis la boucle d'événements)
+
+    Timeouts bornés: un Redis bloqué lève une erreur (et active le repli en
+    mémoire) au lieu de geler le worker.
+    """
+    if not rate_limit_storage_uri().startswith(('redis://', 'rediss://')):
+        return {}
+    options: Dict[str, Any] = {
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        "socket_connect_timeout": settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+        "max_connections": settings.REDIS_MAX_CONNECTIONS
+    }
+    if settings.REDIS_PASSWORD:
+        options['password'] = settings.REDIS_PASSWORD
+    return options
+
+
 # Validation au démarrage
 def validate_config():
     """Valide la configuration au démarrage de l'application"""
@@ -96,6 +238,20 @@ def validate_config():
     if not settings.OPENROUTER_API_KEY:
         errors.append("OPENROUTER_API_KEY est requis pour l'IA")
     
+    if not settings.AI_MODEL_CHAIN:
+        errors.append("AI_MODEL_CHAIN doit contenir au moins un modèle")
+    
+    # Plusieurs workers: l'état partagé doit être dans Redis, pas en mémoire de chaque processus
+    if settings.WORKERS > 1:
+        if rate_limit_storage_uri().startswith('memory://'):
+            errors.append("RATE_LIMIT_STORAGE_URI en mémoire est incompatible avec WORKERS > 1 (limites multipliées par le nombre de workers)")
+        if not settings.SINGLEFLIGHT_DISTRIBUTED:
+            errors.append("SINGLEFLIGHT_DISTRIBUTED doit être activé avec WORKERS > 1 (appels Pronote dupliqués entre workers)")
+        # Une clé générée au démarrage diffère d'un worker à l'autre (JWT et sessions illisibles)
+        for key in ('SECRET_KEY', 'JWT_SECRET_KEY', 'ENCRYPTION_KEY'):
+            if key not in settings.model_fields_set:
+                errors.append(f"{key} doit être fourni (environnement ou .env) avec WORKERS > 1")
+
     if errors:
         raise ValueError(f"Erreurs de configuration:\n" + "\n".join(f"- {e}" for e in errors))
     
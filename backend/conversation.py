@@ -0,0 +1,173 @@
+"""
+Historique des conversations du chat IA
+Stocké côté serveur (liste Redis par session): le frontend n'envoie que la nouvelle question
+"""
+import json
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from loguru import logger
+
+from config import settings
+from redis_pool import get_redis
+from ai_context import estimate_tokens
+
+
+class ConversationStore:
+    """
+    Conversations par session
+
+    - conversation:{session_token}: liste Redis des derniers messages
+      (bornée à CONVERSATION_MAX_MESSAGES)
+    - conversation:{session_token}:summary: résumé des échanges sortis de la liste
+
+    Seule une fenêtre récente, limitée à CONVERSATION_TOKEN_BUDGET,
+    est envoyée à OpenRouter; les échanges plus anciens sont réduits
+    à un résumé d'une ligne par question.
+    """
+
+    def __init__(self):
+        self.redis_client = get_redis()
+        self.max_messages = settings.CONVERSATION_MAX_MESSAGES
+        self.token_budget = settings.CONVERSATION_TOKEN_BUDGET
+        self.summary_max_chars = settings.CONVERSATION_SUMMARY_MAX_CHARS
+
+    @staticmethod
+    def _key(session_token: str) -> str:
+        return f"conversation:{session_token}"
+
+    @staticmethod
+    def _summary_key(session_token: str) -> str:
+        return f"conversation:{session_token}:summary"
+
+    @staticmethod
+    def _summarize(messages: List[Dict[str, Any]]) -> str:
+        """Résumé extractif: une ligne par question posée"""
+        lines = []
+        for message in messages:
+            if message['role'] != 'user':
+                continue
+            question = " ".join(message['content'].split())
+            if len(question) > 120:
+                question = question[:119] + '…'
+            lines.append(f"- {question}")
+        return "\n".join(lines)
+
+    def _merge_summary(self, summary: Optional[str], older: str) -> str:
+        """Ajoute les questions sorties de la fenêtre au résumé (borné, lignes entières)"""
+        summary = "\n".join(part for part in (summary, older) if part)
+        if len(summary) > self.summary_max_chars:
+            summary = summary[-self.summary_max_chars:].split("\n", 1)[-1]
+        return summary
+
+    async def get_window(self, session_token: str) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Fenêtre de conversation à envoyer au modèle
+
+        Args:
+            session_token: Token de session
+
+        Returns:
+            (résumé des échanges anciens, messages récents au format OpenAI)
+        """
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.lrange(self._key(session_token), 0, -1)
+            pipe.get(self._summary_key(session_token))
+            raw_messages, summary = await pipe.execute()
+        except Exception as e:
+            # Sans historique, le chat reste utilisable
+            logger.warning(f"Erreur lecture conversation: {str(e)}")
+            return "", []
+
+        messages = [json.loads(raw) for raw in raw_messages]
+
+        # Remonter depuis le plus récent, par échange complet, dans la limite du budget
+        remaining = self.token_budget
+        start = len(messages)
+        while start > 0:
+            turn_start = start - 1
+            if messages[turn_start]['role'] == 'assistant' and turn_start > 0:
+                turn_start -= 1
+            cost = sum(estimate_tokens(m['content']) for m in messages[turn_start:start])
+            if cost > remaining:
+                break
+            remaining -= cost
+            start = turn_start
+
+        summary = self._merge_summary(summary, self._summarize(messages[:start]))
+
+        window = [
+            {"role": m['role'], "content": m['content']}
+            for m in messages[start:]
+        ]
+        return summary, window
+
+    async def append_turn(self, session_token: str, question: str, answer: str):
+        """
+        Ajoute un échange (question + réponse) à la conversation
+
+        Les messages qui dépassent CONVERSATION_MAX_MESSAGES sortent
+        de la liste et sont ajoutés au résumé.
+
+        Args:
+            session_token: Token de session
+            question: Message de l'élève
+            answer: Réponse du modèle
+        """
+        key = self._key(session_token)
+        now = time.time()
+        entries = [
+            json.dumps({"role": "user", "content": question, "at": now}),
+            json.dumps({"role": "assistant", "content": answer, "at": now})
+        ]
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.rpush(key, *entries)
+            pipe.expire(key, settings.SESSION_EXPIRATION_SECONDS)
+            length, _ = await pipe.execute()
+
+            overflow = length - self.max_messages
+            if overflow > 0:
+                await self._evict(session_token, overflow)
+        except Exception as e:
+            logger.warning(f"Erreur enregistrement conversation: {str(e)}")
+
+    async def _evict(self, session_token: str, count: int):
+        """Retire les plus anciens messages de la liste et les résume"""
+        key = self._key(session_token)
+        summary_key = self._summary_key(session_token)
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.lrange(key, 0, count - 1)
+        pipe.ltrim(key, count, -1)
+        pipe.get(summary_key)
+        evicted, _, summary = await pipe.execute()
+
+        if not evicted:
+            return
+
+        summary = self._merge_summary(
+            summary,
+            self._summarize([json.loads(raw) for raw in evicted])
+        )
+        await self.redis_client.setex(summary_key, settings.SESSION_EXPIRATION_SECONDS, summary)
+
+    async def reset(self, session_token: str):
+        """
+        Efface la conversation d'une session
+
+        Args:
+            session_token: Token de session
+        """
+        try:
+            await self.redis_client.delete(
+                self._key(session_token),
+                self._summary_key(session_token)
+            )
+        except Exception as e:
+            logger.warning(f"Erreur suppression conversation: {str(e)}")
+
+
+# Instance globale
+conversation_store = ConversationStore()
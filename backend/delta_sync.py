@@ -0,0 +1,200 @@
+"""
+Synchronisation incrémentale des notes et devoirs
+Le client ne reçoit que les éléments ajoutés, modifiés ou supprimés depuis son curseur
+"""
+import base64
+import binascii
+import hashlib
+import json
+from typing import Optional, Dict, Any, List, Tuple
+
+from loguru import logger
+from redis.exceptions import WatchError
+
+from config import settings
+from redis_pool import get_redis
+
+
+SYNC_RESOURCES = ("grades", "homework")
+
+
+def item_hash(item: Dict[str, Any]) -> str:
+    """Empreinte du contenu d'un élément (JSON canonique)"""
+    canonical = json.dumps(item, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def item_id(item: Dict[str, Any]) -> str:
+    """Identifiant Pronote de l'élément, ou empreinte du contenu à défaut"""
+    return str(item['id']) if item.get('id') else f"h:{item_hash(item)}"
+
+
+class DeltaSync:
+    """
+    Instantanés versionnés par utilisateur et ressource
+
+    Clé sync:{resource}:{user_key}, document JSON:
+    - version: incrémentée à chaque récupération qui change quelque chose
+    - items: {id: [empreinte, version d'ajout, version de modification]}
+    - removed: {id: version de suppression} (bornées à SYNC_MAX_TOMBSTONES)
+    - horizon: plus ancienne version depuis laquelle les suppressions sont
+      connues; un curseur antérieur reçoit une resynchronisation complète
+
+    Seules les empreintes sont stockées: le contenu des éléments renvoyés
+    vient de la récupération courante (à travers le cache des données).
+    """
+
+    def __init__(self):
+        self.redis_client = get_redis()
+        self.ttl = settings.SYNC_SNAPSHOT_TTL_SECONDS
+        self.max_tombstones = settings.SYNC_MAX_TOMBSTONES
+
+    @staticmethod
+    def _key(user_key: str, resource: str) -> str:
+        return f"sync:{resource}:{user_key}"
+
+    @staticmethod
+    def encode_cursor(user_key: str, versions: Dict[str, int]) -> str:
+        """Curseur opaque: versions par ressource, lié à l'utilisateur"""
+        raw = json.dumps({"u": user_key[:8], "v": versions}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: Optional[str], user_key: str) -> Dict[str, int]:
+        """Versions d'un curseur ({} si absent, invalide ou d'un autre utilisateur)"""
+        if not cursor:
+            return {}
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            decoded = json.loads(raw)
+        except (binascii.Error, ValueError):
+            return {}
+        if not isinstance(decoded, dict) or decoded.get('u') != user_key[:8]:
+            return {}
+        versions = decoded.get('v')
+        if not isinstance(versions, dict):
+            return {}
+        return {
+            resource: version for resource, version in versions.items()
+            if resource in SYNC_RESOURCES and isinstance(version, int)
+        }
+
+    def _apply(self, snapshot: Optional[Dict[str, Any]], items: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Nouvel instantané après une récupération, et s'il a changé"""
+        snapshot = snapshot or {"version": 0, "horizon": 0, "items": {}, "removed": {}}
+        version = snapshot['version'] + 1
+
+        current = {item_id(item): item_hash(item) for item in items}
+        previous = snapshot['items']
+        removed = dict(snapshot['removed'])
+        next_items = {}
+        changed = False
+
+        for id_, digest in current.items():
+            known = previous.get(id_)
+            if known is None:
+                next_items[id_] = [digest, version, version]
+                removed.pop(id_, None)
+                changed = True
+            elif known[0] != digest:
+                next_items[id_] = [digest, known[1], version]
+                changed = True
+            else:
+                next_items[id_] = known
+
+        for id_ in previous.keys() - current.keys():
+            removed[id_] = version
+            changed = True
+
+        if not changed:
+            return snapshot, False
+
+        horizon = snapshot['horizon']
+        if len(removed) > self.max_tombstones:
+            # Oublier les suppressions les plus anciennes: les curseurs plus vieux repartent de zéro
+            ordered = sorted(removed.items(), key=lambda entry: entry[1])
+            dropped = ordered[:len(removed) - self.max_tombstones]
+            horizon = max(horizon, dropped[-1][1])
+            removed = dict(ordered[len(dropped):])
+
+        return {"version": version, "horizon": horizon, "items": next_items, "removed": removed}, True
+
+    async def update(self, user_key: str, resource: str, items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Enregistre une récupération et renvoie l'instantané à jour
+
+        Les mises à jour concurrentes d'un même utilisateur sont sérialisées
+        par WATCH/MULTI (quelques essais).
+
+        Returns:
+            Instantané, ou None si Redis est indisponible
+        """
+        key = self._key(user_key, resource)
+        try:
+            async with self.redis_client.pipeline() as pipe:
+                for _ in range(3):
+                    try:
+                        await pipe.watch(key)
+                        raw = await pipe.get(key)
+                        snapshot, changed = self._apply(json.loads(raw) if raw else None, items)
+                        pipe.multi()
+                        if changed:
+                            pipe.setex(key, self.ttl, json.dumps(snapshot, separators=(',', ':')))
+                        else:
+                            pipe.expire(key, self.ttl)
+                        await pipe.execute()
+                        return snapshot
+                    except WatchError:
+                        continue
+        except Exception as e:
+            logger.warning(f"Erreur instantané de synchronisation {resource}: {str(e)}")
+            return None
+
+        logger.warning(f"Instantané de synchronisation {resource} trop disputé, resynchronisation complète")
+        return None
+
+    @staticmethod
+    def diff(
+        snapshot: Optional[Dict[str, Any]],
+        items: List[Dict[str, Any]],
+        since: Optional[int]
+    ) -> Dict[str, Any]:
+        """
+        Changements depuis la version since
+
+        Returns:
+            Dict avec full (True: items contient tout, le client remplace sa copie),
+            added, changed, removed (identifiants) et version
+        """
+        with_ids = [{**item, "id": item_id(item)} for item in items]
+
+        if snapshot is None or since is None or since < snapshot['horizon'] or since > snapshot['version']:
+            return {
+                "full": True,
+                "added": with_ids,
+                "changed": [],
+                "removed": [],
+                "version": snapshot['version'] if snapshot else None
+            }
+
+        added, changed = [], []
+        for item in with_ids:
+            entry = snapshot['items'].get(item['id'])
+            if entry is None:
+                continue
+            if entry[1] > since:
+                added.append(item)
+            elif entry[2] > since:
+                changed.append(item)
+
+        return {
+            "full": False,
+            "added": added,
+            "changed": changed,
+            "removed": [id_ for id_, version in snapshot['removed'].items() if version > since],
+            "version": snapshot['version']
+        }
+
+
+# Instance globale
+delta_sync = DeltaSync()
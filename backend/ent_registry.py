@@ -0,0 +1,139 @@
+"""
+Registre des ENTs supportés pour l'authentification CAS
+Construit une seule fois à l'import à partir des fonctions publiques de pronotepy.ent
+"""
+import hashlib
+import json
+from types import ModuleType
+from typing import Optional, Dict, Any, List, Callable
+
+import pronotepy.ent
+
+
+# Noms affichés des ENTs de pronotepy 2.12 (un ENT ajouté ensuite reçoit un nom dérivé de son identifiant)
+ENT_DISPLAY_NAMES = {
+    "ac_clermont_ferrand": "Académie de Clermont-Ferrand",
+    "ac_grenoble": "Académie de Grenoble",
+    "ac_lyon": "Académie de Lyon",
+    "ac_orleans_tours": "Académie Orléans-Tours",
+    "ac_poitiers": "Académie de Poitiers",
+    "ac_reims": "Académie de Reims",
+    "ac_rennes": "Toutatice (Académie de Rennes)",
+    "ac_reunion": "Académie de La Réunion",
+    "atrium_sud": "Atrium Sud (PACA)",
+    "cas_agora06": "Agora 06 (Alpes-Maritimes)",
+    "cas_arsene76": "Arsene76 (Seine-Maritime)",
+    "cas_arsene76_edu": "Arsene76 (ÉduConnect)",
+    "cas_cybercolleges42": "Cybercollèges 42 (Loire)",
+    "cas_cybercolleges42_edu": "Cybercollèges 42 (ÉduConnect)",
+    "cas_ent27": "ENT27 (Eure)",
+    "cas_kosmos": "CAS Kosmos",
+    "cas_seinesaintdenis_edu": "ENT Seine-Saint-Denis (ÉduConnect)",
+    "eclat_bfc": "Eclat-BFC (Bourgogne-Franche-Comté)",
+    "ecollege_haute_garonne": "eCollège Haute-Garonne",
+    "ecollege_haute_garonne_edu": "eCollège Haute-Garonne (ÉduConnect)",
+    "enc_hauts_de_seine": "ENC Hauts-de-Seine",
+    "ent2d_bordeaux": "ENT2D Bordeaux",
+    "ent77": "ENT77 (Seine-et-Marne)",
+    "ent_94": "ENT94 (Val-de-Marne)",
+    "ent_auvergnerhonealpe": "ENT Auvergne-Rhône-Alpes",
+    "ent_creuse": "ENT Creuse",
+    "ent_elyco": "e-lyco (Pays de la Loire)",
+    "ent_essonne": "ENT Essonne",
+    "ent_hdf": "ENT Hauts-de-France",
+    "ent_mayotte": "ENT Mayotte",
+    "ent_somme": "ENT Somme",
+    "ent_var": "ENT Var",
+    "extranet_colleges_somme": "Extranet collèges Somme",
+    "ile_de_france": "Mon lycée.net (Île-de-France)",
+    "l_normandie": "L'Educ de Normandie",
+    "laclasse_educonnect": "Laclasse.com (ÉduConnect)",
+    "laclasse_lyon": "Laclasse.com (Lyon)",
+    "lyceeconnecte_aquitaine": "Lycée Connecté (Nouvelle-Aquitaine)",
+    "lyceeconnecte_edu": "Lycée Connecté",
+    "monbureaunumerique": "Mon Bureau Numérique (Grand Est)",
+    "neoconnect_guadeloupe": "Néoconnect Guadeloupe",
+    "occitanie_montpellier": "ENT Occitanie (Montpellier)",
+    "occitanie_montpellier_educonnect": "ENT Occitanie (Montpellier, ÉduConnect)",
+    "occitanie_toulouse": "ENT Occitanie (Toulouse)",
+    "occitanie_toulouse_edu": "ENT Occitanie (Toulouse, ÉduConnect)",
+    "ozecollege_yvelines": "OZE Collège (Yvelines)",
+    "paris_classe_numerique": "Paris Classe Numérique",
+    "pronote_hubeduconnect": "Hub ÉduConnect Pronote",
+    "val_doise": "ENT Val-d'Oise"
+}
+
+
+def normalize_ent_id(ent_name: str) -> str:
+    """Identifiant normalisé d'un ENT ("MonLycee_Net " -> "monlycee_net")"""
+    return ent_name.strip().lower()
+
+
+def display_name(ent_id: str) -> str:
+    """Nom affiché d'un ENT ("nouvel_ent" -> "Nouvel Ent" à défaut)"""
+    return ENT_DISPLAY_NAMES.get(ent_id) or ent_id.replace('_', ' ').title()
+
+
+class EntRegistry:
+    """
+    ENTs indexés par identifiant normalisé
+
+    - get(): recherche en O(1) de la fonction d'authentification pronotepy
+    - entries: liste {id, name} triée par identifiant
+    - body / etag: réponse de /api/ents précalculée
+    """
+
+    def __init__(self, ents: Dict[str, Callable]):
+        self._by_id: Dict[str, Callable] = {
+            normalize_ent_id(name): ent for name, ent in ents.items()
+        }
+        self._index()
+
+    def _index(self):
+        """Précalcule la liste triée et la réponse de /api/ents"""
+        self.entries: List[Dict[str, str]] = [
+            {"id": ent_id, "name": display_name(ent_id)}
+            for ent_id in sorted(self._by_id)
+        ]
+        self.body: bytes = json.dumps(
+            {"ents": self.entries, "count": len(self.entries)},
+            ensure_ascii=False,
+            separators=(',', ':')
+        ).encode()
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+    def register(self, ent: Callable, name: Optional[str] = None):
+        """Ajoute un ENT hors pronotepy (ex: faux ENT des benchmarks)"""
+        self._by_id[normalize_ent_id(name or ent.__name__)] = ent
+        self._index()
+
+    def get(self, ent_name: str) -> Optional[Callable]:
+        """Fonction ENT pronotepy correspondant au nom (insensible à la casse)"""
+        return self._by_id.get(normalize_ent_id(ent_name))
+
+    def __contains__(self, ent_name: str) -> bool:
+        return normalize_ent_id(ent_name) in self._by_id
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+def module_ents(module: ModuleType) -> Dict[str, Callable]:
+    """
+    Fonctions ENT publiques d'un module, par nom d'attribut
+
+    La plupart des ENTs de pronotepy sont des functools.partial (sans
+    __name__): leur nom est celui sous lequel le module les expose.
+    """
+    return {
+        name: value
+        for name, value in vars(module).items()
+        if not name.startswith('_') and callable(value)
+    }
+
+
+# Instance globale
+ent_registry = EntRegistry(module_ents(pronotepy.ent))
+
+# Liste des ENTs supportés (pour l'API), dérivée de pronotepy
+SUPPORTED_ENTS: List[Dict[str, Any]] = ent_registry.entries
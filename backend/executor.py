@@ -0,0 +1,160 @@
+"""
+Exécuteur borné pour les appels bloquants (pronotepy)
+Évite de geler la boucle asyncio d'uvicorn pendant les requêtes réseau synchrones
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable
+from loguru import logger
+
+from config import settings
+
+
+class ExecutorSaturatedError(Exception):
+    """La file d'attente de l'exécuteur est pleine"""
+    pass
+
+
+class BoundedExecutor:
+    """
+    Pool de threads avec file d'attente bornée et timeout par appel
+
+    Au-delà de max_workers + queue_size appels en attente, les nouveaux
+    appels sont refusés immédiatement plutôt que d'allonger la file.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        name: str = "pronote"
+    ):
+        self.max_workers = max_workers or settings.PRONOTE_EXECUTOR_WORKERS
+        self.queue_size = queue_size if queue_size is not None else settings.PRONOTE_EXECUTOR_QUEUE_SIZE
+        self.timeout = timeout or settings.PRONOTE_REQUEST_TIMEOUT
+        self.name = name
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+
+        # Métriques d'attente en file
+        self._wait_samples: deque = deque(maxlen=1000)
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._rejected = 0
+        self._timeouts = 0
+
+    async def run(
+        self,
+        func: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Exécute une fonction bloquante dans le pool
+
+        Args:
+            func: Fonction synchrone à exécuter
+            timeout: Timeout en secondes (défaut: PRONOTE_REQUEST_TIMEOUT)
+
+        Returns:
+            Résultat de la fonction
+
+        Raises:
+            ExecutorSaturatedError: File d'attente pleine
+            asyncio.TimeoutError: Appel trop long (le thread termine en arrière-plan)
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.queue_size:
+                self._rejected += 1
+                raise ExecutorSaturatedError(
+                    f"Exécuteur {self.name} saturé ({self._pending} appels en attente)"
+                )
+            self._pending += 1
+
+        submitted_at = time.monotonic()
+
+        def task():
+            self._record_wait(time.monotonic() - submitted_at)
+            with self._lock:
+                self._running += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        concurrent_future = self._executor.submit(task)
+        # Appelé aussi si la tâche est annulée avant d'avoir démarré
+        concurrent_future.add_done_callback(self._on_done)
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(concurrent_future),
+                timeout=timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            logger.warning(
+                f"Timeout {self.name} après {timeout or self.timeout}s ({func.__name__})"
+            )
+            raise
+
+    def _on_done(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def _record_wait(self, wait: float):
+        with self._lock:
+            self._wait_samples.append(wait)
+            self._wait_count += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques de l'exécuteur (file d'attente et temps d'attente)"""
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            pending = self._pending
+            running = self._running
+
+            def percentile(p: float) -> float:
+                if not samples:
+                    return 0.0
+                return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+            return {
+                "max_workers": self.max_workers,
+                "queue_size": self.queue_size,
+                "running": running,
+                "queued": max(0, pending - running),
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "queue_wait": {
+                    "count": self._wait_count,
+                    "avg_ms": round(self._wait_total / self._wait_count * 1000, 2) if self._wait_count else 0.0,
+                    "p50_ms": round(percentile(0.50) * 1000, 2),
+                    "p95_ms": round(percentile(0.95) * 1000, 2),
+                    "max_ms": round(self._wait_max * 1000, 2)
+                }
+            }
+
+    def shutdown(self):
+        """Arrête le pool sans attendre les appels en cours"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Instance globale
+pronote_executor = BoundedExecutor()
@@ -0,0 +1,21 @@
+"""
+Tests de charge de l'API (trafic réel simulé)
+
+Scénarios (loadtest/scenarios.py):
+- login_storm: vague de connexions du matin (directes et CAS) puis tableau de bord
+- dashboard_refresh: élèves connectés qui rafraîchissent tableau de bord, synchronisation, emploi du temps
+- chat_burst: rafales de questions à l'assistant IA (réponses complètes et streamées)
+
+L'application réelle (server:app) est exercée en entier; seuls les services
+externes sont remplacés: faux Pronote/ENT (benchmarks/fake_pronote.py),
+faux OpenRouter (loadtest/fake_openrouter.py) et, au choix, fakeredis ou un
+Redis local. Le rapport donne, par scénario et par endpoint, le débit, les
+percentiles de latence et le taux d'erreurs, et peut être comparé à un
+rapport de référence.
+
+Usage (depuis backend/):
+    pip install fakeredis
+    python -m loadtest --output reference.json
+    python -m loadtest --target uvicorn --baseline reference.json --fail-on-regression
+    REDIS_URL=redis://localhost:6379/15 python -m loadtest --redis real --scenarios login_storm --users 500
+"""
@@ -0,0 +1,86 @@
+"""
+Point d'entrée: python -m loadtest (depuis backend/)
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import List
+
+from loadtest import environment
+from loadtest.report import compare, format_table, format_comparison
+from loadtest.scenarios import SCENARIOS
+
+
+def scenario_names(value: str) -> List[str]:
+    """"all" ou noms séparés par des virgules, joués dans l'ordre donné"""
+    if value == "all":
+        return list(SCENARIOS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"scénarios inconnus: {', '.join(unknown)} (disponibles: {', '.join(SCENARIOS)})"
+        )
+    return names
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Tests de charge de l'API")
+    parser.add_argument('--scenarios', type=scenario_names, default="all",
+                        help=f"all ou liste parmi: {', '.join(SCENARIOS)}")
+    parser.add_argument('--target', choices=("uvicorn", "asgi"), default="uvicorn",
+                        help="uvicorn: serveur HTTP local; asgi: en processus sans réseau "
+                             "(réponses mises en tampon: pas de mesure du 1er token)")
+    parser.add_argument('--redis', choices=("fake", "real"), default="fake",
+                        help="fake: fakeredis en mémoire; real: REDIS_URL (base dédiée conseillée)")
+    parser.add_argument('--users', type=int, default=100, help="Utilisateurs virtuels par scénario")
+    parser.add_argument('--schools', type=int, default=10, help="Établissements (hôtes Pronote) distincts")
+    parser.add_argument('--ramp-up', type=float, default=5.0, help="Durée d'arrivée des utilisateurs (s)")
+    parser.add_argument('--iterations', type=int, default=5, help="Actions par utilisateur (hors login_storm)")
+    parser.add_argument('--think-ms', type=float, default=500.0, help="Temps de réflexion moyen entre deux actions")
+    parser.add_argument('--seed', type=int, default=42, help="Graine des tirages (parcours reproductibles)")
+    parser.add_argument('--keep-rate-limits', action='store_true',
+                        help="Garder les limites slowapi (tous les utilisateurs partagent une IP)")
+    parser.add_argument('--pronote-latency-ms', type=float, default=80.0)
+    parser.add_argument('--openrouter-first-token-ms', type=float, default=300.0)
+    parser.add_argument('--openrouter-tokens', type=int, default=40)
+    parser.add_argument('--openrouter-token-interval-ms', type=float, default=15.0)
+    parser.add_argument('--openrouter-error-rate', type=float, default=0.0, help="Part des appels OpenRouter en 429")
+    parser.add_argument('--output', help="Fichier du rapport JSON (sinon sortie standard)")
+    parser.add_argument('--baseline', help="Rapport JSON de référence à comparer")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Écart relatif toléré (p50, p99, débit)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Code de sortie 1 en cas de régression")
+    args = parser.parse_args()
+
+    # Avant tout import de l'application (settings, pool Redis)
+    environment.configure(args.redis)
+    from loadtest.runner import run
+
+    report = asyncio.run(run(vars(args)))
+    print(format_table(report), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Rapport écrit dans {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(report, baseline, args.tolerance)
+    print(f"Comparaison avec {args.baseline} ({baseline.get('git_commit', '?')}):", file=sys.stderr)
+    print(format_comparison(rows), file=sys.stderr)
+
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"{len(regressions)} régression(s) au-delà de {args.tolerance:.0%}", file=sys.stderr)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
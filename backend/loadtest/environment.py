@@ -0,0 +1,56 @@
+"""
+Préparation du processus de test de charge (et de benchmarks/pronote_benchmark.py)
+À appeler avant l'import de l'application: les settings et les clients
+Redis sont créés à l'import des modules
+"""
+import os
+
+
+def configure(redis_mode: str):
+    """
+    Variables d'environnement du test de charge
+
+    Args:
+        redis_mode: "fake" (fakeredis en mémoire) ou "real" (REDIS_URL)
+    """
+    # Une clé Fernet valide est nécessaire avant l'import de la configuration
+    if not os.environ.get('ENCRYPTION_KEY'):
+        from cryptography.fernet import Fernet
+        os.environ['ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+
+    # validate_config() exige une clé; le faux OpenRouter ne la vérifie pas
+    os.environ.setdefault('OPENROUTER_API_KEY', 'loadtest')
+    # Le faux OpenRouter est servi en HTTP/1.1 sans TLS
+    os.environ['OPENROUTER_HTTP2'] = 'False'
+    os.environ.setdefault('PREFETCH_ENABLED', 'False')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # L'application tourne dans le processus du test (aussi en mode uvicorn)
+    os.environ['WORKERS'] = '1'
+
+    if redis_mode == "fake":
+        # slowapi passe par un client Redis synchrone, hors du pool fakeredis;
+        # un seul processus: ses compteurs en mémoire suffisent
+        os.environ['RATE_LIMIT_STORAGE_URI'] = 'memory://'
+        install_fake_redis()
+
+
+def install_fake_redis():
+    """Remplace le pool Redis partagé par un serveur fakeredis en mémoire"""
+    try:
+        import fakeredis
+        from fakeredis.aioredis import FakeConnection
+    except ImportError:
+        raise SystemExit("fakeredis n'est pas installé (pip install fakeredis), ou utilisez --redis real")
+
+    import redis.asyncio as aioredis
+    import redis_pool
+    from config import settings
+
+    # Même type de pool que redis_pool.create_connection_pool (attente bornée)
+    redis_pool.redis_pool = aioredis.BlockingConnectionPool(
+        connection_class=FakeConnection,
+        server=fakeredis.FakeServer(),
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+        decode_responses=True
+    )
@@ -0,0 +1,119 @@
+"""
+Faux OpenRouter pour les tests de charge
+POST /chat/completions au format OpenAI, complet ou streamé (SSE),
+avec délai avant le premier token et débit de tokens configurables
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any
+
+
+class FakeOpenRouterConfig:
+    """Latence et volume des réponses du faux OpenRouter"""
+
+    def __init__(
+        self,
+        first_token_ms: float = 300.0,
+        jitter_ms: float = 50.0,
+        tokens: int = 40,
+        token_interval_ms: float = 15.0,
+        error_rate: float = 0.0
+    ):
+        self.first_token_ms = first_token_ms
+        self.jitter_ms = jitter_ms
+        self.tokens = tokens
+        self.token_interval_ms = token_interval_ms
+        # Part des appels refusés en 429 (saturation du fournisseur)
+        self.error_rate = error_rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeOpenRouterServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        config = self.server.config
+
+        if self.path.rstrip("/").split("/")[-1] != "completions":
+            self._send_json(404, {"error": {"code": 404, "message": "inconnu"}})
+            return
+
+        delay = config.first_token_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+        if random.random() < config.error_rate:
+            self._send_json(429, {"error": {"code": 429, "message": "Rate limit exceeded"}}, {"Retry-After": "1"})
+            return
+
+        model = request.get("model", "fake/model")
+        words = [f"mot{i} " for i in range(config.tokens)]
+        usage = {"prompt_tokens": 500, "completion_tokens": config.tokens, "total_tokens": 500 + config.tokens}
+
+        if not request.get("stream"):
+            time.sleep(config.tokens * config.token_interval_ms / 1000)
+            self._send_json(200, {
+                "model": model,
+                "choices": [{"message": {"role": "assistant", "content": "".join(words)}}],
+                "usage": usage
+            })
+            return
+
+        # Flux SSE sans Content-Length: la fin du flux ferme la connexion
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for word in words:
+            chunk = {"model": model, "choices": [{"delta": {"content": word}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(config.token_interval_ms / 1000)
+        self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeOpenRouterServer(ThreadingHTTPServer):
+    """Faux OpenRouter local, démarré dans un thread"""
+
+    daemon_threads = True
+
+    def __init__(self, config: FakeOpenRouterConfig, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.config = config
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v1"
+
+    def start(self) -> "FakeOpenRouterServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,136 @@
+"""
+Mesures du test de charge et comparaison à un rapport de référence
+"""
+import statistics
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional
+
+
+def summarize(samples: List[float]) -> Dict[str, Optional[float]]:
+    """Moyenne et percentiles (en ms) d'une série de durées en secondes"""
+    if not samples:
+        return {"mean_ms": None, "p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2),
+        "p50_ms": round(percentile(0.50) * 1000, 2),
+        "p90_ms": round(percentile(0.90) * 1000, 2),
+        "p99_ms": round(percentile(0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2)
+    }
+
+
+class Recorder:
+    """Durées des réponses réussies et codes d'erreur, par endpoint"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+
+    def success(self, endpoint: str, seconds: float):
+        self.samples[endpoint].append(seconds)
+
+    def failure(self, endpoint: str, code: str):
+        self.errors[endpoint][code] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        endpoints = {}
+        for endpoint in sorted(set(self.samples) | set(self.errors)):
+            ok = len(self.samples[endpoint])
+            errors = sum(self.errors[endpoint].values())
+            endpoints[endpoint] = {
+                "requests": ok + errors,
+                "ok": ok,
+                "errors": errors,
+                "error_rate": round(errors / (ok + errors), 4),
+                "error_codes": dict(self.errors[endpoint]),
+                "throughput_rps": round(ok / elapsed, 2) if elapsed else None,
+                **summarize(self.samples[endpoint])
+            }
+        return endpoints
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float
+) -> List[Dict[str, Any]]:
+    """
+    Compare chaque (scénario, endpoint) présent dans les deux rapports
+
+    Régression: p99 ou p50 plus lent de plus de `tolerance` (relatif),
+    débit plus faible de plus de `tolerance`, ou taux d'erreurs en hausse
+    de plus d'un point.
+    """
+    rows = []
+    for scenario, result in report['scenarios'].items():
+        reference = baseline.get('scenarios', {}).get(scenario)
+        if not reference:
+            continue
+        for endpoint, current in result['endpoints'].items():
+            before = reference['endpoints'].get(endpoint)
+            if not before:
+                continue
+
+            reasons = []
+            for metric in ("p50_ms", "p99_ms"):
+                if before[metric] and current[metric] and current[metric] > before[metric] * (1 + tolerance):
+                    reasons.append(f"{metric} {before[metric]} -> {current[metric]}")
+            if (
+                before['throughput_rps'] and current['throughput_rps'] is not None
+                and current['throughput_rps'] < before['throughput_rps'] * (1 - tolerance)
+            ):
+                reasons.append(f"débit {before['throughput_rps']} -> {current['throughput_rps']} req/s")
+            if current['error_rate'] > before['error_rate'] + 0.01:
+                reasons.append(f"erreurs {before['error_rate']:.2%} -> {current['error_rate']:.2%}")
+
+            rows.append({
+                "scenario": scenario,
+                "endpoint": endpoint,
+                "p50_change": relative_change(before['p50_ms'], current['p50_ms']),
+                "p99_change": relative_change(before['p99_ms'], current['p99_ms']),
+                "throughput_change": relative_change(before['throughput_rps'], current['throughput_rps']),
+                "regression": bool(reasons),
+                "reasons": reasons
+            })
+    return rows
+
+
+def relative_change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return round((after - before) / before, 4)
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    """Résumé lisible du rapport (une ligne par endpoint)"""
+    lines = []
+    for scenario, result in report['scenarios'].items():
+        lines.append(f"{scenario} ({result['users']} utilisateurs, {result['elapsed_seconds']}s)")
+        for endpoint, stats in result['endpoints'].items():
+            lines.append(
+                f"  {endpoint:<42} {stats['requests']:>6} req {stats['throughput_rps']:>8} req/s "
+                f"p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms erreurs={stats['error_rate']:.2%}"
+            )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    """Écarts par rapport à la référence (les régressions sont marquées)"""
+    def percent(value: Optional[float]) -> str:
+        return "   n/a" if value is None else f"{value:+.1%}"
+
+    lines = []
+    for row in rows:
+        mark = "REGRESSION" if row['regression'] else "ok"
+        lines.append(
+            f"  {row['scenario']:<18} {row['endpoint']:<42} p50 {percent(row['p50_change'])} "
+            f"p99 {percent(row['p99_change'])} débit {percent(row['throughput_change'])}  {mark}"
+        )
+        for reason in row['reasons']:
+            lines.append(f"      {reason}")
+    return "\n".join(lines)
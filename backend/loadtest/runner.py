@@ -0,0 +1,159 @@
+"""
+Exécution des scénarios contre l'application (en processus via ASGI ou via uvicorn)
+Importé après loadtest.environment.configure()
+"""
+import asyncio
+import socket
+import subprocess
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator
+
+import httpx
+
+from config import settings
+from server import app, limiter
+from pronote_client import PronoteClient
+from ent_registry import ent_registry
+from benchmarks.fake_pronote import (
+    FakePronoteConfig, FakePronoteServer, FakePronoteClient, bench_cas, use_server
+)
+from loadtest.fake_openrouter import FakeOpenRouterConfig, FakeOpenRouterServer
+from loadtest.scenarios import SCENARIOS, PASSWORD, run_scenario
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def asgi_target(users: int) -> AsyncIterator[httpx.AsyncClient]:
+    """Application appelée en processus (sans réseau); démarrage/arrêt déclenchés à la main"""
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as http:
+            yield http
+    finally:
+        await app.router.shutdown()
+
+
+@asynccontextmanager
+async def uvicorn_target(users: int) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Application servie par uvicorn sur un port local (analyse HTTP, sockets)
+
+    Le serveur tourne dans la même boucle que les utilisateurs virtuels,
+    pour partager les faux services et fakeredis.
+    """
+    import uvicorn
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        app,
+        host="127.0.0.1",
+        port=port,
+        lifespan="on",
+        log_level="warning",
+        access_log=False
+    ))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            # Échec du démarrage: propager l'erreur
+            task.result()
+            raise RuntimeError("uvicorn s'est arrêté au démarrage")
+        await asyncio.sleep(0.05)
+
+    try:
+        limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as http:
+            yield http
+    finally:
+        server.should_exit = True
+        await task
+
+
+TARGETS = {"asgi": asgi_target, "uvicorn": uvicorn_target}
+
+
+async def run(options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Démarre les faux services, branche l'application dessus et joue les scénarios
+
+    Args:
+        options: Arguments de la ligne de commande (voir loadtest.__main__)
+
+    Returns:
+        Rapport JSON (paramètres, mesures par scénario et par endpoint, /api/health final)
+    """
+    pronote_config = FakePronoteConfig(
+        latency_ms=options['pronote_latency_ms'],
+        jitter_ms=options['pronote_latency_ms'] / 5
+    )
+    openrouter_config = FakeOpenRouterConfig(
+        first_token_ms=options['openrouter_first_token_ms'],
+        tokens=options['openrouter_tokens'],
+        token_interval_ms=options['openrouter_token_interval_ms'],
+        error_rate=options['openrouter_error_rate']
+    )
+    pronote_server = FakePronoteServer(pronote_config, password=PASSWORD).start()
+    openrouter_server = FakeOpenRouterServer(openrouter_config).start()
+
+    # Branchement des faux services dans l'application réelle
+    use_server(pronote_server)
+    PronoteClient.client_class = FakePronoteClient
+    ent_registry.register(bench_cas)
+    settings.OPENROUTER_BASE_URL = openrouter_server.base_url
+    # Tous les utilisateurs virtuels partagent la même IP: les limites slowapi fausseraient la mesure
+    limiter.enabled = options['keep_rate_limits']
+
+    results: Dict[str, Any] = {}
+    health: Dict[str, Any] = {}
+    try:
+        async with TARGETS[options['target']](options['users']) as http:
+            for name in options['scenarios']:
+                results[name] = await run_scenario(
+                    http,
+                    SCENARIOS[name],
+                    users=options['users'],
+                    schools=options['schools'],
+                    ramp_up_seconds=options['ramp_up'],
+                    iterations=options['iterations'],
+                    think_seconds=options['think_ms'] / 1000,
+                    seed=options['seed'],
+                    # ASGITransport met la réponse en tampon: le 1er token arriverait avec le dernier
+                    measure_first_token=options['target'] != "asgi"
+                )
+            response = await http.get("/api/health")
+            health = response.json()
+    finally:
+        pronote_server.stop()
+        openrouter_server.stop()
+
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "git_commit": git_commit(),
+        "target": options['target'],
+        "redis": options['redis'],
+        "options": {
+            key: options[key]
+            for key in ("users", "schools", "ramp_up", "iterations", "think_ms", "seed", "keep_rate_limits")
+        },
+        "fake_pronote": pronote_config.to_dict(),
+        "fake_openrouter": openrouter_config.to_dict(),
+        "scenarios": results,
+        "health": health
+    }
+
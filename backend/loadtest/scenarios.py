@@ -0,0 +1,266 @@
+"""
+Scénarios de charge: utilisateurs virtuels et parcours types
+"""
+import asyncio
+import random
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+import httpx
+
+from loadtest.report import Recorder
+
+
+PASSWORD = "bench"
+
+# Connexions préalables simultanées des scénarios qui supposent une session
+SETUP_CONCURRENCY = 20
+
+# Questions posées à l'assistant (les répétitions d'un même élève passent par le cache IA)
+QUESTIONS = (
+    "Quels sont mes devoirs pour demain ?",
+    "Mon emploi du temps de cette semaine",
+    "Quelle est ma moyenne en mathématiques ?",
+    "Résumé de ma semaine",
+    "Qu'est-ce que je dois réviser pour le contrôle ?",
+)
+
+
+class VirtualUser:
+    """Élève simulé: une session, un établissement, un tirage aléatoire reproductible"""
+
+    def __init__(
+        self,
+        http: httpx.AsyncClient,
+        recorder: Recorder,
+        scenario: str,
+        index: int,
+        schools: int,
+        think_seconds: float,
+        seed: int,
+        measure_first_token: bool = True
+    ):
+        self.http = http
+        self.recorder = recorder
+        self.index = index
+        self.username = f"{scenario}{index}"
+        self.pronote_url = f"https://load{index % schools:03d}.index-education.net/pronote/eleve.html"
+        self.think_seconds = think_seconds
+        self.measure_first_token = measure_first_token
+        self.rng = random.Random(seed * 100003 + index)
+        self.token: Optional[str] = None
+        self.sync_cursor: Optional[str] = None
+        # Les requêtes de mise en place (connexion préalable) ne sont pas mesurées
+        self.recording = True
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    async def think(self, scale: float = 1.0):
+        """Temps de lecture entre deux actions (loi exponentielle)"""
+        if self.think_seconds > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / (self.think_seconds * scale)))
+
+    def _record(self, endpoint: str, started_at: float, code: Optional[str]):
+        if not self.recording:
+            return
+        if code is None:
+            self.recorder.success(endpoint, time.perf_counter() - started_at)
+        else:
+            self.recorder.failure(endpoint, code)
+
+    async def request(self, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        """Requête mesurée; 2xx et 304 comptent comme des succès"""
+        endpoint = f"{method} {path}"
+        started_at = time.perf_counter()
+        try:
+            response = await self.http.request(method, path, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self._record(endpoint, started_at, type(e).__name__)
+            return None
+        ok = 200 <= response.status_code < 300 or response.status_code == 304
+        self._record(endpoint, started_at, None if ok else str(response.status_code))
+        return response
+
+    async def login(self, cas: bool = False) -> Optional[httpx.Response]:
+        body = {"pronote_url": self.pronote_url, "username": self.username, "password": PASSWORD}
+        if cas:
+            body["ent_name"] = "bench_cas"
+        response = await self.request("POST", "/api/auth/login/cas" if cas else "/api/auth/login/direct", json=body)
+        if response is not None and response.status_code == 200:
+            self.token = response.json()['access_token']
+        return response
+
+    async def logout(self):
+        if self.token:
+            await self.request("POST", "/api/auth/logout")
+            self.token = None
+
+    async def dashboard(self):
+        await self.request("POST", "/api/pronote/dashboard")
+
+    async def homework(self):
+        await self.request("POST", "/api/pronote/homework", json={})
+
+    async def timetable(self):
+        await self.request("POST", "/api/pronote/timetable", json={})
+
+    async def sync(self):
+        params = {"cursor": self.sync_cursor} if self.sync_cursor else {}
+        response = await self.request("POST", "/api/pronote/sync", params=params)
+        if response is not None and response.status_code == 200:
+            self.sync_cursor = response.json().get('cursor')
+
+    async def chat(self, message: str):
+        await self.request("POST", "/api/ai/chat", json={"message": message})
+
+    async def chat_stream(self, message: str):
+        """Chat streamé: durée totale du flux et délai du premier token (si mesurable)"""
+        endpoint = "POST /api/ai/chat/stream"
+        started_at = time.perf_counter()
+        first_token: Optional[float] = None
+        failed = False
+        try:
+            async with self.http.stream(
+                "POST", "/api/ai/chat/stream", json={"message": message}, headers=self.headers
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    self._record(endpoint, started_at, str(response.status_code))
+                    return
+                async for line in response.aiter_lines():
+                    if line.startswith("event: token") and first_token is None:
+                        first_token = time.perf_counter()
+                    elif line.startswith("event: error"):
+                        failed = True
+        except httpx.HTTPError as e:
+            self._record(endpoint, started_at, type(e).__name__)
+            return
+
+        self._record(endpoint, started_at, "sse_error" if failed else None)
+        if first_token is not None and self.recording and self.measure_first_token:
+            self.recorder.success(f"{endpoint} (1er token)", first_token - started_at)
+
+
+async def login_storm(user: VirtualUser, iterations: int):
+    """Vague du matin: connexion (30% via ENT), tableau de bord, parfois les devoirs"""
+    await user.login(cas=user.rng.random() < 0.3)
+    if not user.token:
+        return
+    await user.dashboard()
+    if user.rng.random() < 0.5:
+        await user.think()
+        await user.homework()
+
+
+async def dashboard_refresh(user: VirtualUser, iterations: int):
+    """Élève connecté qui revient régulièrement sur l'application"""
+    for _ in range(iterations):
+        roll = user.rng.random()
+        if roll < 0.7:
+            await user.dashboard()
+        elif roll < 0.9:
+            await user.sync()
+        else:
+            await user.timetable()
+        await user.think()
+
+
+async def chat_burst(user: VirtualUser, iterations: int):
+    """Rafale de questions rapprochées à l'assistant (60% en streaming)"""
+    for _ in range(iterations):
+        message = user.rng.choice(QUESTIONS)
+        if user.rng.random() < 0.6:
+            await user.chat_stream(message)
+        else:
+            await user.chat(message)
+        await user.think(scale=0.5)
+
+
+class Scenario:
+    """Parcours exécuté par chaque utilisateur virtuel"""
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[VirtualUser, int], Awaitable[None]],
+        needs_session: bool
+    ):
+        self.name = name
+        self.run = run
+        # Connexion préalable (non mesurée) avant le parcours
+        self.needs_session = needs_session
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("login_storm", login_storm, needs_session=False),
+        Scenario("dashboard_refresh", dashboard_refresh, needs_session=True),
+        Scenario("chat_burst", chat_burst, needs_session=True),
+    )
+}
+
+
+async def run_scenario(
+    http: httpx.AsyncClient,
+    scenario: Scenario,
+    users: int,
+    schools: int,
+    ramp_up_seconds: float,
+    iterations: int,
+    think_seconds: float,
+    seed: int,
+    measure_first_token: bool = True
+) -> Dict[str, Any]:
+    """
+    Lance `users` utilisateurs virtuels, démarrés régulièrement sur
+    `ramp_up_seconds`, puis ferme leurs sessions
+
+    Une connexion préalable en échec est comptée comme une erreur
+    "(connexion préalable)" et l'utilisateur ne joue pas le parcours.
+
+    Returns:
+        Dict avec durée du scénario et mesures par endpoint
+    """
+    recorder = Recorder()
+    population = [
+        VirtualUser(http, recorder, scenario.name, index, schools, think_seconds, seed, measure_first_token)
+        for index in range(users)
+    ]
+
+    if scenario.needs_session:
+        # Connexions préalables étalées pour ne pas saturer l'exécuteur Pronote
+        setup = asyncio.Semaphore(SETUP_CONCURRENCY)
+
+        async def prepare(user: VirtualUser):
+            async with setup:
+                user.recording = False
+                response = await user.login()
+                user.recording = True
+                if not user.token:
+                    code = str(response.status_code) if response is not None else "no_response"
+                    recorder.failure("POST /api/auth/login/direct (connexion préalable)", code)
+
+        await asyncio.gather(*(prepare(user) for user in population))
+
+    async def start(user: VirtualUser):
+        await asyncio.sleep(ramp_up_seconds * user.index / users)
+        if scenario.needs_session and not user.token:
+            return
+        await scenario.run(user, iterations)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(start(user) for user in population))
+    elapsed = time.perf_counter() - started_at
+
+    for user in population:
+        user.recording = False
+    await asyncio.gather(*(user.logout() for user in population))
+
+    return {
+        "users": users,
+        "elapsed_seconds": round(elapsed, 2),
+        "endpoints": recorder.report(elapsed)
+    }
@@ -0,0 +1,147 @@
+"""
+Métriques Prometheus (exposées sur /metrics si ENABLE_METRICS)
+Latence par route, par ENT et par service amont (Pronote, Redis, OpenRouter)
+"""
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Tuple
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from config import settings
+
+
+# Seaux adaptés à des appels réseau (Pronote et OpenRouter peuvent dépasser 10s)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+REDIS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Durée des requêtes HTTP par route (jusqu'aux en-têtes de réponse)",
+    ["method", "route", "status"]
+)
+
+PRONOTE_LOGIN_DURATION = Histogram(
+    "pronote_login_duration_seconds",
+    "Durée des connexions Pronote par ENT et type d'authentification",
+    ["ent_name", "auth_type", "outcome"],
+    buckets=UPSTREAM_BUCKETS
+)
+
+PRONOTE_FETCH_DURATION = Histogram(
+    "pronote_fetch_duration_seconds",
+    "Durée des récupérations pronotepy par ressource",
+    ["resource", "outcome"],
+    buckets=UPSTREAM_BUCKETS
+)
+
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Durée des commandes Redis (PIPELINE pour un pipeline complet)",
+    ["command", "outcome"],
+    buckets=REDIS_BUCKETS
+)
+
+OPENROUTER_REQUEST_DURATION = Histogram(
+    "openrouter_request_duration_seconds",
+    "Durée des appels OpenRouter (nouveaux essais compris)",
+    ["model", "mode", "outcome"],
+    buckets=UPSTREAM_BUCKETS
+)
+
+OPENROUTER_FIRST_TOKEN = Histogram(
+    "openrouter_first_token_seconds",
+    "Délai avant le premier token en streaming",
+    ["model"],
+    buckets=UPSTREAM_BUCKETS
+)
+
+OPENROUTER_TOKENS = Counter(
+    "openrouter_tokens_total",
+    "Tokens consommés sur OpenRouter",
+    ["model", "kind"]
+)
+
+RETRIES = Counter(
+    "retries_total",
+    "Décisions de nouvel essai par politique et ressource (retried, budget_exhausted, attempts_exhausted)",
+    ["policy", "resource", "outcome"]
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Lectures du cache des données Pronote (hit, stale ou miss)",
+    ["resource", "result"]
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels) -> Iterator[None]:
+    """
+    Mesure la durée du bloc dans un histogramme
+
+    Le label outcome ("ok" ou "error") est ajouté selon que le bloc
+    lève une exception ou non.
+    """
+    if not settings.ENABLE_METRICS:
+        yield
+        return
+
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - start)
+
+
+def record_tokens(model: str, usage: dict):
+    """Compte les tokens d'une réponse OpenRouter (champ usage)"""
+    if not settings.ENABLE_METRICS or not usage:
+        return
+    for kind in ("prompt", "completion"):
+        count = usage.get(f"{kind}_tokens")
+        if count:
+            OPENROUTER_TOKENS.labels(model=model, kind=kind).inc(count)
+
+
+def record_cache(resource: str, result: str):
+    """Compte une lecture du cache des données Pronote"""
+    if settings.ENABLE_METRICS:
+        CACHE_REQUESTS.labels(resource=resource, result=result).inc()
+
+
+def record_retry(policy: str, resource: str, outcome: str):
+    """Compte une décision de nouvel essai"""
+    if settings.ENABLE_METRICS:
+        RETRIES.labels(policy=policy, resource=resource, outcome=outcome).inc()
+
+
+class StatsCollector:
+    """
+    Valeurs lues au moment du scrape dans les stats() des composants
+    (files d'attente, pools, caches en mémoire), sans coût sur les requêtes
+    """
+
+    def __init__(self):
+        self._gauges: List[Tuple[str, str, Callable[[], float]]] = []
+        self._counters: List[Tuple[str, str, Callable[[], float]]] = []
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], float]):
+        self._gauges.append((name, documentation, read))
+
+    def counter(self, name: str, documentation: str, read: Callable[[], float]):
+        self._counters.append((name, documentation, read))
+
+    def collect(self):
+        for name, documentation, read in self._gauges:
+            yield GaugeMetricFamily(name, documentation, value=read())
+        for name, documentation, read in self._counters:
+            yield CounterMetricFamily(name, documentation, value=read())
+
+
+# Instance globale
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
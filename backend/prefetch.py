@@ -0,0 +1,212 @@
+"""
+Préchargement des données Pronote en heures creuses
+Réchauffe le cache (emploi du temps et devoirs) des sessions actives avant les pics de connexion
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, time as dtime, timedelta
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable, Deque
+
+import pytz
+from loguru import logger
+
+from config import settings
+from auth import auth_service
+from cache import ResponseCache
+from redis_pool import get_redis
+from singleflight import RedisLock
+from throttling import TokenBucket, KeyedTokenBuckets, host_key
+
+
+# Attente du débit autorisé, avant chaque appel Pronote
+Throttle = Callable[[], Awaitable[None]]
+
+# Coroutine de préchargement d'une session: (token, session, jour cible, débit) -> ressources récupérées
+Warmer = Callable[[str, Dict[str, Any], datetime, Throttle], Awaitable[int]]
+
+
+def parse_windows(raw: str) -> List[Tuple[dtime, dtime]]:
+    """Parse "05:00-07:00,14:00-16:00" (une plage peut passer minuit: "23:00-01:00")"""
+    windows = []
+    for item in raw.split(','):
+        if '-' not in item:
+            continue
+        start, end = item.split('-', 1)
+        windows.append((
+            datetime.strptime(start.strip(), "%H:%M").time(),
+            datetime.strptime(end.strip(), "%H:%M").time()
+        ))
+    return windows
+
+
+class PrefetchScheduler:
+    """
+    Tâche de fond de préchargement
+
+    Pendant les plages creuses (PREFETCH_WINDOWS, heure de PREFETCH_TIMEZONE),
+    toutes les PREFETCH_INTERVAL_SECONDS:
+    - un seul worker (verrou Redis) parcourt les sessions actives récemment
+    - les plages par défaut du jour cible (jour où l'entrée cessera d'être
+      fraîche, donc le lendemain pour un passage du soir) sont récupérées
+      et mises en cache pour PREFETCH_FRESH_SECONDS
+    - un seau à jetons global et un seau par hôte Pronote limitent le débit
+      (un jeton par appel Pronote, connexion comprise), et les
+      établissements sont servis à tour de rôle
+    """
+
+    def __init__(self):
+        self.timezone = pytz.timezone(settings.PREFETCH_TIMEZONE)
+        self.windows = parse_windows(settings.PREFETCH_WINDOWS)
+        self.interval = settings.PREFETCH_INTERVAL_SECONDS
+        self.fresh_for = settings.PREFETCH_FRESH_SECONDS
+        self.global_bucket = TokenBucket(settings.PREFETCH_RATE_PER_SECOND)
+        self.host_buckets = KeyedTokenBuckets(settings.PREFETCH_HOST_RATE_PER_SECOND)
+
+        # Verrou de leader sur le client Redis asynchrone partagé (comme RedisSingleFlight)
+        self.redis_client = get_redis()
+
+        self._warmer: Optional[Warmer] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_run: Optional[Dict[str, Any]] = None
+        self._runs = 0
+
+    def start(self, warmer: Warmer):
+        """
+        Démarre la tâche de fond
+
+        Args:
+            warmer: Coroutine qui précharge une session (fournie par le serveur)
+        """
+        if settings.PREFETCH_ENABLED and not self._task:
+            self._warmer = warmer
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Préchargement actif ({settings.PREFETCH_WINDOWS}, {settings.PREFETCH_TIMEZONE})")
+
+    async def stop(self):
+        """Arrête la tâche de fond"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def in_window(self, now: Optional[datetime] = None) -> bool:
+        """L'heure locale est-elle dans une plage creuse ?"""
+        current = (now or datetime.now(self.timezone)).time()
+        for start, end in self.windows:
+            if start <= end:
+                if start <= current < end:
+                    return True
+            elif current >= start or current < end:
+                return True
+        return False
+
+    def target_day(self, now: Optional[datetime] = None) -> datetime:
+        """Jour dont on précharge les plages par défaut (sans fuseau horaire)"""
+        now = now or datetime.now(self.timezone)
+        return (now + timedelta(seconds=self.fresh_for)).replace(tzinfo=None)
+
+    async def _loop(self):
+        while True:
+            try:
+                if self.in_window():
+                    await self.run_once()
+            except Exception as e:
+                logger.error(f"Erreur préchargement: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> Optional[Dict[str, Any]]:
+        """
+        Un passage de préchargement, si ce worker obtient le verrou
+
+        Returns:
+            Bilan du passage, ou None si un autre worker s'en charge
+        """
+        lock = RedisLock(self.redis_client, "prefetch:leader", settings.PREFETCH_LEADER_EXPIRE_SECONDS)
+        if not await lock.acquire(timeout=0):
+            return None
+
+        try:
+            return await self._prefetch_all()
+        finally:
+            try:
+                await lock.release()
+            except Exception as e:
+                logger.warning(f"Erreur libération verrou préchargement: {str(e)}")
+
+    async def _prefetch_all(self) -> Dict[str, Any]:
+        started_at = time.monotonic()
+        day = self.target_day()
+        tokens = await auth_service.session_manager.active_sessions(
+            settings.PREFETCH_ACTIVE_WITHIN_SECONDS
+        )
+
+        # Une seule session par élève (même clé de cache), groupées par hôte
+        by_host: Dict[str, Deque[Tuple[str, Dict[str, Any]]]] = {}
+        seen = set()
+        for token in tokens[:settings.PREFETCH_MAX_SESSIONS]:
+            session_data = await auth_service.session_manager.peek_session(token)
+            if not session_data or not session_data.get('credentials'):
+                continue
+            user_key = ResponseCache.user_key(session_data['pronote_data'])
+            if user_key in seen:
+                continue
+            seen.add(user_key)
+            host = host_key(session_data['pronote_data']['pronote_url'])
+            by_host.setdefault(host, deque()).append((token, session_data))
+
+        # Tourniquet entre établissements
+        queue: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        while by_host:
+            for host in list(by_host):
+                queue.append(by_host[host].popleft())
+                if not by_host[host]:
+                    del by_host[host]
+
+        report = {"day": day.date().isoformat(), "sessions": len(queue), "fetches": 0, "errors": 0}
+
+        async def worker():
+            while queue:
+                token, session_data = queue.popleft()
+                host = host_key(session_data['pronote_data']['pronote_url'])
+
+                async def throttle():
+                    await self.host_buckets.acquire(host)
+                    await self.global_bucket.acquire()
+
+                try:
+                    # Résultat attendu avant l'incrément: += relirait un compteur périmé
+                    fetched = await self._warmer(token, session_data, day, throttle)
+                    report['fetches'] += fetched
+                except Exception as e:
+                    report['errors'] += 1
+                    logger.warning(f"Préchargement échoué ({session_data['user_id']}): {str(e)}")
+
+        await asyncio.gather(*(worker() for _ in range(settings.PREFETCH_CONCURRENCY)))
+
+        report['duration_seconds'] = round(time.monotonic() - started_at, 1)
+        self._last_run = {**report, "finished_at": datetime.utcnow().isoformat()}
+        self._runs += 1
+        logger.info(
+            f"Préchargement du {report['day']}: {report['sessions']} sessions, "
+            f"{report['fetches']} ressources récupérées, {report['errors']} erreurs "
+            f"en {report['duration_seconds']}s"
+        )
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du préchargement (exposées par /api/health)"""
+        return {
+            "enabled": settings.PREFETCH_ENABLED,
+            "running": self._task is not None,
+            "in_window": self.in_window(),
+            "runs": self._runs,
+            "last_run": self._last_run
+        }
+
+
+# Instance globale
+prefetch_scheduler = PrefetchScheduler()
@@ -3,13 +3,22 @@ Client Pronote avec support CAS (monlycee.net, ENT régionaux)
 Utilise pronotepy avec gestion avancée des erreurs
 """
 import pronotepy
-from pronotepy.ent import ent_list
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Tuple
 from datetime import datetime, timedelta
 from loguru import logger
 import asyncio
-from functools import wraps
+import threading
+import time
 import traceback
+import requests
+
+from config import settings
+from executor import pronote_executor, ExecutorSaturatedError
+from circuit_breaker import pronote_breakers, CircuitOpenError
+from throttling import pronote_host_buckets, host_key
+from ent_registry import ent_registry, normalize_ent_id
+from retry_policy import RetryPolicy, RetryBudget, TRANSIENT, AUTH, NOT_FOUND, BUSY, PERMANENT
+from metrics import timed, PRONOTE_LOGIN_DURATION, PRONOTE_FETCH_DURATION
 
 
 class PronoteException(Exception):
@@ -22,35 +31,229 @@ class CASAuthenticationError(PronoteException):
     pass
 
 
+class PronoteBusyError(PronoteException):
+    """Trop d'appels Pronote en attente"""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PronoteUnavailableError(PronoteBusyError):
+    """Hôte Pronote court-circuité après des échecs répétés"""
+    pass
+
+
+class PronoteTimeoutError(PronoteException):
+    """Pronote n'a pas répondu dans le délai imparti"""
+    pass
+
+
+class PronoteNotFoundError(PronoteException):
+    """Ressource demandée absente (ex: période inconnue)"""
+    pass
+
+
+def classify_pronote_error(error: BaseException) -> str:
+    """
+    Classe d'une erreur Pronote pour la politique de nouveaux essais
+    
+    Les erreurs encapsulées (raise ... from e) sont examinées jusqu'à la cause d'origine.
+    """
+    current: Optional[BaseException] = error
+    while current is not None:
+        if isinstance(current, PronoteBusyError):
+            return BUSY
+        if isinstance(current, (PronoteNotFoundError, pronotepy.ChildNotFound)):
+            return NOT_FOUND
+        if isinstance(current, (
+            CASAuthenticationError, pronotepy.CryptoError,
+            pronotepy.ENTLoginError, pronotepy.ExpiredObject
+        )):
+            return AUTH
+        if isinstance(current, (
+            PronoteTimeoutError, asyncio.TimeoutError,
+            requests.ConnectionError, requests.Timeout, pronotepy.PronoteAPIError
+        )):
+            return TRANSIENT
+        if isinstance(current, requests.HTTPError) and current.response is not None:
+            code = current.response.status_code
+            if code >= 500 or code == 429:
+                return TRANSIENT
+            return AUTH if code in (401, 403) else PERMANENT
+        current = current.__cause__
+    return PERMANENT
+
+
+# Politique partagée par tous les clients (le budget est global au worker)
+pronote_retry_policy = RetryPolicy(
+    "pronote",
+    classify_pronote_error,
+    max_attempts=settings.PRONOTE_RETRY_MAX_ATTEMPTS,
+    base_delay=settings.PRONOTE_RETRY_BASE_DELAY_SECONDS,
+    max_delay=settings.PRONOTE_RETRY_MAX_DELAY_SECONDS,
+    budget=RetryBudget(
+        settings.PRONOTE_RETRY_BUDGET_RATIO,
+        settings.PRONOTE_RETRY_BUDGET_MIN_RETRIES,
+        settings.PRONOTE_RETRY_BUDGET_WINDOW_SECONDS
+    )
+)
+
+
+def export_cookies(jar: requests.cookies.RequestsCookieJar) -> List[Dict[str, Any]]:
+    """Cookie jar ENT sérialisable (cookies expirés exclus)"""
+    now = time.time()
+    return [
+        {
+            "name": cookie.name,
+            "value": cookie.value,
+            "domain": cookie.domain,
+            "path": cookie.path,
+            "secure": cookie.secure,
+            "expires": cookie.expires
+        }
+        for cookie in jar
+        if not cookie.expires or cookie.expires > now
+    ]
+
+
+def import_cookies(cookies: List[Dict[str, Any]]) -> requests.cookies.RequestsCookieJar:
+    """Cookie jar ENT à partir de sa forme sérialisée"""
+    jar = requests.cookies.RequestsCookieJar()
+    for cookie in cookies:
+        jar.set_cookie(requests.cookies.create_cookie(**cookie))
+    return jar
+
+
+class ReusableEntLogin:
+    """
+    Fonction ENT pronotepy qui réutilise un cookie jar enregistré
+    
+    pronotepy appelle ent(username, password) et transmet les cookies
+    obtenus à Pronote. Au premier appel, le cookie jar enregistré (dont le
+    ticket CAS TGC) est renvoyé tel quel: si l'ENT le reconnaît encore, la
+    redirection CAS aboutit sans formulaire d'identifiants. Les appels
+    suivants (ou sans cookie jar) font la connexion ENT complète et
+    enregistrent le nouveau cookie jar.
+    """
+    
+    def __init__(self, ent: Callable, cookies: Optional[List[Dict[str, Any]]] = None):
+        self.ent = ent
+        self.__name__ = getattr(ent, '__name__', 'ent')
+        self._pending = cookies
+        self.reused = False
+        self.cookies: Optional[List[Dict[str, Any]]] = cookies
+    
+    def __call__(self, username: str, password: str, **kwargs) -> requests.cookies.RequestsCookieJar:
+        if self._pending:
+            jar = import_cookies(self._pending)
+            self._pending = None
+            self.reused = True
+            return jar
+        
+        jar = self.ent(username, password, **kwargs)
+        self.reused = False
+        self.cookies = export_cookies(jar)
+        return jar
+
+
 class PronoteClient:
     """
     Client robuste pour interagir avec Pronote
     Support authentification directe + CAS (monlycee.net, ENT régionaux)
     """
     
+    # Classe du client pronotepy (remplaçable par un faux client dans les benchmarks)
+    client_class = pronotepy.Client
+    
     def __init__(self):
         self.client: Optional[pronotepy.Client] = None
         self.session_info: Dict[str, Any] = {}
+        # Hôte Pronote (clé du disjoncteur et du seau à jetons)
+        self.host: Optional[str] = None
+        # Cookie jar ENT de la dernière connexion CAS (à conserver dans le coffre de session)
+        self.ent_cookies: Optional[List[Dict[str, Any]]] = None
+        self.ent_cookies_reused = False
+        # pronotepy n'est pas thread-safe: un seul appel à la fois par client
+        self._lock = threading.Lock()
     
     @staticmethod
-    def retry_on_failure(max_attempts=3, delay=2):
-        """Décorateur pour réessayer en cas d'échec"""
-        def decorator(func):
-            @wraps(func)
-            async def wrapper(*args, **kwargs):
-                for attempt in range(max_attempts):
-                    try:
-                        return await func(*args, **kwargs)
-                    except Exception as e:
-                        if attempt == max_attempts - 1:
-                            raise
-                        logger.warning(
-                            f"Tentative {attempt + 1}/{max_attempts} échouée: {str(e)}"
-                        )
-                        await asyncio.sleep(delay * (attempt + 1))
-                return None
-            return wrapper
-        return decorator
+    def _is_upstream_failure(error: BaseException) -> bool:
+        """L'erreur révèle-t-elle un hôte Pronote en difficulté ? (pas des identifiants refusés)"""
+        if isinstance(error, (asyncio.TimeoutError, requests.ConnectionError, requests.Timeout)):
+            return True
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code >= 500
+        return False
+    
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Exécute un appel pronotepy bloquant dans le pool de threads dédié
+        
+        L'appel passe d'abord par le disjoncteur puis par le seau à jetons
+        de l'hôte Pronote: un établissement en panne ou surchargé est servi
+        en échec immédiat au lieu d'occuper les threads.
+        
+        Args:
+            func: Fonction synchrone (appel réseau pronotepy)
+        
+        Returns:
+            Résultat de la fonction
+        """
+        # Début de l'appel réseau (après la file de l'exécuteur et le verrou du client)
+        upstream_started: List[float] = []
+        
+        def locked_call():
+            with self._lock:
+                upstream_started.append(time.monotonic())
+                return func(*args, **kwargs)
+        
+        breaker = pronote_breakers.get(self.host)
+        try:
+            breaker.before_call()
+        except CircuitOpenError as e:
+            raise PronoteUnavailableError(
+                "Pronote de l'établissement indisponible, réessayez dans quelques instants",
+                retry_after=e.retry_after
+            ) from e
+        
+        # Réservation atomique: l'attente inclut les appels déjà en file pour cet hôte
+        bucket = pronote_host_buckets.get(self.host)
+        wait = bucket.reserve(settings.PRONOTE_HOST_MAX_WAIT_SECONDS)
+        if wait is None:
+            breaker.on_neutral()
+            raise PronoteBusyError(
+                "Trop de requêtes vers Pronote pour cet établissement, réessayez dans quelques instants",
+                retry_after=bucket.wait_time()
+            )
+        if wait > 0:
+            await asyncio.sleep(wait)
+        
+        try:
+            result = await pronote_executor.run(locked_call)
+        except ExecutorSaturatedError as e:
+            breaker.on_neutral()
+            raise PronoteBusyError("Serveur occupé, réessayez dans quelques instants") from e
+        except asyncio.TimeoutError as e:
+            # Seul le temps passé chez Pronote compte: une file locale saturée
+            # ne doit pas ouvrir le disjoncteur d'un établissement sain
+            upstream = time.monotonic() - upstream_started[0] if upstream_started else 0.0
+            if upstream >= settings.PRONOTE_BREAKER_SLOW_CALL_SECONDS:
+                breaker.on_failure()
+            else:
+                breaker.on_neutral()
+            raise PronoteTimeoutError(
+                f"Pronote n'a pas répondu en {settings.PRONOTE_REQUEST_TIMEOUT}s"
+            ) from e
+        except BaseException as e:
+            if self._is_upstream_failure(e):
+                breaker.on_failure()
+            else:
+                breaker.on_neutral()
+            raise
+        
+        breaker.on_success()
+        return result
     
     async def authenticate_direct(
         self,
@@ -71,21 +274,25 @@ class PronoteClient:
         Returns:
             Informations de session
         """
+        self.host = host_key(pronote_url)
+        
         try:
             logger.info(f"Authentification directe vers {pronote_url}")
             
             # Créer le client Pronote
-            self.client = pronotepy.Client(
-                pronote_url,
-                username=username,
-                password=password
-            )
+            with timed(PRONOTE_LOGIN_DURATION, ent_name="direct", auth_type="direct"):
+                self.client = await self._run(
+                    self.client_class,
+                    pronote_url,
+                    username=username,
+                    password=password
+                )
             
             if not self.client.logged_in:
                 raise PronoteException("Échec d'authentification - identifiants incorrects")
             
             # Extraire les informations de session
-            self.session_info = self._extract_session_info()
+            self.session_info = await self._run(self._extract_session_info)
             
             logger.info(
                 f"Authentification réussie pour {self.session_info['student_name']}"
@@ -93,66 +300,74 @@ class PronoteClient:
             
             return self.session_info
             
+        except (PronoteBusyError, PronoteTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Erreur authentification directe: {str(e)}")
-            raise PronoteException(f"Échec authentification: {str(e)}")
+            raise PronoteException(f"Échec authentification: {str(e)}") from e
     
     async def authenticate_cas(
         self,
         pronote_url: str,
         username: str,
         password: str,
-        ent_name: str = "ac_reunion"
+        ent_name: str = "ac_reunion",
+        ent_cookies: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
         Authentification via CAS (monlycee.net, ENT régionaux)
         
+        Avec ent_cookies (cookie jar d'une connexion précédente), la connexion
+        est d'abord tentée sans repasser par le formulaire de l'ENT; si l'ENT
+        ne reconnaît plus les cookies, la connexion complète est faite.
+        Le cookie jar à conserver est ensuite disponible dans self.ent_cookies.
+        
         Args:
             pronote_url: URL Pronote
             username: Identifiant ENT
             password: Mot de passe ENT
-            ent_name: Nom de l'ENT (voir ent_list dans pronotepy.ent)
+            ent_name: Identifiant de l'ENT (voir ent_registry)
+            ent_cookies: Cookie jar ENT enregistré (voir export_cookies)
         
         Returns:
             Informations de session
         
-        ENTs supportés:
-        - ac_reunion, ac_orleans_tours, ac_rennes, ac_reims, ac_montpellier
-        - arsene76, atrium_sud, cas_kosmos, eclat_bfc, ent27, ent77
-        - ent_94, ent_creuse, ent_elyco, ent_essonne, ent_hdf, ent_somme
-        - ent_var, l_normandie, laclasse_lyon, lyceeconnecte_aquitaine
-        - lyceeconnecte_edu, mon_bureau_numerique, monlycee_net, neotech_occitanie
-        - paris_classe_numerique, toutatice, webcollege_cantal
+        ENTs supportés: voir ent_registry (dérivé de pronotepy.ent)
         """
+        self.host = host_key(pronote_url)
+        
         try:
             logger.info(
                 f"Authentification CAS via {ent_name} vers {pronote_url}"
             )
             
-            # Vérifier que l'ENT existe
-            if ent_name not in [ent.__name__.lower() for ent in ent_list]:
-                available_ents = ", ".join([ent.__name__ for ent in ent_list])
+            # Trouver la fonction ENT (registre indexé à l'import)
+            ent_id = normalize_ent_id(ent_name)
+            ent_class = ent_registry.get(ent_id)
+            if not ent_class:
                 raise CASAuthenticationError(
-                    f"ENT '{ent_name}' non supporté. "
-                    f"ENTs disponibles: {available_ents}"
+                    f"ENT '{ent_name}' non supporté (liste des ENTs: /api/ents)"
                 )
             
-            # Trouver la classe ENT correspondante
-            ent_class = next(
-                (ent for ent in ent_list if ent.__name__.lower() == ent_name.lower()),
-                None
-            )
-            
-            if not ent_class:
-                raise CASAuthenticationError(f"ENT {ent_name} non trouvé")
+            self.client = None
+            self.ent_cookies_reused = False
+            if ent_cookies:
+                self.client = await self._cas_login_reusing(
+                    pronote_url, username, password, ent_id, ent_class, ent_cookies
+                )
             
-            # Créer le client avec authentification CAS
-            self.client = pronotepy.Client.token_login(
-                pronote_url,
-                username=username,
-                password=password,
-                ent=ent_class
-            )
+            if self.client is None:
+                # Connexion CAS complète (formulaire de l'ENT)
+                ent = ReusableEntLogin(ent_class)
+                with timed(PRONOTE_LOGIN_DURATION, ent_name=ent_id, auth_type="cas"):
+                    self.client = await self._run(
+                        self.client_class,
+                        pronote_url,
+                        username=username,
+                        password=password,
+                        ent=ent
+                    )
+                self.ent_cookies = ent.cookies
             
             if not self.client.logged_in:
                 raise CASAuthenticationError(
@@ -160,7 +375,7 @@ class PronoteClient:
                 )
             
             # Extraire les informations
-            self.session_info = self._extract_session_info()
+            self.session_info = await self._run(self._extract_session_info)
             
             logger.info(
                 f"Authentification CAS réussie pour {self.session_info['student_name']}"
@@ -168,9 +383,104 @@ class PronoteClient:
             
             return self.session_info
             
+        except (PronoteBusyError, PronoteTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Erreur authentification CAS: {str(e)}\n{traceback.format_exc()}")
-            raise CASAuthenticationError(f"Échec authentification CAS: {str(e)}")
+            raise CASAuthenticationError(f"Échec authentification CAS: {str(e)}") from e
+    
+    async def _cas_login_reusing(
+        self,
+        pronote_url: str,
+        username: str,
+        password: str,
+        ent_id: str,
+        ent_class: Callable,
+        ent_cookies: List[Dict[str, Any]]
+    ) -> Optional[pronotepy.Client]:
+        """
+        Connexion CAS avec le cookie jar enregistré
+        
+        Returns:
+            Client connecté, ou None si l'ENT ne reconnaît plus les cookies
+        """
+        ent = ReusableEntLogin(ent_class, ent_cookies)
+        try:
+            with timed(PRONOTE_LOGIN_DURATION, ent_name=ent_id, auth_type="cas_reuse"):
+                client = await self._run(
+                    self.client_class,
+                    pronote_url,
+                    username=username,
+                    password=password,
+                    ent=ent
+                )
+        except (PronoteBusyError, PronoteTimeoutError):
+            raise
+        except Exception as e:
+            logger.info(f"Cookies ENT expirés, connexion CAS complète: {str(e)}")
+            return None
+        
+        if not client.logged_in:
+            logger.info("Cookies ENT refusés, connexion CAS complète")
+            return None
+        
+        self.ent_cookies = ent.cookies
+        self.ent_cookies_reused = True
+        logger.info("Connexion CAS par cookies ENT réutilisés")
+        return client
+    
+    async def login_from_session(
+        self,
+        pronote_data: Dict[str, Any],
+        credentials: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Reconnexion à partir des données d'une session existante
+        
+        Args:
+            pronote_data: Données Pronote de la session (url, username, auth_type...)
+            credentials: Identifiants déchiffrés du coffre de session
+        
+        Returns:
+            Informations de session
+        """
+        if pronote_data.get('auth_type') == 'cas':
+            return await self.authenticate_cas(
+                pronote_url=pronote_data['pronote_url'],
+                username=pronote_data['username'],
+                password=credentials['password'],
+                ent_name=pronote_data['ent_name'],
+                ent_cookies=credentials.get('ent_cookies')
+            )
+        
+        return await self.authenticate_direct(
+            pronote_url=pronote_data['pronote_url'],
+            username=pronote_data['username'],
+            password=credentials['password'],
+            account_type=pronote_data.get('account_type', 3)
+        )
+    
+    async def refresh_if_expired(self) -> bool:
+        """
+        Vérifie la session pronotepy et la renouvelle si elle a expiré
+        
+        Returns:
+            True si la session a été renouvelée
+        """
+        if not self.client:
+            raise PronoteException("Pas de session active")
+        
+        try:
+            refreshed = await self._run(self.client.session_check)
+        except (PronoteBusyError, PronoteTimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"Erreur renouvellement session Pronote: {str(e)}")
+            raise PronoteException(f"Impossible de renouveler la session: {str(e)}") from e
+        
+        if refreshed:
+            logger.info("Session Pronote expirée, renouvelée")
+        return bool(refreshed)
     
     def _extract_session_info(self) -> Dict[str, Any]:
         """Extrait les informations importantes de la session"""
@@ -187,7 +497,40 @@ class PronoteClient:
             "session_id": id(self.client)
         }
     
-    @retry_on_failure(max_attempts=3)
+    @staticmethod
+    def _whole_days(date_from: datetime, date_to: datetime) -> Tuple[datetime, datetime]:
+        """Étend une plage de dates aux journées complètes (sans fuseau horaire)"""
+        return (
+            date_from.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None),
+            date_to.replace(hour=23, minute=59, second=59, microsecond=0, tzinfo=None)
+        )
+    
+    @staticmethod
+    def homework_range(
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> Tuple[datetime, datetime]:
+        """Plage des devoirs (par défaut: aujourd'hui à +14 jours), à la journée"""
+        if not date_from:
+            date_from = datetime.now()
+        if not date_to:
+            date_to = date_from + timedelta(days=14)
+        return PronoteClient._whole_days(date_from, date_to)
+    
+    @staticmethod
+    def timetable_range(
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> Tuple[datetime, datetime]:
+        """Plage de l'emploi du temps (par défaut: lundi à dimanche de cette semaine), à la journée"""
+        if not date_from:
+            today = datetime.now()
+            date_from = today - timedelta(days=today.weekday())
+        if not date_to:
+            date_to = date_from + timedelta(days=6)
+        return PronoteClient._whole_days(date_from, date_to)
+    
+    @pronote_retry_policy.retrying("homework")
     async def get_homework(
         self,
         date_from: Optional[datetime] = None,
@@ -208,42 +551,48 @@ class PronoteClient:
         
         try:
             # Dates par défaut
-            if not date_from:
-                date_from = datetime.now()
-            if not date_to:
-                date_to = date_from + timedelta(days=14)
+            date_from, date_to = self.homework_range(date_from, date_to)
             
             logger.info(f"Récupération devoirs du {date_from} au {date_to}")
             
-            # Récupérer les devoirs depuis pronotepy
-            homework_list = self.client.homework(date_from, date_to)
-            
-            # Formater les devoirs
-            formatted_homework = []
-            for hw in homework_list:
-                formatted_homework.append({
-                    "id": hw.id if hasattr(hw, 'id') else None,
-                    "subject": hw.subject.name if hw.subject else "Matière inconnue",
-                    "description": hw.description if hw.description else "Pas de description",
-                    "done": hw.done if hasattr(hw, 'done') else False,
-                    "date": hw.date.isoformat() if hw.date else None,
-                    "files": [
-                        {
-                            "name": f.name if hasattr(f, 'name') else "Fichier",
-                            "url": f.url if hasattr(f, 'url') else None
-                        }
-                        for f in (hw.files if hasattr(hw, 'files') else [])
-                    ]
-                })
+            with timed(PRONOTE_FETCH_DURATION, resource="homework"):
+                formatted_homework = await self._run(self._fetch_homework, date_from, date_to)
             
             logger.info(f"{len(formatted_homework)} devoirs récupérés")
             return formatted_homework
             
+        except (PronoteBusyError, PronoteTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Erreur récupération devoirs: {str(e)}")
-            raise PronoteException(f"Impossible de récupérer les devoirs: {str(e)}")
+            raise PronoteException(f"Impossible de récupérer les devoirs: {str(e)}") from e
     
-    @retry_on_failure(max_attempts=3)
+    def _fetch_homework(self, date_from: datetime, date_to: datetime) -> List[Dict[str, Any]]:
+        """Appel pronotepy bloquant: devoirs formatés"""
+        # Récupérer les devoirs depuis pronotepy
+        homework_list = self.client.homework(date_from, date_to)
+        
+        # Formater les devoirs
+        formatted_homework = []
+        for hw in homework_list:
+            formatted_homework.append({
+                "id": hw.id if hasattr(hw, 'id') else None,
+                "subject": hw.subject.name if hw.subject else "Matière inconnue",
+                "description": hw.description if hw.description else "Pas de description",
+                "done": hw.done if hasattr(hw, 'done') else False,
+                "date": hw.date.isoformat() if hw.date else None,
+                "files": [
+                    {
+                        "name": f.name if hasattr(f, 'name') else "Fichier",
+                        "url": f.url if hasattr(f, 'url') else None
+                    }
+                    for f in (hw.files if hasattr(hw, 'files') else [])
+                ]
+            })
+        
+        return formatted_homework
+    
+    @pronote_retry_policy.retrying("timetable")
     async def get_timetable(
         self,
         date_from: Optional[datetime] = None,
@@ -264,45 +613,55 @@ class PronoteClient:
         
         try:
             # Dates par défaut (semaine courante)
-            if not date_from:
-                today = datetime.now()
-                date_from = today - timedelta(days=today.weekday())
-            if not date_to:
-                date_to = date_from + timedelta(days=7)
+            date_from, date_to = self.timetable_range(date_from, date_to)
             
             logger.info(f"Récupération emploi du temps du {date_from} au {date_to}")
             
-            # Récupérer l'emploi du temps
-            lessons = self.client.lessons(date_from, date_to)
-            
-            # Formater les cours
-            formatted_lessons = []
-            for lesson in lessons:
-                formatted_lessons.append({
-                    "id": lesson.id if hasattr(lesson, 'id') else None,
-                    "subject": lesson.subject.name if lesson.subject else "Cours",
-                    "teacher": lesson.teacher_name if hasattr(lesson, 'teacher_name') else None,
-                    "classroom": lesson.classroom if hasattr(lesson, 'classroom') else None,
-                    "start": lesson.start.isoformat() if lesson.start else None,
-                    "end": lesson.end.isoformat() if lesson.end else None,
-                    "status": lesson.status if hasattr(lesson, 'status') else None,
-                    "canceled": lesson.canceled if hasattr(lesson, 'canceled') else False
-                })
+            with timed(PRONOTE_FETCH_DURATION, resource="timetable"):
+                formatted_lessons = await self._run(self._fetch_timetable, date_from, date_to)
             
             logger.info(f"{len(formatted_lessons)} cours récupérés")
             return formatted_lessons
             
+        except (PronoteBusyError, PronoteTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Erreur récupération emploi du temps: {str(e)}")
-            raise PronoteException(f"Impossible de récupérer l'emploi du temps: {str(e)}")
+            raise PronoteException(f"Impossible de récupérer l'emploi du temps: {str(e)}") from e
+    
+    def _fetch_timetable(self, date_from: datetime, date_to: datetime) -> List[Dict[str, Any]]:
+        """Appel pronotepy bloquant: cours formatés"""
+        # Récupérer l'emploi du temps
+        lessons = self.client.lessons(date_from, date_to)
+        
+        # Formater les cours
+        formatted_lessons = []
+        for lesson in lessons:
+            formatted_lessons.append({
+                "id": lesson.id if hasattr(lesson, 'id') else None,
+                "subject": lesson.subject.name if lesson.subject else "Cours",
+                "teacher": lesson.teacher_name if hasattr(lesson, 'teacher_name') else None,
+                "classroom": lesson.classroom if hasattr(lesson, 'classroom') else None,
+                "start": lesson.start.isoformat() if lesson.start else None,
+                "end": lesson.end.isoformat() if lesson.end else None,
+                "status": lesson.status if hasattr(lesson, 'status') else None,
+                "canceled": lesson.canceled if hasattr(lesson, 'canceled') else False
+            })
+        
+        return formatted_lessons
     
-    @retry_on_failure(max_attempts=3)
-    async def get_grades(self, period_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    @pronote_retry_policy.retrying("grades")
+    async def get_grades(
+        self,
+        period_name: Optional[str] = None,
+        current_period: bool = False
+    ) -> List[Dict[str, Any]]:
         """
         Récupère les notes
         
         Args:
             period_name: Nom de la période (ex: "Trimestre 1", None = toutes)
+            current_period: Uniquement la période en cours (ignore period_name)
         
         Returns:
             Liste des notes
@@ -313,43 +672,59 @@ class PronoteClient:
         try:
             logger.info("Récupération des notes")
             
-            # Récupérer toutes les périodes
-            periods = self.client.periods
-            
-            # Sélectionner la période
-            if period_name:
-                period = next(
-                    (p for p in periods if p.name == period_name),
-                    None
-                )
-                if not period:
-                    raise PronoteException(f"Période '{period_name}' non trouvée")
-                periods_to_fetch = [period]
-            else:
-                periods_to_fetch = periods
-            
-            # Récupérer les notes
-            all_grades = []
-            for period in periods_to_fetch:
-                grades = period.grades if hasattr(period, 'grades') else []
-                
-                for grade in grades:
-                    all_grades.append({
-                        "subject": grade.subject.name if grade.subject else "Matière",
-                        "grade": grade.grade if hasattr(grade, 'grade') else None,
-                        "out_of": grade.out_of if hasattr(grade, 'out_of') else 20,
-                        "date": grade.date.isoformat() if hasattr(grade, 'date') and grade.date else None,
-                        "period": period.name,
-                        "coefficient": grade.coefficient if hasattr(grade, 'coefficient') else 1,
-                        "comment": grade.comment if hasattr(grade, 'comment') else None
-                    })
+            with timed(PRONOTE_FETCH_DURATION, resource="grades"):
+                all_grades = await self._run(self._fetch_grades, period_name, current_period)
             
             logger.info(f"{len(all_grades)} notes récupérées")
             return all_grades
             
+        except (PronoteBusyError, PronoteTimeoutError, PronoteNotFoundError):
+            raise
         except Exception as e:
             logger.error(f"Erreur récupération notes: {str(e)}")
-            raise PronoteException(f"Impossible de récupérer les notes: {str(e)}")
+            raise PronoteException(f"Impossible de récupérer les notes: {str(e)}") from e
+    
+    def _fetch_grades(
+        self,
+        period_name: Optional[str],
+        current_period: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Appel pronotepy bloquant: notes formatées"""
+        # Récupérer toutes les périodes
+        periods = self.client.periods
+        
+        # Sélectionner la période
+        if current_period:
+            periods_to_fetch = [self.client.current_period]
+        elif period_name:
+            period = next(
+                (p for p in periods if p.name == period_name),
+                None
+            )
+            if not period:
+                raise PronoteNotFoundError(f"Période '{period_name}' non trouvée")
+            periods_to_fetch = [period]
+        else:
+            periods_to_fetch = periods
+        
+        # Récupérer les notes
+        all_grades = []
+        for period in periods_to_fetch:
+            grades = period.grades if hasattr(period, 'grades') else []
+            
+            for grade in grades:
+                all_grades.append({
+                    "id": grade.id if hasattr(grade, 'id') else None,
+                    "subject": grade.subject.name if grade.subject else "Matière",
+                    "grade": grade.grade if hasattr(grade, 'grade') else None,
+                    "out_of": grade.out_of if hasattr(grade, 'out_of') else 20,
+                    "date": grade.date.isoformat() if hasattr(grade, 'date') and grade.date else None,
+                    "period": period.name,
+                    "coefficient": grade.coefficient if hasattr(grade, 'coefficient') else 1,
+                    "comment": grade.comment if hasattr(grade, 'comment') else None
+                })
+        
+        return all_grades
     
     def disconnect(self):
         """Ferme proprement la session Pronote"""
@@ -361,35 +736,3 @@ class PronoteClient:
             except Exception as e:
                 logger.warning(f"Erreur lors de la fermeture: {str(e)}")
 
-
-# Liste des ENTs supportés pour l'interface
-SUPPORTED_ENTS = [
-    {"id": "ac_reunion", "name": "Académie de La Réunion"},
-    {"id": "ac_orleans_tours", "name": "Académie Orléans-Tours"},
-    {"id": "ac_rennes", "name": "Académie de Rennes"},
-    {"id": "ac_reims", "name": "Académie de Reims"},
-    {"id": "ac_montpellier", "name": "Académie de Montpellier"},
-    {"id": "arsene76", "name": "Arsene76 (Seine-Maritime)"},
-    {"id": "atrium_sud", "name": "Atrium Sud (PACA)"},
-    {"id": "cas_kosmos", "name": "CAS Kosmos"},
-    {"id": "eclat_bfc", "name": "Eclat-BFC (Bourgogne-Franche-Comté)"},
-    {"id": "ent27", "name": "ENT27 (Eure)"},
-    {"id": "ent77", "name": "ENT77 (Seine-et-Marne)"},
-    {"id": "ent_94", "name": "ENT94 (Val-de-Marne)"},
-    {"id": "ent_creuse", "name": "ENT Creuse"},
-    {"id": "ent_elyco", "name": "e-lyco (Pays de la Loire)"},
-    {"id": "ent_essonne", "name": "ENT Essonne"},
-    {"id": "ent_hdf", "name": "ENT Hauts-de-France"},
-    {"id": "ent_somme", "name": "ENT Somme"},
-    {"id": "ent_var", "name": "ENT Var"},
-    {"id": "l_normandie", "name": "L'Educ de Normandie"},
-    {"id": "laclasse_lyon", "name": "Laclasse.com (Lyon)"},
-    {"id": "lyceeconnecte_aquitaine", "name": "Lycée Connecté (Nouvelle-Aquitaine)"},
-    {"id": "lyceeconnecte_edu", "name": "Lycée Connecté"},
-    {"id": "mon_bureau_numerique", "name": "Mon Bureau Numérique (Grand Est)"},
-    {"id": "monlycee_net", "name": "Mon lycée.net (Île-de-France)"},
-    {"id": "neotech_occitanie", "name": "Néo (Occitanie)"},
-    {"id": "paris_classe_numerique", "name": "Paris Classe Numérique"},
-    {"id": "toutatice", "name": "Toutatice (Bretagne)"},
-    {"id": "webcollege_cantal", "name": "Webcollège Cantal"}
-]
@@ -0,0 +1,61 @@
+"""
+Pool de connexions Redis asynchrone partagé
+Sessions et cache utilisent les mêmes connexions, avec taille et timeouts configurables
+"""
+import redis.asyncio as aioredis
+from redis.asyncio.client import Pipeline
+
+from config import settings
+from metrics import timed, REDIS_COMMAND_DURATION
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline dont l'exécution complète est mesurée"""
+
+    async def execute(self, raise_on_error: bool = True):
+        with timed(REDIS_COMMAND_DURATION, command="PIPELINE"):
+            return await super().execute(raise_on_error)
+
+
+class InstrumentedRedis(aioredis.Redis):
+    """Client Redis qui mesure la durée de chaque commande (métriques Prometheus)"""
+
+    async def execute_command(self, *args, **options):
+        with timed(REDIS_COMMAND_DURATION, command=str(args[0]).upper()):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+def create_connection_pool() -> aioredis.BlockingConnectionPool:
+    """
+    Crée le pool de connexions Redis
+
+    Pool bloquant: quand toutes les connexions sont prises, une commande
+    attend au plus REDIS_POOL_TIMEOUT_SECONDS au lieu d'ouvrir une
+    connexion supplémentaire.
+    """
+    return aioredis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+        health_check_interval=30,
+        decode_responses=True
+    )
+
+
+def get_redis() -> aioredis.Redis:
+    """Client Redis asynchrone adossé au pool partagé"""
+    if settings.ENABLE_METRICS:
+        return InstrumentedRedis(connection_pool=redis_pool)
+    return aioredis.Redis(connection_pool=redis_pool)
+
+
+# Instance globale
+redis_pool = create_connection_pool()
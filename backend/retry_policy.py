@@ -0,0 +1,147 @@
+"""
+Politique de nouveaux essais (retry) pour les appels amont
+Erreurs classées, backoff exponentiel avec jitter et budget global de nouveaux essais
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from functools import wraps
+from typing import Callable, Deque, Dict, Any
+
+from loguru import logger
+
+from metrics import record_retry
+
+
+# Classes d'erreurs: seules les erreurs transitoires sont réessayées
+TRANSIENT = "transient"
+AUTH = "auth"
+NOT_FOUND = "not_found"
+BUSY = "busy"
+PERMANENT = "permanent"
+
+
+class RetryBudget:
+    """
+    Budget global de nouveaux essais
+
+    Sur une fenêtre glissante de window_seconds, les nouveaux essais ne
+    peuvent dépasser ratio × appels (plus min_retries): quand un service
+    amont tombe, les nouveaux essais n'ajoutent au plus que ratio de charge.
+    """
+
+    def __init__(self, ratio: float, min_retries: int, window_seconds: float):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_seconds = window_seconds
+        self._calls: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.exhausted = 0
+
+    def _trim(self, now: float):
+        limit = now - self.window_seconds
+        for timestamps in (self._calls, self._retries):
+            while timestamps and timestamps[0] < limit:
+                timestamps.popleft()
+
+    def record_call(self):
+        """Compte un premier essai"""
+        now = time.monotonic()
+        self._trim(now)
+        self._calls.append(now)
+
+    def try_spend(self) -> bool:
+        """Réserve un nouvel essai s'il reste du budget"""
+        now = time.monotonic()
+        self._trim(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._calls):
+            self.exhausted += 1
+            return False
+        self._retries.append(now)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        self._trim(time.monotonic())
+        return {
+            "ratio": self.ratio,
+            "window_calls": len(self._calls),
+            "window_retries": len(self._retries),
+            "exhausted": self.exhausted
+        }
+
+
+class RetryPolicy:
+    """
+    Nouveaux essais d'une famille d'appels (ex: récupérations Pronote)
+
+    - classify(erreur) renvoie la classe de l'erreur; seules les erreurs
+      TRANSIENT sont réessayées (identifiants refusés, ressource absente ou
+      service saturé échouent immédiatement)
+    - délai: full jitter, uniforme entre 0 et base_delay × 2^essai (plafonné)
+    - chaque nouvel essai consomme le budget global partagé
+    """
+
+    def __init__(
+        self,
+        name: str,
+        classify: Callable[[BaseException], str],
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        budget: RetryBudget
+    ):
+        self.name = name
+        self.classify = classify
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self._retries = 0
+        self._by_class: Dict[str, int] = {}
+
+    def delay(self, attempt: int) -> float:
+        """Délai avant le nouvel essai numéro attempt + 1"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def retrying(self, resource: str):
+        """Décorateur d'une coroutine à réessayer selon la politique"""
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                self.budget.record_call()
+                attempt = 0
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        error_class = self.classify(e)
+                        self._by_class[error_class] = self._by_class.get(error_class, 0) + 1
+                        if error_class != TRANSIENT:
+                            raise
+                        if attempt + 1 >= self.max_attempts:
+                            record_retry(self.name, resource, "attempts_exhausted")
+                            raise
+                        if not self.budget.try_spend():
+                            record_retry(self.name, resource, "budget_exhausted")
+                            raise
+
+                        delay = self.delay(attempt)
+                        attempt += 1
+                        self._retries += 1
+                        record_retry(self.name, resource, "retried")
+                        logger.warning(
+                            f"{resource}: {str(e)}, nouvel essai dans {delay:.1f}s "
+                            f"({attempt}/{self.max_attempts - 1})"
+                        )
+                        await asyncio.sleep(delay)
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques des nouveaux essais (exposées par /api/health)"""
+        return {
+            "retries": self._retries,
+            "errors_by_class": dict(self._by_class),
+            "budget": self.budget.stats()
+        }
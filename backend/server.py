@@ -2,23 +2,47 @@
 Serveur FastAPI principal
 API Backend pour Assistant Pronote IA avec support CAS
 """
-from fastapi import FastAPI, HTTPException, Depends, status, Header
+from fastapi import FastAPI, HTTPException, Depends, status, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Awaitable
+from datetime import datetime, timedelta
 from loguru import logger
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+import os
 import sys
-import httpx
+import time
+import json
+import math
+import asyncio
 
-from config import settings, validate_config
-from pronote_client import PronoteClient, SUPPORTED_ENTS, PronoteException, CASAuthenticationError
+from config import settings, validate_config, rate_limit_storage_uri, rate_limit_storage_options
+from pronote_client import (
+    PronoteClient, PronoteException, CASAuthenticationError,
+    PronoteBusyError, PronoteTimeoutError, PronoteNotFoundError, pronote_retry_policy
+)
 from auth import auth_service
+from client_pool import client_pool
+from executor import pronote_executor
+from circuit_breaker import pronote_breakers
+from cache import response_cache, ResponseCache
+from delta_sync import delta_sync, SYNC_RESOURCES
+from ent_registry import ent_registry
+from singleflight import pronote_flight
+from redis_pool import redis_pool
+from ai_client import openrouter_client, OpenRouterError
+from ai_router import model_router
+from ai_limiter import LimiterQueueFullError
+from ai_context import build_context
+from ai_cache import ai_response_cache
+from conversation import conversation_store
+from metrics import HTTP_REQUEST_DURATION, stats_collector
+from prefetch import prefetch_scheduler
 
 
 # Configuration des logs
@@ -46,8 +70,14 @@ app = FastAPI(
 )
 
 
-# Rate limiting
-limiter = Limiter(key_func=get_remote_address)
+# Rate limiting (compteurs dans Redis: partagés entre workers et répliques)
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=rate_limit_storage_uri(),
+    storage_options=rate_limit_storage_options(),
+    # Redis indisponible: compteurs locaux au processus plutôt que des erreurs 500
+    in_memory_fallback_enabled=True
+)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -59,9 +89,80 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After"],
 )
 
 
+# Métriques Prometheus
+if settings.ENABLE_METRICS:
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        """Durée de chaque requête par route (modèle de chemin, pas l'URL brute)"""
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=request.method,
+                route=route.path if route else "unmatched",
+                status=str(status_code)
+            ).observe(time.perf_counter() - start)
+    
+    # Valeurs lues au moment du scrape
+    stats_collector.gauge(
+        "pronote_executor_queued", "Appels pronotepy en attente d'un thread",
+        lambda: pronote_executor.stats()['queued']
+    )
+    stats_collector.gauge(
+        "pronote_executor_running", "Appels pronotepy en cours",
+        lambda: pronote_executor.stats()['running']
+    )
+    stats_collector.counter(
+        "pronote_executor_rejected", "Appels pronotepy refusés (file pleine)",
+        lambda: pronote_executor.stats()['rejected']
+    )
+    stats_collector.gauge(
+        "pronote_circuits_open", "Hôtes Pronote court-circuités (disjoncteur ouvert ou semi-ouvert)",
+        lambda: len(pronote_breakers.stats()['open'])
+    )
+    stats_collector.gauge(
+        "pronote_pool_clients", "Clients Pronote connectés en mémoire",
+        lambda: client_pool.stats()['size']
+    )
+    stats_collector.gauge(
+        "openrouter_queue_depth", "Appels OpenRouter en attente d'un créneau",
+        lambda: openrouter_client.limiter.stats()['queued']
+    )
+    stats_collector.gauge(
+        "openrouter_active", "Appels OpenRouter en cours",
+        lambda: openrouter_client.limiter.stats()['active']
+    )
+    stats_collector.counter(
+        "openrouter_retries", "Nouveaux essais OpenRouter (429/5xx)",
+        lambda: openrouter_client.stats()['retries']
+    )
+    stats_collector.counter(
+        "session_cache_hits", "Sessions servies par le cache en mémoire",
+        lambda: auth_service.session_cache.hits
+    )
+    stats_collector.counter(
+        "session_cache_misses", "Sessions lues dans Redis",
+        lambda: auth_service.session_cache.misses
+    )
+    stats_collector.counter(
+        "ai_cache_hits", "Réponses IA servies par le cache",
+        lambda: ai_response_cache.hits
+    )
+    stats_collector.counter(
+        "ai_cache_misses", "Réponses IA demandées à OpenRouter",
+        lambda: ai_response_cache.misses
+    )
+
+
 # Sécurité
 security = HTTPBearer()
 
@@ -118,8 +219,18 @@ class DateRangeRequest(BaseModel):
 class ChatRequest(BaseModel):
     """Requête de chat avec l'IA"""
     message: str = Field(..., min_length=1, max_length=2000)
-    context: Optional[Dict[str, Any]] = Field(None, description="Contexte additionnel")
-    model: str = Field(default="deepseek/deepseek-r1:free", description="Modèle IA")
+    context: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Contexte additionnel (les données Pronote sont ajoutées par le serveur)"
+    )
+    include_pronote_context: bool = Field(
+        default=True,
+        description="Injecter devoirs, emploi du temps et notes en cache"
+    )
+    model: Optional[str] = Field(
+        None,
+        description="Modèle IA (par défaut: le plus rapide et disponible de AI_MODEL_CHAIN)"
+    )
 
 
 class AuthResponse(BaseModel):
@@ -148,7 +259,7 @@ async def get_current_user(
     """Dépendance pour vérifier l'authentification"""
     token = credentials.credentials
     
-    session_data = auth_service.validate_session(token)
+    session_data = await auth_service.validate_session(token)
     if not session_data:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -159,20 +270,226 @@ async def get_current_user(
     return session_data
 
 
+def pronote_busy_http_error(error: PronoteBusyError) -> HTTPException:
+    """503 pour un Pronote saturé ou court-circuité (avec Retry-After si connu)"""
+    headers = None
+    if error.retry_after is not None:
+        headers = {"Retry-After": str(math.ceil(error.retry_after))}
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(error),
+        headers=headers
+    )
+
+
+async def acquire_pronote_client(session_data: Dict[str, Any]) -> PronoteClient:
+    """Récupère le client Pronote d'une session (pool ou reconnexion silencieuse)"""
+    session_token = session_data['jwt_payload']['session_token']
+    
+    # Client du pool, ou reconnexion silencieuse avec les identifiants chiffrés
+    try:
+        return await client_pool.acquire(session_token, session_data)
+    except PronoteBusyError as e:
+        raise pronote_busy_http_error(e)
+    except PronoteTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+    except PronoteException as e:
+        logger.warning(f"Reconnexion Pronote impossible: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session Pronote expirée, veuillez vous reconnecter",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
 async def get_pronote_client(
     session_data: Dict[str, Any] = Depends(get_current_user)
 ) -> PronoteClient:
     """Dépendance pour récupérer le client Pronote de la session"""
-    client = PronoteClient()
+    return await acquire_pronote_client(session_data)
+
+
+def cached_response(
+    payload: Dict[str, Any],
+    cached: Dict[str, Any],
+    if_none_match: Optional[str]
+) -> Response:
+    """
+    Construit la réponse d'une donnée en cache avec ETag et Cache-Control
     
-    # Restaurer la session Pronote depuis les données stockées
-    pronote_data = session_data.get('pronote_data', {})
+    Args:
+        payload: Corps JSON de la réponse
+        cached: Résultat de response_cache.get_or_fetch
+        if_none_match: En-tête If-None-Match du client
+    
+    Returns:
+        304 si le client possède déjà cette version, sinon la réponse JSON
+    """
+    headers = {
+        "ETag": cached['etag'],
+        "Cache-Control": (
+            f"private, max-age={cached['max_age']}, "
+            f"stale-while-revalidate={settings.CACHE_STALE_SECONDS}"
+        )
+    }
     
-    # Note: pronotepy nécessite une reconnexion, on ne peut pas restaurer directement
-    # C'est une limitation de la bibliothèque. Solution: stocker les credentials chiffrés
-    # et réauthentifier si nécessaire, ou utiliser un système de cache intelligent
+    if if_none_match and cached['etag'] in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return client
+    return JSONResponse(content=payload, headers=headers)
+
+
+# ============================================================================
+# DONNÉES PRONOTE (CACHE)
+# ============================================================================
+
+def range_params(date_from: datetime, date_to: datetime) -> Dict[str, str]:
+    """Paramètres de cache d'une plage de dates (à la journée)"""
+    return {"from": date_from.date().isoformat(), "to": date_to.date().isoformat()}
+
+
+async def fetch_cached_homework(
+    current_user: Dict[str, Any],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Devoirs à travers le cache Redis (voir response_cache.get_or_fetch)"""
+    date_from, date_to = PronoteClient.homework_range(date_from, date_to)
+    
+    async def fetch():
+        client = await acquire_pronote_client(current_user)
+        return await client.get_homework(date_from, date_to)
+    
+    return await response_cache.get_or_fetch(
+        ResponseCache.user_key(current_user['pronote_data']),
+        "homework",
+        range_params(date_from, date_to),
+        fetch
+    )
+
+
+async def fetch_cached_timetable(
+    current_user: Dict[str, Any],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Emploi du temps à travers le cache Redis (voir response_cache.get_or_fetch)"""
+    date_from, date_to = PronoteClient.timetable_range(date_from, date_to)
+    
+    async def fetch():
+        client = await acquire_pronote_client(current_user)
+        return await client.get_timetable(date_from, date_to)
+    
+    return await response_cache.get_or_fetch(
+        ResponseCache.user_key(current_user['pronote_data']),
+        "timetable",
+        range_params(date_from, date_to),
+        fetch
+    )
+
+
+async def fetch_cached_grades(
+    current_user: Dict[str, Any],
+    period_name: Optional[str] = None,
+    current_period: bool = False
+) -> Dict[str, Any]:
+    """Notes à travers le cache Redis (voir response_cache.get_or_fetch)"""
+    async def fetch():
+        client = await acquire_pronote_client(current_user)
+        return await client.get_grades(period_name, current_period=current_period)
+    
+    return await response_cache.get_or_fetch(
+        ResponseCache.user_key(current_user['pronote_data']),
+        "grades",
+        {"current": True} if current_period else {"period": period_name},
+        fetch
+    )
+
+
+async def prefetch_session(
+    session_token: str,
+    session_data: Dict[str, Any],
+    day: datetime,
+    throttle: Callable[[], Awaitable[None]]
+) -> int:
+    """
+    Précharge devoirs et emploi du temps d'une session (voir PrefetchScheduler)
+    
+    Les plages sont celles que construiront les requêtes par défaut le jour
+    `day`, pour que l'élève tombe sur les mêmes clés de cache.
+    
+    Le client du pool est réutilisé s'il existe; sinon une connexion dédiée,
+    fermée à la fin, évite d'évincer les clients des utilisateurs actifs.
+    `throttle` est attendu avant chaque appel Pronote (connexion comprise).
+    
+    Returns:
+        Nombre de ressources récupérées auprès de Pronote
+    """
+    user_key = ResponseCache.user_key(session_data['pronote_data'])
+    
+    homework_from, homework_to = PronoteClient.homework_range(day)
+    timetable_from, timetable_to = PronoteClient.timetable_range(
+        day - timedelta(days=day.weekday())
+    )
+    
+    # Connexion seulement si une ressource doit vraiment être récupérée
+    detached: List[PronoteClient] = []
+    
+    async def client() -> PronoteClient:
+        pooled = client_pool.peek(session_token)
+        if pooled:
+            return pooled
+        if not detached:
+            await throttle()
+            detached.append(await client_pool.connect_detached(session_token, session_data))
+        return detached[0]
+    
+    async def fetch_homework():
+        pronote = await client()
+        await throttle()
+        return await pronote.get_homework(homework_from, homework_to)
+    
+    async def fetch_timetable():
+        pronote = await client()
+        await throttle()
+        return await pronote.get_timetable(timetable_from, timetable_to)
+    
+    fetched = 0
+    try:
+        for resource, params, fetcher in (
+            ("timetable", range_params(timetable_from, timetable_to), fetch_timetable),
+            ("homework", range_params(homework_from, homework_to), fetch_homework)
+        ):
+            if await response_cache.warm(
+                user_key, resource, params, fetcher, settings.PREFETCH_FRESH_SECONDS
+            ):
+                fetched += 1
+    finally:
+        for pronote in detached:
+            pronote.disconnect()
+    return fetched
+
+
+def section_error(error: BaseException) -> Dict[str, Any]:
+    """Convertit l'erreur d'une section du tableau de bord en réponse JSON"""
+    if isinstance(error, HTTPException):
+        status_code, detail = error.status_code, error.detail
+    elif isinstance(error, PronoteBusyError):
+        status_code, detail = status.HTTP_503_SERVICE_UNAVAILABLE, str(error)
+    elif isinstance(error, PronoteTimeoutError):
+        status_code, detail = status.HTTP_504_GATEWAY_TIMEOUT, str(error)
+    elif isinstance(error, PronoteNotFoundError):
+        status_code, detail = status.HTTP_404_NOT_FOUND, str(error)
+    else:
+        status_code, detail = status.HTTP_500_INTERNAL_SERVER_ERROR, str(error)
+    
+    section = {"success": False, "error": detail, "status_code": status_code}
+    if isinstance(error, PronoteBusyError) and error.retry_after is not None:
+        section["retry_after"] = math.ceil(error.retry_after)
+    return section
 
 
 # ============================================================================
@@ -181,7 +498,7 @@ async def get_pronote_client(
 
 @app.get("/")
 @limiter.limit("100/minute")
-async def root():
+async def root(request: Request):
     """Endpoint racine - Health check"""
     return {
         "service": "Assistant Pronote IA API",
@@ -198,11 +515,11 @@ async def root():
 
 @app.get("/api/health")
 @limiter.limit("200/minute")
-async def health_check():
+async def health_check(request: Request):
     """Health check détaillé"""
     try:
         # Vérifier Redis
-        auth_service.session_manager.redis_client.ping()
+        await auth_service.session_manager.redis_client.ping()
         redis_status = "ok"
     except Exception as e:
         redis_status = f"error: {str(e)}"
@@ -210,53 +527,87 @@ async def health_check():
     return {
         "status": "healthy" if redis_status == "ok" else "degraded",
         "redis": redis_status,
+        "pronote_pool": client_pool.stats(),
+        "pronote_executor": pronote_executor.stats(),
+        "pronote_singleflight": pronote_flight.stats(),
+        "pronote_hosts": pronote_breakers.stats(),
+        "pronote_retries": pronote_retry_policy.stats(),
+        "session_cache": auth_service.session_cache.stats(),
+        "ai_cache": ai_response_cache.stats(),
+        "openrouter": openrouter_client.stats(),
+        "ai_models": model_router.stats(),
+        "prefetch": prefetch_scheduler.stats(),
+        "worker_pid": os.getpid(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métriques Prometheus (si ENABLE_METRICS)"""
+    if not settings.ENABLE_METRICS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Métriques désactivées")
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/api/ents")
 @limiter.limit("100/minute")
-async def list_ents():
-    """Liste tous les ENTs supportés pour authentification CAS"""
-    return {
-        "ents": SUPPORTED_ENTS,
-        "count": len(SUPPORTED_ENTS)
+async def list_ents(request: Request, if_none_match: Optional[str] = Header(None)):
+    """
+    Liste tous les ENTs supportés pour authentification CAS
+    
+    Réponse précalculée au démarrage (voir ent_registry), avec ETag:
+    elle ne change qu'avec la version de pronotepy.
+    """
+    headers = {
+        "ETag": ent_registry.etag,
+        "Cache-Control": "public, max-age=86400"
     }
+    
+    if if_none_match and ent_registry.etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=ent_registry.body, media_type="application/json", headers=headers)
 
 
 @app.post("/api/auth/login/direct", response_model=AuthResponse)
 @limiter.limit("10/minute")
-async def login_direct(request: LoginDirectRequest):
+async def login_direct(request: Request, body: LoginDirectRequest):
     """
     Authentification directe (sans CAS)
     Pour établissements avec identifiant/mot de passe Pronote direct
     """
     try:
-        logger.info(f"Tentative connexion directe: {request.username}")
+        logger.info(f"Tentative connexion directe: {body.username}")
         
         # Créer client Pronote
         client = PronoteClient()
         
         # Authentifier
         session_info = await client.authenticate_direct(
-            pronote_url=request.pronote_url,
-            username=request.username,
-            password=request.password,
-            account_type=request.account_type
+            pronote_url=body.pronote_url,
+            username=body.username,
+            password=body.password,
+            account_type=body.account_type
         )
         
         # Créer session sécurisée
-        user_id = f"{request.username}_{session_info['session_id']}"
-        auth_data = auth_service.create_authenticated_session(
+        user_id = f"{body.username}_{session_info['session_id']}"
+        auth_data = await auth_service.create_authenticated_session(
             user_id=user_id,
             pronote_session_data={
-                "pronote_url": request.pronote_url,
-                "username": request.username,
+                "pronote_url": body.pronote_url,
+                "username": body.username,
+                "account_type": body.account_type,
                 "session_info": session_info,
                 "auth_type": "direct"
-            }
+            },
+            credentials={"password": body.password}
         )
         
+        # Conserver le client connecté pour les requêtes suivantes
+        client_pool.put(auth_data['session_token'], client)
+        
         logger.info(f"Connexion réussie: {session_info['student_name']}")
         
         return AuthResponse(
@@ -267,6 +618,13 @@ async def login_direct(request: LoginDirectRequest):
             student=session_info
         )
         
+    except PronoteBusyError as e:
+        raise pronote_busy_http_error(e)
+    except PronoteTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except PronoteException as e:
         logger.error(f"Erreur Pronote: {str(e)}")
         raise HTTPException(
@@ -283,38 +641,42 @@ async def login_direct(request: LoginDirectRequest):
 
 @app.post("/api/auth/login/cas", response_model=AuthResponse)
 @limiter.limit("10/minute")
-async def login_cas(request: LoginCASRequest):
+async def login_cas(request: Request, body: LoginCASRequest):
     """
     Authentification via CAS (monlycee.net, ENT régionaux)
     Utilise pronotepy avec support des principaux ENTs français
     """
     try:
-        logger.info(f"Tentative connexion CAS via {request.ent_name}: {request.username}")
+        logger.info(f"Tentative connexion CAS via {body.ent_name}: {body.username}")
         
         # Créer client Pronote
         client = PronoteClient()
         
         # Authentifier via CAS
         session_info = await client.authenticate_cas(
-            pronote_url=request.pronote_url,
-            username=request.username,
-            password=request.password,
-            ent_name=request.ent_name
+            pronote_url=body.pronote_url,
+            username=body.username,
+            password=body.password,
+            ent_name=body.ent_name
         )
         
         # Créer session sécurisée
-        user_id = f"{request.username}_{request.ent_name}_{session_info['session_id']}"
-        auth_data = auth_service.create_authenticated_session(
+        user_id = f"{body.username}_{body.ent_name}_{session_info['session_id']}"
+        auth_data = await auth_service.create_authenticated_session(
             user_id=user_id,
             pronote_session_data={
-                "pronote_url": request.pronote_url,
-                "username": request.username,
-                "ent_name": request.ent_name,
+                "pronote_url": body.pronote_url,
+                "username": body.username,
+                "ent_name": body.ent_name,
                 "session_info": session_info,
                 "auth_type": "cas"
-            }
+            },
+            credentials={"password": body.password, "ent_cookies": client.ent_cookies}
         )
         
+        # Conserver le client connecté pour les requêtes suivantes
+        client_pool.put(auth_data['session_token'], client)
+        
         logger.info(f"Connexion CAS réussie: {session_info['student_name']}")
         
         return AuthResponse(
@@ -325,6 +687,13 @@ async def login_cas(request: LoginCASRequest):
             student=session_info
         )
         
+    except PronoteBusyError as e:
+        raise pronote_busy_http_error(e)
+    except PronoteTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except CASAuthenticationError as e:
         logger.error(f"Erreur CAS: {str(e)}")
         raise HTTPException(
@@ -341,14 +710,15 @@ async def login_cas(request: LoginCASRequest):
 
 @app.post("/api/auth/logout")
 @limiter.limit("50/minute")
-async def logout(current_user: Dict[str, Any] = Depends(get_current_user)):
+async def logout(request: Request, current_user: Dict[str, Any] = Depends(get_current_user)):
     """Déconnexion et suppression de la session"""
     try:
         # Récupérer le token depuis le header Authorization
         # (current_user contient déjà les infos de session)
-        auth_service.session_manager.delete_session(
-            current_user['jwt_payload']['session_token']
-        )
+        session_token = current_user['jwt_payload']['session_token']
+        await auth_service.revoke_session(session_token)
+        await conversation_store.reset(session_token)
+        client_pool.remove(session_token)
         
         return {"success": True, "message": "Déconnexion réussie"}
         
@@ -363,43 +733,40 @@ async def logout(current_user: Dict[str, Any] = Depends(get_current_user)):
 @app.post("/api/pronote/homework")
 @limiter.limit("30/minute")
 async def get_homework(
-    request: DateRangeRequest,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    request: Request,
+    body: DateRangeRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     """Récupère les devoirs"""
     try:
-        client = PronoteClient()
-        
-        # Réauthentifier (limitation de pronotepy)
-        pronote_data = current_user['pronote_data']
-        if pronote_data['auth_type'] == 'direct':
-            await client.authenticate_direct(
-                pronote_url=pronote_data['pronote_url'],
-                username=pronote_data['username'],
-                password="",  # Mot de passe stocké chiffré
-                account_type=3
-            )
-        else:
-            await client.authenticate_cas(
-                pronote_url=pronote_data['pronote_url'],
-                username=pronote_data['username'],
-                password="",  # Mot de passe stocké chiffré
-                ent_name=pronote_data['ent_name']
-            )
-        
         # Parser les dates
-        date_from = datetime.fromisoformat(request.date_from) if request.date_from else None
-        date_to = datetime.fromisoformat(request.date_to) if request.date_to else None
+        date_from = datetime.fromisoformat(body.date_from) if body.date_from else None
+        date_to = datetime.fromisoformat(body.date_to) if body.date_to else None
         
-        # Récupérer les devoirs
-        homework = await client.get_homework(date_from, date_to)
+        # Récupérer les devoirs (à travers le cache Redis)
+        cached = await fetch_cached_homework(current_user, date_from, date_to)
+        homework = cached['data']
         
-        return {
-            "success": True,
-            "homework": homework,
-            "count": len(homework)
-        }
+        return cached_response(
+            {
+                "success": True,
+                "homework": homework,
+                "count": len(homework)
+            },
+            cached,
+            if_none_match
+        )
         
+    except HTTPException:
+        raise
+    except PronoteBusyError as e:
+        raise pronote_busy_http_error(e)
+    except PronoteTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Erreur récupération devoirs: {str(e)}")
         raise HTTPException(
@@ -411,43 +778,40 @@ async def get_homework(
 @app.post("/api/pronote/timetable")
 @limiter.limit("30/minute")
 async def get_timetable(
-    request: DateRangeRequest,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    request: Request,
+    body: DateRangeRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     """Récupère l'emploi du temps"""
     try:
-        client = PronoteClient()
-        
-        # Réauthentifier
-        pronote_data = current_user['pronote_data']
-        if pronote_data['auth_type'] == 'direct':
-            await client.authenticate_direct(
-                pronote_url=pronote_data['pronote_url'],
-                username=pronote_data['username'],
-                password="",
-                account_type=3
-            )
-        else:
-            await client.authenticate_cas(
-                pronote_url=pronote_data['pronote_url'],
-                username=pronote_data['username'],
-                password="",
-                ent_name=pronote_data['ent_name']
-            )
-        
         # Parser les dates
-        date_from = datetime.fromisoformat(request.date_from) if request.date_from else None
-        date_to = datetime.fromisoformat(request.date_to) if request.date_to else None
+        date_from = datetime.fromisoformat(body.date_from) if body.date_from else None
+        date_to = datetime.fromisoformat(body.date_to) if body.date_to else None
         
-        # Récupérer l'emploi du temps
-        timetable = await client.get_timetable(date_from, date_to)
+        # Récupérer l'emploi du temps (à travers le cache Redis)
+        cached = await fetch_cached_timetable(current_user, date_from, date_to)
+        timetable = cached['data']
         
-        return {
-            "success": True,
-            "timetable": timetable,
-            "count": len(timetable)
-        }
+        return cached_response(
+            {
+                "success": True,
+                "timetable": timetable,
+                "count": len(timetable)
+            },
+            cached,
+            if_none_match
+        )
         
+    except HTTPException:
+        raise
+    except PronoteBusyError as e:
+        raise pronote_busy_http_error(e)
+    except PronoteTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Erreur récupération emploi du temps: {str(e)}")
         raise HTTPException(
@@ -459,39 +823,41 @@ async def get_timetable(
 @app.post("/api/pronote/grades")
 @limiter.limit("30/minute")
 async def get_grades(
+    request: Request,
     period_name: Optional[str] = None,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     """Récupère les notes"""
     try:
-        client = PronoteClient()
+        # Récupérer les notes (à travers le cache Redis)
+        cached = await fetch_cached_grades(current_user, period_name)
+        grades = cached['data']
         
-        # Réauthentifier
-        pronote_data = current_user['pronote_data']
-        if pronote_data['auth_type'] == 'direct':
-            await client.authenticate_direct(
-                pronote_url=pronote_data['pronote_url'],
-                username=pronote_data['username'],
-                password="",
-                account_type=3
-            )
-        else:
-            await client.authenticate_cas(
-                pronote_url=pronote_data['pronote_url'],
-                username=pronote_data['username'],
-                password="",
-                ent_name=pronote_data['ent_name']
-            )
-        
-        # Récupérer les notes
-        grades = await client.get_grades(period_name)
-        
-        return {
-            "success": True,
-            "grades": grades,
-            "count": len(grades)
-        }
+        return cached_response(
+            {
+                "success": True,
+                "grades": grades,
+                "count": len(grades)
+            },
+            cached,
+            if_none_match
+        )
         
+    except HTTPException:
+        raise
+    except PronoteBusyError as e:
+        raise pronote_busy_http_error(e)
+    except PronoteTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+    except PronoteNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Erreur récupération notes: {str(e)}")
         raise HTTPException(
@@ -500,62 +866,298 @@ async def get_grades(
         )
 
 
+@app.post("/api/pronote/dashboard")
+@limiter.limit("30/minute")
+async def get_dashboard(
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Récupère en une requête les devoirs, l'emploi du temps de la semaine
+    et les notes de la période en cours
+    
+    Les trois sections sont récupérées en parallèle avec une seule connexion
+    Pronote; l'échec d'une section est signalé sans faire échouer les autres.
+    """
+    sections = {
+        "homework": fetch_cached_homework(current_user),
+        "timetable": fetch_cached_timetable(current_user),
+        "grades": fetch_cached_grades(current_user, current_period=True)
+    }
+    results = await asyncio.gather(*sections.values(), return_exceptions=True)
+    
+    payload: Dict[str, Any] = {}
+    succeeded: List[Dict[str, Any]] = []
+    failed: List[Dict[str, Any]] = []
+    
+    for name, result in zip(sections, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Erreur tableau de bord ({name}): {str(result)}")
+            payload[name] = section_error(result)
+            failed.append(payload[name])
+        else:
+            payload[name] = {
+                "success": True,
+                "items": result['data'],
+                "count": len(result['data']),
+                "stale": result['stale']
+            }
+            succeeded.append(result)
+    
+    if not succeeded:
+        # Tout a échoué: renvoyer l'erreur de la première section (ex: 401 → reconnexion)
+        raise HTTPException(
+            status_code=failed[0]['status_code'],
+            detail=failed[0]['error']
+        )
+    
+    response = {
+        "success": not failed,
+        "partial": bool(failed),
+        **payload
+    }
+    
+    if failed:
+        return JSONResponse(content=response)
+    
+    combined = {
+        "etag": ResponseCache.compute_etag([result['etag'] for result in succeeded]),
+        "max_age": min(result['max_age'] for result in succeeded)
+    }
+    return cached_response(response, combined, if_none_match)
+
+
+@app.post("/api/pronote/sync")
+@limiter.limit("30/minute")
+async def sync_pronote(
+    request: Request,
+    cursor: Optional[str] = None,
+    resources: Optional[str] = None,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Synchronisation incrémentale des notes (toutes périodes) et des devoirs
+    (plage par défaut)
+    
+    Sans curseur (ou curseur trop ancien), chaque ressource est renvoyée en
+    entier (full). Sinon, seuls les éléments ajoutés, modifiés et les
+    identifiants supprimés depuis le curseur sont renvoyés. Le curseur de la
+    réponse est à renvoyer à la prochaine synchronisation.
+    """
+    user_key = ResponseCache.user_key(current_user['pronote_data'])
+    since = delta_sync.decode_cursor(cursor, user_key)
+    
+    requested = [r.strip() for r in resources.split(',')] if resources else list(SYNC_RESOURCES)
+    unknown = [r for r in requested if r not in SYNC_RESOURCES]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ressources inconnues: {', '.join(unknown)}"
+        )
+    
+    fetchers = {
+        "grades": lambda: fetch_cached_grades(current_user),
+        "homework": lambda: fetch_cached_homework(current_user)
+    }
+    results = await asyncio.gather(
+        *(fetchers[resource]() for resource in requested),
+        return_exceptions=True
+    )
+    
+    payload: Dict[str, Any] = {}
+    versions = dict(since)
+    failed: List[Dict[str, Any]] = []
+    
+    for resource, result in zip(requested, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Erreur synchronisation ({resource}): {str(result)}")
+            payload[resource] = section_error(result)
+            failed.append(payload[resource])
+            continue
+        
+        snapshot = await delta_sync.update(user_key, resource, result['data'])
+        delta = delta_sync.diff(snapshot, result['data'], since.get(resource))
+        payload[resource] = {"success": True, "stale": result['stale'], **delta}
+        if delta['version'] is not None:
+            versions[resource] = delta['version']
+        else:
+            versions.pop(resource, None)
+    
+    if len(failed) == len(requested):
+        raise HTTPException(
+            status_code=failed[0]['status_code'],
+            detail=failed[0]['error']
+        )
+    
+    return {
+        "success": not failed,
+        "partial": bool(failed),
+        "cursor": delta_sync.encode_cursor(user_key, versions),
+        **payload
+    }
+
+
+async def assemble_pronote_context(
+    chat: ChatRequest,
+    current_user: Dict[str, Any]
+) -> str:
+    """
+    Contexte Pronote compact pour le chat, construit côté serveur
+    
+    Les trois ressources sont lues à travers le cache Redis; une ressource
+    indisponible est simplement omise du contexte.
+    """
+    # Le budget de contexte dépend du modèle qui sera essayé en premier
+    model = model_router.primary(chat.model)
+    
+    if not chat.include_pronote_context:
+        return build_context(chat.message, model, extra=chat.context)
+    
+    results = await asyncio.gather(
+        fetch_cached_homework(current_user),
+        fetch_cached_timetable(current_user),
+        fetch_cached_grades(current_user, current_period=True),
+        return_exceptions=True
+    )
+    homework, timetable, grades = [
+        None if isinstance(result, BaseException) else result['data']
+        for result in results
+    ]
+    
+    for name, result in zip(("devoirs", "emploi du temps", "notes"), results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Contexte IA sans {name}: {str(result)}")
+    
+    return build_context(
+        chat.message,
+        model,
+        homework=homework,
+        timetable=timetable,
+        grades=grades,
+        extra=chat.context
+    )
+
+
+async def build_chat_messages(
+    chat: ChatRequest,
+    current_user: Dict[str, Any]
+) -> List[Dict[str, str]]:
+    """
+    Construit les messages envoyés à OpenRouter
+    
+    Système (consignes, date et données Pronote), résumé des échanges
+    anciens dans un second message système, puis la fenêtre récente de la
+    conversation et la nouvelle question. Le premier message et la question
+    forment la clé du cache IA (voir AIResponseCache.key_for_messages).
+    """
+    # Préparer le contexte avec données Pronote et l'historique stocké côté serveur
+    context, (summary, history) = await asyncio.gather(
+        assemble_pronote_context(chat, current_user),
+        conversation_store.get_window(current_user['jwt_payload']['session_token'])
+    )
+    
+    # Créer le message système
+    system_message = f"""Tu es un assistant pédagogique intelligent qui aide {current_user['pronote_data']['session_info']['student_name']}.
+Tu as accès à ses données scolaires Pronote et tu dois répondre de manière claire, concise et utile.
+Analyse le contexte fourni et réponds de façon pertinente.
+Nous sommes le {datetime.now():%d/%m/%Y}."""
+    
+    if context:
+        system_message += f"\n\nDonnées Pronote:\n{context}"
+    
+    messages = [{"role": "system", "content": system_message}]
+    if summary:
+        messages.append({
+            "role": "system",
+            "content": f"Questions précédentes de la conversation:\n{summary}"
+        })
+    messages.extend(history)
+    messages.append({"role": "user", "content": chat.message})
+    return messages
+
+
+def openrouter_http_error(error: Exception) -> HTTPException:
+    """Erreur HTTP renvoyée au client pour un appel OpenRouter en échec"""
+    if isinstance(error, LimiterQueueFullError):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Assistant IA surchargé, réessayez dans quelques secondes",
+            headers={"Retry-After": str(error.retry_after)}
+        )
+    
+    if error.status_code == 429:
+        headers = None
+        if error.retry_after is not None:
+            headers = {"Retry-After": str(math.ceil(error.retry_after))}
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Limite de requêtes de l'assistant IA atteinte, réessayez plus tard",
+            headers=headers
+        )
+    
+    return HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail=f"Erreur OpenRouter: {error.detail}"
+    )
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Formate un événement Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @app.post("/api/ai/chat")
 @limiter.limit("20/minute")
 async def ai_chat(
-    request: ChatRequest,
+    request: Request,
+    body: ChatRequest,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Discute avec l'IA en utilisant les données Pronote comme contexte
     Utilise OpenRouter avec DeepSeek R1
     """
+    session_token = current_user['jwt_payload']['session_token']
+    
     try:
-        # Préparer le contexte avec données Pronote
-        context = request.context or {}
-        
-        # Créer le message système
-        system_message = f"""Tu es un assistant pédagogique intelligent qui aide {current_user['pronote_data']['session_info']['student_name']}.
-Tu as accès à ses données scolaires Pronote et tu dois répondre de manière claire, concise et utile.
-Analyse le contexte fourni et réponds de façon pertinente."""
-        
-        # Appeler OpenRouter
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.OPENROUTER_BASE_URL}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": "https://assistant-pronote.com"
-                },
-                json={
-                    "model": request.model,
-                    "messages": [
-                        {"role": "system", "content": system_message},
-                        {"role": "user", "content": f"{request.message}\n\nContexte:\n{context}"}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 1000
-                },
-                timeout=30.0
-            )
+        messages = await build_chat_messages(body, current_user)
         
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Erreur OpenRouter: {response.text}"
-            )
+        # Question déjà posée avec le même contexte: pas d'appel OpenRouter
+        cache_key = ai_response_cache.key_for_messages(messages, body.model or "auto")
+        cached = await ai_response_cache.get(cache_key)
+        if cached:
+            await conversation_store.append_turn(session_token, body.message, cached['content'])
+            return {
+                "success": True,
+                "response": cached['content'],
+                "model": cached.get('model', body.model),
+                "usage": cached['usage'],
+                "cached": True
+            }
         
-        data = response.json()
-        ai_response = data['choices'][0]['message']['content']
+        # Appeler OpenRouter (modèle choisi par le routeur, repli si échec)
+        completion = await model_router.complete(
+            messages=messages,
+            requested=body.model,
+            user_key=current_user['user_id'],
+            temperature=0.7,
+            max_tokens=1000
+        )
+        await ai_response_cache.put(cache_key, completion['content'], completion['usage'], completion['model'])
+        await conversation_store.append_turn(session_token, body.message, completion['content'])
         
         return {
             "success": True,
-            "response": ai_response,
-            "model": request.model,
-            "usage": data.get('usage', {})
+            "response": completion['content'],
+            "model": completion['model'],
+            "usage": completion['usage'],
+            "cached": False
         }
         
+    except (OpenRouterError, LimiterQueueFullError) as e:
+        logger.error(f"Erreur OpenRouter: {str(e)}")
+        raise openrouter_http_error(e)
     except Exception as e:
         logger.error(f"Erreur chat IA: {str(e)}")
         raise HTTPException(
@@ -564,6 +1166,108 @@ Analyse le contexte fourni et réponds de façon pertinente."""
         )
 
 
+@app.post("/api/ai/chat/stream")
+@limiter.limit("20/minute")
+async def ai_chat_stream(
+    request: Request,
+    body: ChatRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Variante streamée du chat IA (Server-Sent Events)
+    
+    Événements:
+    - token: {"content": "..."} à chaque fragment généré
+    - done: {"model": ..., "usage": {...}, "cached": bool} en fin de réponse
+    - error: {"detail": "..."} si OpenRouter échoue en cours de route
+    
+    Une réponse en cache est envoyée en un seul événement token.
+    Le premier fragment est attendu avant d'ouvrir le flux: une saturation
+    ou un 429 d'OpenRouter est renvoyé comme une vraie erreur HTTP.
+    Si le modèle choisi tarde à répondre, un second modèle est lancé
+    en parallèle (voir ModelRouter).
+    """
+    session_token = current_user['jwt_payload']['session_token']
+    messages = await build_chat_messages(body, current_user)
+    cache_key = ai_response_cache.key_for_messages(messages, body.model or "auto")
+    cached = await ai_response_cache.get(cache_key)
+    
+    model = cached.get('model', body.model) if cached else None
+    upstream = None
+    if not cached:
+        try:
+            model, upstream = await model_router.open_stream(
+                messages=messages,
+                requested=body.model,
+                user_key=current_user['user_id'],
+                temperature=0.7,
+                max_tokens=1000
+            )
+        except (OpenRouterError, LimiterQueueFullError) as e:
+            logger.error(f"Erreur OpenRouter (stream): {str(e)}")
+            raise openrouter_http_error(e)
+        except Exception as e:
+            logger.error(f"Erreur chat IA (stream): {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Erreur lors de la génération de la réponse"
+            )
+    
+    async def event_stream():
+        if cached:
+            await conversation_store.append_turn(session_token, body.message, cached['content'])
+            yield sse_event("token", {"content": cached['content']})
+            yield sse_event("done", {"model": model, "usage": cached['usage'], "cached": True})
+            return
+        
+        usage: Dict[str, Any] = {}
+        parts: List[str] = []
+        try:
+            async for chunk in upstream:
+                if 'content' in chunk:
+                    parts.append(chunk['content'])
+                    yield sse_event("token", {"content": chunk['content']})
+                elif 'usage' in chunk:
+                    usage = chunk['usage']
+            
+            # Seules les réponses complètes sont mises en cache et ajoutées à l'historique
+            answer = "".join(parts)
+            await ai_response_cache.put(cache_key, answer, usage, model)
+            await conversation_store.append_turn(session_token, body.message, answer)
+            yield sse_event("done", {"model": model, "usage": usage, "cached": False})
+            
+        except OpenRouterError as e:
+            logger.error(f"Erreur OpenRouter (stream): {str(e)}")
+            yield sse_event("error", {"detail": f"Erreur OpenRouter: {e.detail}"})
+        except Exception as e:
+            logger.error(f"Erreur chat IA (stream): {str(e)}")
+            yield sse_event("error", {"detail": "Erreur lors de la génération de la réponse"})
+        finally:
+            # Libère la connexion et le créneau OpenRouter (y compris si le client se déconnecte)
+            await upstream.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Désactive la mise en tampon des proxys (nginx)
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@app.delete("/api/ai/conversation")
+@limiter.limit("20/minute")
+async def reset_conversation(
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Efface l'historique de conversation de la session (nouvelle conversation)"""
+    await conversation_store.reset(current_user['jwt_payload']['session_token'])
+    return {"success": True, "message": "Conversation réinitialisée"}
+
+
 # ============================================================================
 # STARTUP / SHUTDOWN
 # ============================================================================
@@ -581,13 +1285,29 @@ async def startup_event():
         logger.info("Configuration validée")
         
         # Tester Redis
-        auth_service.session_manager.redis_client.ping()
+        await auth_service.session_manager.redis_client.ping()
         logger.info("Connexion Redis établie")
         
+        # Invalidation du cache de sessions entre workers
+        auth_service.start_invalidation_listener()
+        
+        # Client HTTP partagé vers OpenRouter
+        await openrouter_client.start()
+        
+        # Préchargement des données Pronote en heures creuses
+        prefetch_scheduler.start(prefetch_session)
+        
         logger.info(f"Environnement: {settings.ENV}")
         logger.info(f"Debug mode: {settings.DEBUG}")
         logger.info(f"CORS origins: {settings.ALLOWED_ORIGINS}")
         logger.info(f"Rate limits: {settings.RATE_LIMIT_PER_MINUTE}/min, {settings.RATE_LIMIT_PER_HOUR}/hour")
+        logger.info(f"Workers: {settings.WORKERS} (loop: {settings.UVICORN_LOOP}, http: {settings.UVICORN_HTTP})")
+        if settings.WORKERS > 1:
+            # Ces limites et ces compteurs restent propres à chaque processus
+            logger.warning(
+                f"{settings.WORKERS} workers: débit Pronote par hôte, concurrence OpenRouter "
+                f"et métriques /metrics sont comptés par worker"
+            )
         
         logger.info("API prête !")
         
@@ -600,16 +1320,30 @@ async def startup_event():
 async def shutdown_event():
     """Événement d'arrêt"""
     logger.info("Arrêt de l'API...")
-    # Nettoyage si nécessaire
+    
+    await auth_service.stop_invalidation_listener()
+    await prefetch_scheduler.stop()
+    await openrouter_client.close()
+    
+    # Fermer les sessions Pronote en mémoire
+    client_pool.clear()
+    pronote_executor.shutdown()
+    await redis_pool.disconnect()
 
 
 if __name__ == "__main__":
     import uvicorn
     
+    # Configuration vérifiée avant de lancer les workers (une erreur au lieu d'un échec par worker)
+    validate_config()
+    
     uvicorn.run(
         "server:app",
         host=settings.HOST,
         port=settings.PORT,
+        workers=settings.WORKERS,
+        loop=settings.UVICORN_LOOP,
+        http=settings.UVICORN_HTTP,
         reload=settings.DEBUG,
         log_level=settings.LOG_LEVEL.lower()
     )
@@ -0,0 +1,200 @@
+"""
+Regroupement des appels identiques concurrents (single-flight)
+Un seul appel Pronote en vol par utilisateur et paramètres, dans le processus et entre workers
+"""
+import asyncio
+import secrets
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable
+from loguru import logger
+from redis.exceptions import WatchError
+
+from config import settings
+from redis_pool import get_redis
+
+
+class SingleFlight:
+    """
+    Single-flight en mémoire
+
+    Les appelants concurrents d'une même clé attendent le résultat
+    (ou l'exception) du premier appel au lieu d'en lancer un nouveau.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Exécute fn, ou rejoint l'appel déjà en cours pour cette clé
+
+        Args:
+            key: Clé identifiant l'appel (utilisateur + paramètres)
+            fn: Coroutine à exécuter
+
+        Returns:
+            Résultat de l'appel partagé
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+            self.leaders += 1
+        else:
+            self.shared += 1
+
+        # shield: un appelant annulé n'annule pas l'appel des autres
+        return await asyncio.shield(future)
+
+    def _forget(self, key: str, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Éviter "exception was never retrieved" si tous les appelants sont partis
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques de regroupement"""
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "shared": self.shared
+        }
+
+
+class RedisLock:
+    """
+    Verrou Redis asynchrone (SET NX PX), sur le client redis.asyncio partagé
+
+    - acquire(): sonde le verrou à intervalle croissant jusqu'au délai d'attente
+      (aucun thread bloqué pendant l'attente)
+    - le verrou est prolongé en tâche de fond tant qu'il est détenu
+    - release() / prolongation ne touchent la clé que si le jeton est le nôtre (WATCH/MULTI)
+    """
+
+    POLL_MIN_SECONDS = 0.05
+    POLL_MAX_SECONDS = 0.5
+
+    def __init__(self, redis_client, name: str, expire: int):
+        self.redis_client = redis_client
+        self.name = name
+        self.expire = expire
+        self.token = secrets.token_hex(16)
+        self._renewal: Optional[asyncio.Task] = None
+
+    async def acquire(self, timeout: float) -> bool:
+        """
+        Args:
+            timeout: Attente maximale en secondes (0 = un seul essai)
+
+        Returns:
+            True si le verrou est obtenu
+        """
+        deadline = time.monotonic() + timeout
+        delay = self.POLL_MIN_SECONDS
+        while True:
+            if await self.redis_client.set(self.name, self.token, nx=True, px=self.expire * 1000):
+                self._renewal = asyncio.create_task(self._renew())
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.POLL_MAX_SECONDS)
+
+    async def _owned_do(self, command: str, *args) -> bool:
+        """Exécute command sur la clé si elle porte encore notre jeton"""
+        async with self.redis_client.pipeline() as pipe:
+            for _ in range(3):
+                try:
+                    await pipe.watch(self.name)
+                    if await pipe.get(self.name) != self.token:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    getattr(pipe, command)(self.name, *args)
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+        return False
+
+    async def _renew(self):
+        try:
+            while True:
+                await asyncio.sleep(self.expire / 3)
+                if not await self._owned_do("pexpire", self.expire * 1000):
+                    return
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"Erreur prolongation verrou {self.name}: {str(e)}")
+
+    async def release(self):
+        if self._renewal:
+            self._renewal.cancel()
+            self._renewal = None
+        await self._owned_do("delete")
+
+
+class RedisSingleFlight:
+    """
+    Single-flight distribué via un verrou Redis asynchrone (RedisLock)
+
+    Le premier worker prend le verrou et exécute l'appel; les autres
+    attendent le verrou puis relisent le résultat (recheck) avant de
+    refaire l'appel eux-mêmes.
+    """
+
+    def __init__(self):
+        self.redis_client = get_redis()
+        self.expire = settings.SINGLEFLIGHT_LOCK_EXPIRE_SECONDS
+        self.wait_timeout = settings.SINGLEFLIGHT_WAIT_SECONDS
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        recheck: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Any:
+        """
+        Exécute fn sous verrou Redis
+
+        Args:
+            key: Clé identifiant l'appel
+            fn: Coroutine à exécuter
+            recheck: Coroutine appelée une fois le verrou obtenu; si elle
+                retourne autre chose que None, fn n'est pas exécutée
+
+        Returns:
+            Résultat de recheck ou de fn
+        """
+        lock = RedisLock(self.redis_client, f"singleflight:{key}", self.expire)
+
+        try:
+            acquired = await lock.acquire(self.wait_timeout)
+        except Exception as e:
+            # Redis indisponible: on continue sans coordination
+            logger.warning(f"Verrou single-flight indisponible ({key}): {str(e)}")
+            acquired = False
+
+        try:
+            if recheck:
+                result = await recheck()
+                if result is not None:
+                    return result
+            return await fn()
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except Exception as e:
+                    logger.warning(f"Erreur libération verrou single-flight: {str(e)}")
+
+
+# Instances globales
+pronote_flight = SingleFlight()
+pronote_redis_flight = RedisSingleFlight()
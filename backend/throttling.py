@@ -0,0 +1,133 @@
+"""
+Limitation de débit par seau à jetons (token bucket)
+Un seau global et un seau par hôte Pronote, pour ne surcharger aucun établissement
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from urllib.parse import urlparse
+
+from config import settings
+
+
+def host_key(pronote_url: str) -> str:
+    """Hôte Pronote d'une URL (clé de limitation par établissement)"""
+    return (urlparse(pronote_url).hostname or pronote_url).lower()
+
+
+class TokenBucket:
+    """
+    Seau à jetons asynchrone
+
+    Le seau se remplit de rate jetons par seconde, jusqu'à capacity.
+    Chaque appel consomme un jeton; sans jeton disponible, acquire()
+    attend le prochain, try_acquire() échoue immédiatement et reserve()
+    emprunte sur le remplissage à venir (le solde peut devenir négatif).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self) -> bool:
+        """Consomme un jeton s'il y en a un, sans attendre"""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Réserve un jeton sans attendre (vérification et prise en une seule étape)
+
+        Les jetons déjà réservés par les appelants en attente sont déduits
+        du solde: l'attente calculée tient compte de toute la file.
+
+        Args:
+            max_wait: Attente maximale acceptée en secondes
+
+        Returns:
+            Secondes à attendre avant d'utiliser le jeton, ou None
+            (rien n'est réservé) si l'attente dépasserait max_wait
+        """
+        wait = self.wait_time()
+        if wait > max_wait:
+            return None
+        self._tokens -= 1
+        return wait
+
+    def wait_time(self) -> float:
+        """Secondes avant qu'un jeton soit disponible (réservations comprises)"""
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        """Attend un jeton (les appelants sont servis dans l'ordre d'arrivée)"""
+        async with self._lock:
+            while not self.try_acquire():
+                await asyncio.sleep(self.wait_time())
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self._tokens, 2)
+        }
+
+
+class KeyedTokenBuckets:
+    """
+    Un seau à jetons par clé (hôte Pronote), créé à la demande
+
+    Le nombre de seaux est borné: les moins récemment utilisés
+    sont oubliés (ils se seraient de toute façon remplis).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, max_keys: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def get(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity)
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    async def acquire(self, key: str):
+        await self.get(key).acquire()
+
+    def try_acquire(self, key: str) -> bool:
+        return self.get(key).try_acquire()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "keys": len(self._buckets)
+        }
+
+
+# Instance globale (appels Pronote interactifs, par établissement)
+pronote_host_buckets = KeyedTokenBuckets(
+    settings.PRONOTE_HOST_RATE_PER_SECOND,
+    settings.PRONOTE_HOST_BURST
+)
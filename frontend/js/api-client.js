@@ -9,6 +9,8 @@ class APIClient {
         this.accessToken = this.loadToken();
         this.requestQueue = [];
         this.isProcessing = false;
+        // Dernière réponse connue par endpoint (ETag + données) pour If-None-Match
+        this.etagCache = new Map();
     }
 
     /**
@@ -33,6 +35,7 @@ class APIClient {
     clearToken() {
         sessionStorage.removeItem('access_token');
         this.accessToken = null;
+        this.etagCache.clear();
         debugLog('Token supprimé');
     }
 
@@ -48,6 +51,8 @@ class APIClient {
      */
     async request(endpoint, options = {}) {
         const url = `${this.baseURL}${endpoint}`;
+        const { etagKey, ...fetchOptions } = options;
+        const cached = etagKey ? this.etagCache.get(etagKey) : null;
         
         const defaultHeaders = {
             'Content-Type': 'application/json',
@@ -58,8 +63,13 @@ class APIClient {
             defaultHeaders['Authorization'] = `Bearer ${this.accessToken}`;
         }
 
+        // Revalidation: le serveur répond 304 si les données n'ont pas changé
+        if (cached) {
+            defaultHeaders['If-None-Match'] = cached.etag;
+        }
+
         const config = {
-            ...options,
+            ...fetchOptions,
             headers: {
                 ...defaultHeaders,
                 ...options.headers,
@@ -78,6 +88,11 @@ class APIClient {
                 throw new Error('Session expirée. Veuillez vous reconnecter.');
             }
 
+            if (response.status === 304 && cached) {
+                debugLog('Response: 304 Not Modified');
+                return cached.data;
+            }
+
             if (!response.ok) {
                 const errorData = await response.json().catch(() => ({}));
                 throw new Error(errorData.detail || errorData.error || `Erreur HTTP ${response.status}`);
@@ -85,6 +100,12 @@ class APIClient {
 
             const data = await response.json();
             debugLog('Response:', data);
+
+            const etag = response.headers.get('ETag');
+            if (etagKey && etag) {
+                this.etagCache.set(etagKey, { etag, data });
+            }
+
             return data;
 
         } catch (error) {
@@ -110,6 +131,17 @@ class APIClient {
         });
     }
 
+    /**
+     * POST request avec revalidation ETag (données Pronote en cache)
+     */
+    async postCached(endpoint, data) {
+        return this.request(endpoint, {
+            method: 'POST',
+            body: JSON.stringify(data),
+            etagKey: endpoint,
+        });
+    }
+
     /**
      * DELETE request
      */
@@ -176,7 +208,7 @@ class APIClient {
      * Récupère les devoirs
      */
     async getHomework(dateFrom = null, dateTo = null) {
-        return this.post('/api/pronote/homework', {
+        return this.postCached('/api/pronote/homework', {
             date_from: dateFrom,
             date_to: dateTo
         });
@@ -186,7 +218,7 @@ class APIClient {
      * Récupère l'emploi du temps
      */
     async getTimetable(dateFrom = null, dateTo = null) {
-        return this.post('/api/pronote/timetable', {
+        return this.postCached('/api/pronote/timetable', {
             date_from: dateFrom,
             date_to: dateTo
         });
@@ -197,7 +229,25 @@ class APIClient {
      */
     async getGrades(periodName = null) {
         const params = periodName ? `?period_name=${encodeURIComponent(periodName)}` : '';
-        return this.post(`/api/pronote/grades${params}`);
+        return this.postCached(`/api/pronote/grades${params}`);
+    }
+
+    /**
+     * Synchronisation incrémentale des notes et devoirs depuis un curseur
+     */
+    async syncPronote(cursor = null, resources = null) {
+        const params = new URLSearchParams();
+        if (cursor) params.set('cursor', cursor);
+        if (resources) params.set('resources', resources.join(','));
+        const query = params.toString();
+        return this.post(`/api/pronote/sync${query ? `?${query}` : ''}`);
+    }
+
+    /**
+     * Récupère devoirs, emploi du temps et notes de la période en une requête
+     */
+    async getDashboard() {
+        return this.postCached('/api/pronote/dashboard');
     }
 
     // ========================================================================
@@ -215,6 +265,100 @@ class APIClient {
         });
     }
 
+    /**
+     * Démarre une nouvelle conversation (l'historique est conservé côté serveur)
+     */
+    async resetConversation() {
+        return this.delete('/api/ai/conversation');
+    }
+
+    /**
+     * Envoie un message au chat IA en streaming (Server-Sent Events)
+     * onToken est appelé à chaque fragment de réponse reçu
+     */
+    async streamChatMessage(message, context = null, onToken = () => {}) {
+        const response = await fetch(`${this.baseURL}/api/ai/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${this.accessToken}`,
+            },
+            body: JSON.stringify({
+                message: message,
+                context: context,
+                model: CONFIG.AI_CONFIG.model
+            }),
+        });
+
+        if (response.status === 401) {
+            this.clearToken();
+            throw new Error('Session expirée. Veuillez vous reconnecter.');
+        }
+
+        if (!response.ok || !response.body) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.detail || errorData.error || `Erreur HTTP ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const result = { success: false, response: '', usage: {} };
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+
+            for (const rawEvent of events) {
+                const event = this.parseSSEEvent(rawEvent);
+                if (!event) continue;
+
+                if (event.type === 'token') {
+                    result.response += event.data.content;
+                    onToken(event.data.content);
+                } else if (event.type === 'done') {
+                    result.success = true;
+                    result.model = event.data.model;
+                    result.usage = event.data.usage || {};
+                } else if (event.type === 'error') {
+                    throw new Error(event.data.detail || 'Erreur de streaming');
+                }
+            }
+        }
+
+        debugLog('Stream terminé:', result);
+        return result;
+    }
+
+    /**
+     * Décode un événement Server-Sent Events ("event: ...\ndata: ...")
+     */
+    parseSSEEvent(rawEvent) {
+        let type = 'message';
+        const dataLines = [];
+
+        rawEvent.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+
+        if (dataLines.length === 0) return null;
+
+        try {
+            return { type, data: JSON.parse(dataLines.join('\n')) };
+        } catch (error) {
+            errorLog('Événement SSE invalide:', rawEvent);
+            return null;
+        }
+    }
+
     // ========================================================================
     // UTILITAIRES
     // ========================================================================
@@ -30,6 +30,11 @@ class ChatManager {
             });
         }
 
+        const newConversationBtn = document.getElementById('new-conversation-btn');
+        if (newConversationBtn) {
+            newConversationBtn.addEventListener('click', () => this.resetConversation());
+        }
+
         // Boutons de suggestions
         document.querySelectorAll('.suggestion-btn').forEach(btn => {
             btn.addEventListener('click', (e) => {
@@ -60,19 +65,26 @@ class ChatManager {
         this.isTyping = true;
 
         try {
-            // Préparer le contexte avec les données Pronote
-            const context = this.buildContext(message);
-
-            // Envoyer au backend
-            const response = await apiClient.sendChatMessage(message, context);
+            // Envoyer au backend en streaming: la réponse s'affiche au fil de l'eau
+            // (le serveur injecte lui-même les données Pronote en cache dans le contexte)
+            let streamed = null;
+            const response = await apiClient.streamChatMessage(message, null, (token) => {
+                if (!streamed) {
+                    this.hideTypingIndicator();
+                    streamed = this.addMessage('assistant', '');
+                    if (!streamed) return;
+                }
+                streamed.entry.content += token;
+                streamed.element.textContent = streamed.entry.content;
+                this.scrollToBottom();
+            });
 
-            if (response.success && response.response) {
-                this.addMessage('assistant', response.response);
-            } else {
-                this.addMessage('assistant', 'Désolé, je n\'ai pas pu traiter votre demande.');
+            if (!streamed) {
+                this.addMessage('assistant', response.response || 'Désolé, je n\'ai pas pu traiter votre demande.');
             }
         } catch (error) {
             errorLog('Erreur chat:', error);
+            this.hideTypingIndicator();
             this.addMessage('assistant', 'Une erreur est survenue. Veuillez réessayer.');
         } finally {
             this.hideTypingIndicator();
@@ -80,78 +92,9 @@ class ChatManager {
         }
     }
 
-    /**
-     * Construit le contexte à partir des données Pronote
-     */
-    buildContext(message) {
-        if (!window.pronoteDataManager) return null;
-
-        const data = window.pronoteDataManager.getAllData();
-        const messageLower = message.toLowerCase();
-
-        let context = {
-            student: authManager.getCurrentUser()
-        };
-
-        // Inclure les devoirs si la question concerne les devoirs
-        if (messageLower.includes('devoir') || 
-            messageLower.includes('dm') || 
-            messageLower.includes('exercice') ||
-            messageLower.includes('travail') ||
-            messageLower.includes('demain') ||
-            messageLower.includes('semaine')) {
-            
-            context.homework = data.homework.slice(0, 10).map(hw => ({
-                subject: hw.subject,
-                description: hw.description,
-                date: hw.date,
-                done: hw.done
-            }));
-        }
-
-        // Inclure l'emploi du temps si la question concerne les cours
-        if (messageLower.includes('emploi') || 
-            messageLower.includes('cours') || 
-            messageLower.includes('horaire') ||
-            messageLower.includes('quand') ||
-            messageLower.includes('prochain')) {
-            
-            context.timetable = data.timetable.slice(0, 15).map(lesson => ({
-                subject: lesson.subject,
-                teacher: lesson.teacher,
-                start: lesson.start,
-                end: lesson.end,
-                room: lesson.classroom
-            }));
-        }
-
-        // Inclure les notes si la question concerne les notes
-        if (messageLower.includes('note') || 
-            messageLower.includes('moyenne') || 
-            messageLower.includes('résultat')) {
-            
-            context.grades = data.grades.slice(0, 20).map(grade => ({
-                subject: grade.subject,
-                grade: grade.grade,
-                out_of: grade.out_of,
-                date: grade.date
-            }));
-        }
-
-        // Pour les questions générales, inclure un résumé
-        if (!context.homework && !context.timetable && !context.grades) {
-            context.summary = {
-                homework_count: data.homework.length,
-                timetable_count: data.timetable.length,
-                grades_count: data.grades.length
-            };
-        }
-
-        return context;
-    }
-
     /**
      * Ajoute un message dans le chat
+     * Retourne l'élément de contenu et l'entrée d'historique (mise à jour en streaming)
      */
     addMessage(role, content) {
         const chatContainer = document.getElementById('chat-messages');
@@ -179,11 +122,12 @@ class ChatManager {
         chatContainer.scrollTop = chatContainer.scrollHeight;
 
         // Stocker le message
-        this.messages.push({
+        const entry = {
             role,
             content,
             timestamp: new Date()
-        });
+        };
+        this.messages.push(entry);
 
         // Limiter le nombre de messages
         if (this.messages.length > CONFIG.MAX_CHAT_MESSAGES) {
@@ -194,6 +138,18 @@ class ChatManager {
                 chatContainer.removeChild(chatContainer.firstChild);
             }
         }
+
+        return { element: contentDiv, entry };
+    }
+
+    /**
+     * Scrolle le chat vers le dernier message
+     */
+    scrollToBottom() {
+        const chatContainer = document.getElementById('chat-messages');
+        if (chatContainer) {
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+        }
     }
 
     /**
@@ -262,6 +218,20 @@ N'hésite pas à me poser des questions !`;
         this.messages = [];
     }
 
+    /**
+     * Démarre une nouvelle conversation (historique serveur effacé)
+     */
+    async resetConversation() {
+        if (this.isTyping) return;
+
+        try {
+            await apiClient.resetConversation();
+        } catch (error) {
+            errorLog('Erreur réinitialisation conversation:', error);
+        }
+        this.clearMessages();
+    }
+
     /**
      * Récupère l'historique des messages
      */
@@ -16,7 +16,7 @@ const CONFIG = {
     
     // Configuration du chat IA
     AI_CONFIG: {
-        model: 'deepseek/deepseek-r1:free', // Modèle par défaut
+        model: null, // null = modèle choisi par le serveur (AI_MODEL_CHAIN)
         temperature: 0.7,
         max_tokens: 1000,
         system_prompt: `Tu es un assistant pédagogique intelligent. 
@@ -10,6 +10,12 @@ class PronoteDataManager {
             timetable: [],
             grades: []
         };
+        // Synchronisation incrémentale: copie locale par identifiant et curseur serveur
+        this.syncItems = {
+            homework: new Map(),
+            grades: new Map()
+        };
+        this.syncCursor = null;
         this.initEventListeners();
     }
 
@@ -24,14 +30,66 @@ class PronoteDataManager {
     }
 
     /**
-     * Charge toutes les données
+     * Charge toutes les données (une seule requête au tableau de bord)
      */
     async loadAllData() {
-        await Promise.all([
-            this.loadHomework(),
-            this.loadTimetable(),
-            this.loadGrades()
-        ]);
+        const sections = {
+            homework: {
+                container: 'homework-list',
+                display: (items) => this.displayHomework(items),
+                error: 'Erreur lors du chargement des devoirs'
+            },
+            timetable: {
+                container: 'timetable-list',
+                display: (items) => this.displayTimetable(items),
+                error: 'Erreur lors du chargement de l\'emploi du temps'
+            },
+            grades: {
+                container: 'grades-list',
+                display: (items) => this.displayGrades(items),
+                error: 'Erreur lors du chargement des notes'
+            }
+        };
+
+        Object.values(sections).forEach(section => {
+            const container = document.getElementById(section.container);
+            if (container) this.showLoading(container);
+        });
+
+        try {
+            const response = await apiClient.getDashboard();
+
+            Object.entries(sections).forEach(([name, section]) => {
+                const result = response[name];
+                const container = document.getElementById(section.container);
+
+                if (result && result.success) {
+                    this.data[name] = result.items;
+                    section.display(result.items);
+                } else if (container) {
+                    errorLog(`Erreur chargement ${name}:`, result && result.error);
+                    this.showError(container, section.error);
+                }
+            });
+        } catch (error) {
+            errorLog('Erreur chargement tableau de bord:', error);
+
+            // Session expirée: inutile de réessayer section par section
+            if (!apiClient.isAuthenticated()) {
+                Object.values(sections).forEach(section => {
+                    const container = document.getElementById(section.container);
+                    if (container) this.showError(container, section.error);
+                });
+                return;
+            }
+
+            // Repli: chargement section par section
+            await Promise.all([
+                this.loadHomework(),
+                this.loadTimetable(),
+                this.loadGrades()
+            ]);
+        }
     }
 
     /**
@@ -44,18 +102,10 @@ class PronoteDataManager {
         this.showLoading(container);
 
         try {
-            // Dates: aujourd'hui à +14 jours
-            const dateFrom = new Date().toISOString();
-            const dateTo = new Date(Date.now() + 14 * 24 * 60 * 60 * 1000).toISOString();
-
-            const response = await apiClient.getHomework(dateFrom, dateTo);
-
-            if (response.success && response.homework) {
-                this.data.homework = response.homework;
-                this.displayHomework(response.homework);
-            } else {
-                this.showEmpty(container, 'Aucun devoir à venir');
-            }
+            // Plage par défaut du serveur: aujourd'hui à +14 jours
+            const homework = await this.sync('homework');
+            this.data.homework = homework;
+            this.displayHomework(homework);
         } catch (error) {
             errorLog('Erreur chargement devoirs:', error);
             this.showError(container, 'Erreur lors du chargement des devoirs');
@@ -106,20 +156,40 @@ class PronoteDataManager {
         this.showLoading(container);
 
         try {
-            const response = await apiClient.getGrades();
-
-            if (response.success && response.grades) {
-                this.data.grades = response.grades;
-                this.displayGrades(response.grades);
-            } else {
-                this.showEmpty(container, 'Aucune note disponible');
-            }
+            const grades = await this.sync('grades');
+            this.data.grades = grades;
+            this.displayGrades(grades);
         } catch (error) {
             errorLog('Erreur chargement notes:', error);
             this.showError(container, 'Erreur lors du chargement des notes');
         }
     }
 
+    /**
+     * Synchronise une ressource (notes ou devoirs) et renvoie la liste à jour
+     *
+     * Seuls les éléments ajoutés, modifiés ou supprimés depuis le dernier
+     * curseur sont transférés; la première synchronisation renvoie tout.
+     */
+    async sync(resource) {
+        const response = await apiClient.syncPronote(this.syncCursor, [resource]);
+        const result = response[resource];
+
+        if (!result || !result.success) {
+            throw new Error((result && result.error) || `Synchronisation ${resource} impossible`);
+        }
+
+        const items = this.syncItems[resource];
+        if (result.full) {
+            items.clear();
+        }
+        [...result.added, ...result.changed].forEach(item => items.set(item.id, item));
+        result.removed.forEach(id => items.delete(id));
+
+        this.syncCursor = response.cursor;
+        return Array.from(items.values());
+    }
+
     /**
      * Affiche les devoirs
      */